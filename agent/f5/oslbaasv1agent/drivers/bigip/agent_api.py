@@ -109,6 +109,19 @@ class LbaasAgentApi(RpcProxy):
             topic=self.topic
         )
 
+    @log.log
+    def get_service_hashes(self, pool_ids, global_routed_mode=False):
+        return self.call(
+            self.context,
+            self.make_msg(
+                'get_service_hashes',
+                pool_ids=pool_ids,
+                global_routed_mode=global_routed_mode,
+                host=self.host
+            ),
+            topic=self.topic
+        )
+
     @log.log
     def create_port_on_subnet(self, subnet_id=None,
                               mac_address=None, name=None,
@@ -375,3 +388,15 @@ class LbaasAgentApi(RpcProxy):
             ),
             topic=self.topic
         )
+
+    @log.log
+    def update_pools_stats(self, pools_stats):
+        return self.call(
+            self.context,
+            self.make_msg(
+                'update_pools_stats',
+                pools_stats=pools_stats,
+                host=self.host
+            ),
+            topic=self.topic
+        )
@@ -15,6 +15,10 @@
 
 import datetime
 import copy
+import hashlib
+import json
+
+from eventlet import greenthread
 
 preLiberty = False
 try:
@@ -32,6 +36,7 @@ from neutron.common import constants as neutron_constants
 from neutron import context
 from neutron.common import topics
 from neutron.common.exceptions import NeutronException
+from neutron.plugins.common import constants as plugin_const
 PREMITAKA = False
 try:
     from neutron.common import log
@@ -42,6 +47,10 @@ except ImportError:
 
 from f5.oslbaasv1agent.drivers.bigip import agent_api
 from f5.oslbaasv1agent.drivers.bigip import constants
+from f5.oslbaasv1agent.drivers.bigip.fdb_aggregator import FdbAggregator
+from f5.oslbaasv1agent.drivers.bigip.reconciler import ServiceReconciler, \
+    RECONCILE_TICK
+from f5.oslbaasv1agent.drivers.bigip.stats import StatsPublishFilter
 import f5.oslbaasv1agent.drivers.bigip.constants as lbaasv1constants
 
 preJuno = False
@@ -78,6 +87,13 @@ OPTS = [
         default=False,
         help=_('Use L2 Populate service for fdb entries on the BIG-IP')
     ),
+    cfg.FloatOpt(
+        'f5_fdb_update_interval',
+        default=2.0,
+        help=_('Seconds to collect L2 Populate fdb updates before '
+               'applying their net result. 0 applies each update '
+               'as it is received.')
+    ),
     cfg.BoolOpt(
         'f5_global_routed_mode',
         default=False,
@@ -109,6 +125,35 @@ OPTS = [
         default=300,
         help=_('Number of seconds between service refresh check')
     ),
+    cfg.BoolOpt(
+        'f5_rolling_resync',
+        default=True,
+        help=_('Check a share of the cached services on every tick so '
+               'all are checked once per service_resync_interval')
+    ),
+    cfg.IntOpt(
+        'f5_stats_batch_size',
+        default=100,
+        help=_('Number of pools whose stats are sent to the plugin in one '
+               'message. 0 sends one message per pool.')
+    ),
+    cfg.IntOpt(
+        'f5_stats_publish_threshold',
+        default=0,
+        help=_('Percent a pool stats counter must change by before the '
+               'pool stats are published again')
+    ),
+    cfg.IntOpt(
+        'f5_stats_publish_max_age',
+        default=300,
+        help=_('Seconds after which the full stats of a pool are '
+               'published even if they did not change')
+    ),
+    cfg.IntOpt(
+        'f5_service_queue_workers',
+        default=1,
+        help=_('Number of pools whose requests can run concurrently')
+    ),
     cfg.StrOpt(
         'environment_prefix', default='',
         help=_('The object name prefix for this environment'),
@@ -128,9 +173,26 @@ OPTS = [
     )
 ]
 
+# types of the remote errors of a plugin without the called method
+UNSUPPORTED_METHOD_ERRORS = ['AttributeError', 'NoSuchMethod',
+                             'UnsupportedVersion']
+
+
+def is_unsupported_method(exc):
+    """ Whether exc is the remote error of an RPC method which the
+        plugin does not implement """
+    return getattr(exc, 'exc_type', None) in UNSUPPORTED_METHOD_ERRORS
+
 
 class LogicalServiceCache(object):
-    """Manage a cache of known services."""
+    """Manage a cache of known services.
+
+    The last full service definition delivered for each pool is kept
+    with the statuses it was delivered with, along with the hash of
+    its configuration computed by the plugin and a version which
+    increases whenever the hash changes. Stats collection reads these
+    instead of fetching the service from the plugin, unless the
+    service still has pending changes."""
 
     class Service(object):
         """Inner classes used to hold values for weakref lookups."""
@@ -139,6 +201,9 @@ class LogicalServiceCache(object):
             self.pool_id = pool_id
             self.tenant_id = tenant_id
             self.agent_host = agent_host
+            self.service = None
+            self.service_hash = None
+            self.version = 0
 
         def __eq__(self, other):
             return self.__dict__ == other.__dict__
@@ -161,6 +226,7 @@ class LogicalServiceCache(object):
         return len(self.services)
 
     def put(self, service, agent_host):
+        """Cache service, returns True if its definition changed"""
         if 'port_id' in service['vip']:
             port_id = service['vip']['port_id']
         else:
@@ -175,6 +241,45 @@ class LogicalServiceCache(object):
             s.tenant_id = tenant_id
             s.port_id = port_id
             s.agent_host = agent_host
+        service_hash = service.get('service_hash')
+        if not service_hash:
+            # older plugins do not hash their services
+            service_hash = self.service_hash(service)
+        # statuses may have moved on even if the definition did not
+        s.service = copy.deepcopy(service)
+        if s.service_hash == service_hash:
+            return False
+        s.service_hash = service_hash
+        s.version += 1
+        return True
+
+    def put_pool(self, pool_id, tenant_id, agent_host):
+        """Cache a pool whose service definition is fetched when it
+        is first needed"""
+        if pool_id not in self.services:
+            self.services[pool_id] = \
+                self.Service(None, pool_id, tenant_id, agent_host)
+
+    @staticmethod
+    def service_hash(service):
+        """Hash of a service definition delivered without one"""
+        return hashlib.md5(
+            json.dumps(service, sort_keys=True, default=str)).hexdigest()
+
+    @staticmethod
+    def is_pending(service):
+        """Whether the pool or members of service have changes pending.
+        Their statuses are only known once the plugin has the statuses
+        reported by the driver."""
+        pending = [plugin_const.PENDING_CREATE,
+                   plugin_const.PENDING_UPDATE,
+                   plugin_const.PENDING_DELETE]
+        if service['pool'] and service['pool'].get('status') in pending:
+            return True
+        for member in service.get('members', []):
+            if member.get('status') in pending:
+                return True
+        return False
 
     def remove(self, service):
         if not isinstance(service, self.Service):
@@ -194,6 +299,13 @@ class LogicalServiceCache(object):
         else:
             return None
 
+    def get_service_by_pool_id(self, pool_id):
+        """Last full service definition cached for a pool"""
+        if pool_id in self.services:
+            return self.services[pool_id].service
+        else:
+            return None
+
     def get_pool_ids(self):
         return self.services.keys()
 
@@ -228,6 +340,17 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         self.last_resync = datetime.datetime.now()
         self.needs_resync = False
         self.plugin_rpc = None
+        # cleared when the plugin does not support update_pools_stats
+        self.bulk_stats_supported = True
+        # cleared when the plugin does not support get_service_hashes
+        self.service_hashes_supported = True
+        # check that the cached services are still on the devices
+        self.validate_cached_services = False
+        # set once the driver was asked to load the known tenants
+        self.driver_cache_warm = False
+        self.stats_filter = StatsPublishFilter(
+            threshold=conf.f5_stats_publish_threshold,
+            max_age=conf.f5_stats_publish_max_age)
 
         if conf.service_resync_interval:
             self.service_resync_interval = conf.service_resync_interval
@@ -235,6 +358,12 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             self.service_resync_interval = constants.RESYNC_INTERVAL
         LOG.debug(_('setting service resync interval to %d seconds'
                     % self.service_resync_interval))
+        self.reconciler = None
+        if conf.f5_rolling_resync:
+            self.reconciler = ServiceReconciler(
+                self, self.service_resync_interval)
+        self.fdb_aggregator = FdbAggregator(
+            self, conf.f5_fdb_update_interval)
 
         try:
             LOG.debug(_('loading LBaaS driver %s'
@@ -382,10 +511,29 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             if hasattr(self.lbdriver, 'service_queue'):
                 self.agent_state['configurations']['request_queue_depth'] = \
                     len(self.lbdriver.service_queue)
+                if hasattr(self.lbdriver.service_queue, 'get_stats'):
+                    self.agent_state['configurations'][
+                        'request_queue_stats'] = \
+                        self.lbdriver.service_queue.get_stats()
+                if hasattr(self.lbdriver.service_queue, 'get_lane_stats'):
+                    self.agent_state['configurations'][
+                        'request_queue_lanes'] = \
+                        self.lbdriver.service_queue.get_lane_stats()
+            self.agent_state['configurations']['stats_publish_stats'] = \
+                self.stats_filter.get_stats()
+            if self.reconciler:
+                self.agent_state['configurations']['reconcile_stats'] = \
+                    self.reconciler.get_stats()
+            self.agent_state['configurations']['fdb_update_stats'] = \
+                self.fdb_aggregator.get_stats()
             if self.lbdriver.agent_configurations:
                 self.agent_state['configurations'].update(
                     self.lbdriver.agent_configurations
                 )
+            if hasattr(self.lbdriver, 'get_icontrol_rest_stats'):
+                self.agent_state['configurations'][
+                    'icontrol_rest_stats'] = \
+                    self.lbdriver.get_icontrol_rest_stats()
             if self.conf.capacity_policy:
                 env_score = \
                     self.lbdriver.generate_capacity_score(
@@ -428,9 +576,18 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
                 LOG.debug(
                     'Forcing resync of services on resync timer (%d seconds).'
                     % self.service_resync_interval)
-                self.cache.services = {}
                 self.last_resync = now
-                self.lbdriver.flush_cache()
+                if self.service_hashes_supported:
+                    # only changed or missing services are synced,
+                    # by the reconciler if there is one
+                    if not self.reconciler:
+                        self.validate_cached_services = True
+                    # queued by the driver, runs once the requests
+                    # ahead of it are done
+                    greenthread.spawn_n(self.verify_driver_cache)
+                else:
+                    self.cache.services = {}
+                    self.lbdriver.flush_cache()
         LOG.debug("tunnel_sync: periodic_resync need_resync: %s"
                   % str(self.needs_resync))
         # resync if we need to
@@ -441,33 +598,118 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             if self.sync_state():
                 self.needs_resync = True
 
+    @periodic_task.periodic_task(spacing=RECONCILE_TICK)
+    def reconcile_services(self, context):
+        if not self.plugin_rpc or not self.reconciler:
+            return
+        try:
+            self.reconciler.run()
+        except Exception as e:
+            LOG.exception(_('Error reconciling services' + str(e.message)))
+
     @periodic_task.periodic_task(spacing=30)
     def collect_stats(self, context):
         if not self.plugin_rpc:
             return
-        pool_services = copy.deepcopy(self.cache.services)
-        for pool_id in pool_services:
-            service = pool_services[pool_id]
+        try:
+            self.lbdriver.refresh_stats()
+        except NotImplementedError:
+            pass  # Not all drivers will support this
+        except Exception as e:
+            LOG.exception(_('Error collecting stats' + str(e.message)))
+        pools_stats = {}
+        pool_services = list(self.cache.services.values())
+        for service in pool_services:
             if self.agent_host == service.agent_host:
                 try:
                     LOG.debug("collecting stats for pool %s" % service.pool_id)
-                    stats = self.lbdriver.get_stats(
-                        self.plugin_rpc.get_service_by_pool_id(
+                    if not service.service or \
+                            self.cache.is_pending(service.service):
+                        # not delivered since the cache was reset, or
+                        # delivered before the driver reported statuses
+                        pool_service = self.plugin_rpc.get_service_by_pool_id(
                             service.pool_id,
                             self.conf.f5_global_routed_mode
                         )
-                    )
+                        if not pool_service or not pool_service['pool']:
+                            continue
+                        self.cache.put(pool_service, self.agent_host)
+                    stats = self.lbdriver.get_stats(service.service)
                     if stats:
-                        self.plugin_rpc.update_pool_stats(service.pool_id,
-                                                          stats)
+                        stats = self.stats_filter.filter(
+                            service.pool_id, stats, service.version)
+                    if stats:
+                        pools_stats[service.pool_id] = stats
                 except Exception as e:
                     LOG.exception(_('Error upating stats' + str(e.message)))
                     self.needs_resync = True
+        self.stats_filter.purge(
+            set(service.pool_id for service in pool_services))
+        self._update_pools_stats(pools_stats)
+
+    def _update_pools_stats(self, pools_stats):
+        """ Send stats to the plugin, many pools per message """
+        batch_size = self.conf.f5_stats_batch_size
+        pool_ids = list(pools_stats.keys())
+        if self.bulk_stats_supported and batch_size > 0:
+            while pool_ids:
+                batch = dict((pool_id, pools_stats[pool_id])
+                             for pool_id in pool_ids[:batch_size])
+                try:
+                    self.plugin_rpc.update_pools_stats(batch)
+                except Exception as e:
+                    LOG.warning(_('Bulk stats update failed, sending stats '
+                                  'per pool: %s' % str(e.message)))
+                    if is_unsupported_method(e):
+                        self.bulk_stats_supported = False
+                    # otherwise try again in the next cycle
+                    break
+                del pool_ids[:batch_size]
+        for pool_id in pool_ids:
+            try:
+                self.plugin_rpc.update_pool_stats(pool_id,
+                                                  pools_stats[pool_id])
+            except Exception as e:
+                LOG.exception(_('Error upating stats' + str(e.message)))
+                self.stats_filter.forget(pool_id)
+                self.needs_resync = True
 
-    @periodic_task.periodic_task(spacing=600)
+    @periodic_task.periodic_task(spacing=60)
     def backup_configuration(self, context):
         self.lbdriver.backup_configuration()
 
+    def save_configuration(self):
+        """ Save what a bulk operation changed without waiting for
+            the next periodic save """
+        try:
+            self.lbdriver.backup_configuration()
+        except NotImplementedError:
+            pass  # Not all drivers will support this
+        except Exception as exc:
+            LOG.error(_('Unable to save configuration: %s' % exc.message))
+
+    def verify_driver_cache(self):
+        """ Let the driver drop cached objects which are gone from the
+            devices, or flush its cache if it can not tell """
+        try:
+            self.lbdriver.verify_cache()
+        except NotImplementedError:
+            self.lbdriver.flush_cache()
+        except Exception as exc:
+            LOG.error(_('Unable to verify driver cache, flushing it: %s'
+                        % exc.message))
+            self.lbdriver.flush_cache()
+
+    def warm_driver_cache(self, tenant_ids):
+        """ Let the driver load the state of the tenants, so their
+            services do not need to query it one by one """
+        try:
+            self.lbdriver.warm_cache(tenant_ids)
+        except NotImplementedError:
+            pass
+        except Exception as exc:
+            LOG.error(_('Unable to warm driver cache: %s' % exc.message))
+
     def tunnel_sync(self):
         LOG.debug("manager:tunnel_sync: calling driver tunnel_sync")
         return self.lbdriver.tunnel_sync()
@@ -485,9 +727,11 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             # or for this agents env + group if using specific env
             active_pools = self.plugin_rpc.get_active_pools()
             active_pool_ids = set()
+            tenant_ids = {}
             for pool in active_pools:
                 if self.agent_host == pool['agent_host']:
                     active_pool_ids.add(pool['pool_id'])
+                    tenant_ids[pool['pool_id']] = pool['tenant_id']
             LOG.debug(_('plugin produced the list of active pool ids: %s'
                         % list(active_pool_ids)))
             LOG.debug(_('currently known pool ids before sync are: %s'
@@ -496,10 +740,30 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             # not know about.
             for deleted_id in known_services - active_pool_ids:
                 self.destroy_service(deleted_id)
+            if not self.driver_cache_warm:
+                self.driver_cache_warm = True
+                self.warm_driver_cache(set(tenant_ids.values()))
+            validate_cached = self.validate_cached_services
+            self.validate_cached_services = False
+            # one query for all pools instead of one per pool
+            existing_pool_ids = self.get_existing_pool_ids()
+            cached_pool_ids = set()
             # validate each service we are supposed to know about
             for pool_id in active_pool_ids:
-                if not self.cache.get_by_pool_id(pool_id):
+                if self.cache.get_by_pool_id(pool_id):
+                    cached_pool_ids.add(pool_id)
+                elif existing_pool_ids is None or not self.reconciler:
+                    # without a reconciler a pool cached before its
+                    # definition would never be validated
                     self.validate_service(pool_id)
+                elif pool_id in existing_pool_ids:
+                    # validated when the reconciler reaches it
+                    self.cache.put_pool(pool_id, tenant_ids[pool_id],
+                                        self.agent_host)
+                else:
+                    LOG.error(_('active pool %s is not on BIG-IP.. syncing'
+                                % pool_id))
+                    self.refresh_service(pool_id)
             # this produces a list of pools with pending tasks
             # to be performed
             pending_pools = self.plugin_rpc.get_pending_pools()
@@ -512,6 +776,33 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             # complete each pending task
             for pool_id in pending_pool_ids:
                 self.refresh_service(pool_id)
+            # refresh cached services which changed on the plugin,
+            # pending services were refreshed already. The reconciler
+            # checks the cached services over time instead.
+            cached_pool_ids -= pending_pool_ids
+            if self.reconciler:
+                changed_pool_ids = set()
+            else:
+                changed_pool_ids = self.get_changed_pool_ids(
+                    cached_pool_ids)
+            if changed_pool_ids is None:
+                # the plugin can not tell, validate them all
+                if validate_cached:
+                    for pool_id in cached_pool_ids:
+                        self.validate_service(pool_id)
+            else:
+                LOG.debug(_('%d of %d cached services changed'
+                            % (len(changed_pool_ids), len(cached_pool_ids))))
+                for pool_id in changed_pool_ids:
+                    self.refresh_service(pool_id)
+                if validate_cached:
+                    for pool_id in cached_pool_ids - changed_pool_ids:
+                        if existing_pool_ids is None:
+                            self.validate_cached_service(pool_id)
+                        elif pool_id not in existing_pool_ids:
+                            LOG.error(_('active pool %s is not on BIG-IP..'
+                                        ' syncing' % pool_id))
+                            self.refresh_service(pool_id)
             # get a list of any cached service we know now after
             # refreshing services
             known_services = set()
@@ -523,6 +814,7 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
             # remove any orphaned services we find on the bigips
             all_pools = self.plugin_rpc.get_all_pools()
             self.remove_orphans(all_pools)
+            self.save_configuration()
         except Exception:
             LOG.exception(_('Unable to retrieve ready services'))
             resync = True
@@ -555,6 +847,69 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
                 LOG.exception(_('Unable to validate service for pool: %s' +
                                 str(e.message)), pool_id)
 
+    def get_existing_pool_ids(self):
+        """ Ids of the pools on the devices, None if the driver can
+            not list them """
+        try:
+            return self.lbdriver.get_existing_pool_ids()
+        except NotImplementedError:
+            return None
+        except Exception as exc:
+            LOG.error(_('Unable to list pools on the devices: %s'
+                        % exc.message))
+            return None
+
+    def get_changed_pool_ids(self, pool_ids):
+        """ Ids of the cached pools whose service definition on the
+            plugin differs from the cached one. None if the plugin
+            does not support service hashes. """
+        if not self.service_hashes_supported:
+            return None
+        pool_ids = list(pool_ids)
+        changed_pool_ids = set()
+        batch_size = constants.SERVICE_HASH_BATCH_SIZE
+        for start in range(0, len(pool_ids), batch_size):
+            batch = pool_ids[start:start + batch_size]
+            try:
+                hashes = self.plugin_rpc.get_service_hashes(
+                    batch, self.conf.f5_global_routed_mode)
+            except Exception as e:
+                LOG.warning(_('Service hashes are not available, '
+                              'validating services: %s' % str(e.message)))
+                if is_unsupported_method(e):
+                    self.service_hashes_supported = False
+                return None
+            for pool_id in batch:
+                service = self.cache.get_by_pool_id(pool_id)
+                if service is None or service.service is None:
+                    # the definition was not fetched yet
+                    continue
+                if hashes.get(pool_id) != service.service_hash:
+                    changed_pool_ids.add(pool_id)
+        return changed_pool_ids
+
+    @log.log
+    def validate_cached_service(self, pool_id):
+        """ Sync a cached service if it is missing on the devices.
+            Returns True if it was missing. """
+        service = self.cache.get_service_by_pool_id(pool_id)
+        if not service:
+            if self.cache.get_by_pool_id(pool_id):
+                # the definition was not fetched yet
+                self.validate_service(pool_id)
+            return False
+        try:
+            if not self.lbdriver.exists(service):
+                LOG.error(_('active pool %s is not on BIG-IP.. syncing'
+                            % pool_id))
+                self.lbdriver.sync(service)
+                return True
+        except NeutronException as exc:
+            LOG.error("NeutronException: %s" % exc.msg)
+        except Exception as exc:
+            LOG.error("Exception: %s" % exc.message)
+            self.needs_resync = True
+
     @log.log
     def refresh_service(self, pool_id):
         if not self.plugin_rpc:
@@ -794,7 +1149,7 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         try:
             LOG.debug(_('received add_fdb_entries: %s host: %s'
                         % (fdb_entries, host)))
-            self.lbdriver.fdb_add(fdb_entries)
+            self.fdb_aggregator.add(fdb_entries)
         except NeutronException as exc:
             LOG.error("fdb_add: NeutronException: %s" % exc.msg)
         except Exception as exc:
@@ -806,7 +1161,7 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         try:
             LOG.debug(_('received remove_fdb_entries: %s host: %s'
                         % (fdb_entries, host)))
-            self.lbdriver.fdb_remove(fdb_entries)
+            self.fdb_aggregator.remove(fdb_entries)
         except NeutronException as exc:
             LOG.error("remove_fdb_entries: NeutronException: %s" % exc.msg)
         except Exception as exc:
@@ -818,7 +1173,8 @@ class LbaasAgentManagerBase(periodic_task.PeriodicTasks):
         try:
             LOG.debug(_('received update_fdb_entries: %s host: %s'
                         % (fdb_entries, host)))
-            self.lbdriver.fdb_update(fdb_entries)
+            # the driver applies updates as adds
+            self.fdb_aggregator.add(fdb_entries)
         except NeutronException as exc:
             LOG.error("update_fdb_entrie: NeutronException: %s" % exc.msg)
         except Exception as exc:
@@ -16,6 +16,9 @@
 # Service resync interval
 RESYNC_INTERVAL = 300
 
+# Pools whose service hashes are requested in one message
+SERVICE_HASH_BATCH_SIZE = 100
+
 # Topic for tunnel notifications between the plugin and agent
 TUNNEL = 'tunnel'
 
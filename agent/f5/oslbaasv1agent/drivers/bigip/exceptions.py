@@ -16,3 +16,13 @@
 
 class InvalidNetworkType(Exception):
     pass
+
+
+class DeviceFanoutException(Exception):
+    """ A step failed on more than one BIG-IP. errors maps the
+        hostnames of the failed BIG-IPs to their exceptions. """
+    def __init__(self, errors):
+        self.errors = errors
+        super(DeviceFanoutException, self).__init__(
+            '; '.join('%s: %s' % (hostname, errors[hostname])
+                      for hostname in sorted(errors)))
@@ -0,0 +1,88 @@
+""" Apply configuration steps to several BIG-IPs concurrently """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+try:
+    from neutron.openstack.common import log as logging
+except ImportError:
+    from oslo_log import log as logging
+from eventlet import corolocal
+from eventlet import greenpool
+from f5.oslbaasv1agent.drivers.bigip.exceptions import DeviceFanoutException
+
+LOG = logging.getLogger(__name__)
+
+
+class DeviceFanout(object):
+    """ Runs a step on a list of BIG-IPs, one greenthread per device.
+
+        A step returns only when it has finished on every device, so
+        the steps of a service are applied to each device in order.
+        When the step fails on one device its exception is raised,
+        when it fails on several a DeviceFanoutException holding the
+        error of each device is raised. The step is never abandoned
+        half way on the other devices.
+
+        A step which fans out again runs its fanout inline, since it
+        would otherwise wait for workers held by its own fanout. """
+
+    def __init__(self, workers=4):
+        self.workers = max(1, int(workers))
+        self.pool = greenpool.GreenPool(self.workers)
+        # set in the greenthreads running a step
+        self._local = corolocal.local()
+
+    def run(self, bigips, method, *args, **kwargs):
+        """ Call method(bigip, *args, **kwargs) for every bigip.
+            Returns the results in the order of bigips. """
+        bigips = list(bigips)
+        if self.workers < 2 or len(bigips) < 2 or \
+                getattr(self._local, 'in_fanout', False):
+            return [method(bigip, *args, **kwargs) for bigip in bigips]
+
+        threads = []
+        for bigip in bigips:
+            # reads cached by the caller stay valid for its steps
+            read_cache = bigip.icr_session.get_read_cache()
+            threads.append(self.pool.spawn(
+                self._run_on_bigip, bigip, read_cache, method, args,
+                kwargs))
+
+        results = []
+        errors = {}
+        for bigip, thread in zip(bigips, threads):
+            (result, exc) = thread.wait()
+            results.append(result)
+            if exc is not None:
+                errors[bigip.icr_session.hostname] = exc
+        if len(errors) == 1:
+            raise list(errors.values())[0]
+        elif errors:
+            raise DeviceFanoutException(errors)
+        return results
+
+    def _run_on_bigip(self, bigip, read_cache, method, args, kwargs):
+        """ Run method in a fanout greenthread """
+        self._local.in_fanout = True
+        bigip.icr_session.set_read_cache(read_cache)
+        try:
+            return (method(bigip, *args, **kwargs), None)
+        except Exception as exc:
+            # the traceback is lost when the caller raises exc
+            LOG.exception('%s failed on %s'
+                          % (getattr(method, '__name__', 'step'),
+                             bigip.icr_session.hostname))
+            return (None, exc)
+        finally:
+            bigip.icr_session.set_read_cache(None)
@@ -0,0 +1,127 @@
+""" Debounced merging of L2 population fdb updates """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+try:
+    from neutron.openstack.common import log as logging
+except ImportError:
+    from oslo_log import log as logging
+from eventlet import greenthread
+
+LOG = logging.getLogger(__name__)
+
+
+class FdbAggregator(object):
+    """ Collects the fdb entries of L2 population messages for a
+        short interval and hands the net result to the driver.
+
+        An entry is a (mac, ip) pair behind a tunnel endpoint of a
+        network. When the same entry is added and removed within the
+        interval only the last operation is applied. Removes are
+        applied before adds, so every tunnel gets at most one update
+        for each per interval, however many messages named it. """
+
+    def __init__(self, manager, interval):
+        self.manager = manager
+        self.interval = interval
+        # network id -> {'network_type', 'segment_id',
+        #                'ports': {vtep: {(mac, ip): add}}}
+        self.pending = {}
+        self.flush_thread = None
+        self.stats = {'messages': 0,
+                      'merged': 0,
+                      'flushes': 0}
+
+    def add(self, fdb_entries):
+        """ Add the fdb entries of an add or update message """
+        self._merge(fdb_entries, True)
+
+    def remove(self, fdb_entries):
+        """ Remove the fdb entries of a remove message """
+        self._merge(fdb_entries, False)
+
+    def flush(self):
+        """ Apply the pending fdb entries """
+        self.flush_thread = None
+        pending = self.pending
+        self.pending = {}
+        if not pending:
+            return
+        self.stats['flushes'] += 1
+        lbdriver = self.manager.lbdriver
+        remove_fdb = self._get_fdb(pending, False)
+        if remove_fdb:
+            try:
+                lbdriver.fdb_remove(remove_fdb)
+            except Exception as exc:
+                LOG.error("fdb_remove: Exception: %s" % exc.message)
+        add_fdb = self._get_fdb(pending, True)
+        if add_fdb:
+            try:
+                lbdriver.fdb_add(add_fdb)
+            except Exception as exc:
+                LOG.error("fdb_add: Exception: %s" % exc.message)
+
+    def get_stats(self):
+        """ Pending networks and entries, merge and flush counts """
+        stats = dict(self.stats)
+        stats['pending_networks'] = len(self.pending)
+        stats['pending_entries'] = 0
+        for net_fdb in self.pending.values():
+            for entries in net_fdb['ports'].values():
+                stats['pending_entries'] += len(entries)
+        return stats
+
+    def _merge(self, fdb_entries, add):
+        """ Record the entries and schedule a flush """
+        self.stats['messages'] += 1
+        for network_id, net_fdb in fdb_entries.items():
+            if 'ports' not in net_fdb:
+                LOG.debug("ignoring fdb entries of network %s without "
+                          "ports: %s" % (network_id, net_fdb))
+                continue
+            pending_net = self.pending.setdefault(network_id,
+                                                  {'ports': {}})
+            pending_net['network_type'] = net_fdb['network_type']
+            pending_net['segment_id'] = net_fdb['segment_id']
+            for vtep, entries in net_fdb['ports'].items():
+                pending_vtep = pending_net['ports'].setdefault(vtep, {})
+                for entry in entries:
+                    key = (entry[0], entry[1])
+                    if key in pending_vtep:
+                        self.stats['merged'] += 1
+                    pending_vtep[key] = add
+        if self.interval <= 0:
+            self.flush()
+        elif self.flush_thread is None:
+            self.flush_thread = greenthread.spawn_after(self.interval,
+                                                        self.flush)
+
+    @staticmethod
+    def _get_fdb(pending, add):
+        """ L2 population fdb of the pending adds or removes """
+        fdb = {}
+        for network_id, pending_net in pending.items():
+            ports = {}
+            for vtep, pending_vtep in pending_net['ports'].items():
+                entries = [[mac, ip] for ((mac, ip), entry_add)
+                           in pending_vtep.items() if entry_add == add]
+                if entries:
+                    ports[vtep] = entries
+            if ports:
+                fdb[network_id] = {'network_type':
+                                   pending_net['network_type'],
+                                   'segment_id': pending_net['segment_id'],
+                                   'ports': ports}
+        return fdb
@@ -40,6 +40,10 @@ from f5.oslbaasv1agent.drivers.bigip.tenants import BigipTenantManager
 from f5.oslbaasv1agent.drivers.bigip.fdb_connector_ml2 import FDBConnectorML2
 from f5.oslbaasv1agent.drivers.bigip.l2 import BigipL2Manager
 from f5.oslbaasv1agent.drivers.bigip.network_direct import NetworkBuilderDirect
+from f5.oslbaasv1agent.drivers.bigip.stats import BigipStatsCollector
+from f5.oslbaasv1agent.drivers.bigip.fanout import DeviceFanout
+from f5.oslbaasv1agent.drivers.bigip.sync_scheduler import \
+    ConfigSyncScheduler
 import f5.oslbaasv1agent.drivers.bigip.lbaas_iapp as lbaas_iapp
 from f5.oslbaasv1agent.drivers.bigip.lbaas_bigip \
     import LBaaSBuilderBigipObjects, LBaaSBuilderBigipIApp
@@ -57,12 +61,18 @@ import uuid
 import urllib2
 import datetime
 import hashlib
+import os
+import random
+import re
 from time import time
 import logging as std_logging
 
 LOG = logging.getLogger(__name__)
 NS_PREFIX = 'qlbaas-'
 __VERSION__ = '0.1.1'
+# neutron ids in BIG-IP object names
+UUID_PATTERN = re.compile(
+    '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}')
 
 # plugin_const.CREATED added in juno.  PLUGIN_CREATED_FLAG is used for
 # backward compatibility
@@ -141,6 +151,26 @@ OPTS = [
         'f5_sync_mode', default='replication',
         help=_('The sync mechanism: autosync or replication'),
     ),
+    cfg.IntOpt(
+        'f5_sync_max_time', default=300,
+        help=_('Seconds after which a device group config sync, '
+               'including its retries, is given up'),
+    ),
+    cfg.IntOpt(
+        'f5_sync_window', default=5,
+        help=_('Seconds a config sync requested by a service may be '
+               'delayed to be combined with the syncs of other services'),
+    ),
+    cfg.IntOpt(
+        'f5_config_save_interval', default=300,
+        help=_('Minimum seconds between saves of the configuration of a '
+               'device. Devices are only saved after they changed.'),
+    ),
+    cfg.IntOpt(
+        'f5_device_fanout_workers', default=4,
+        help=_('How many BIG-IPs a configuration step is applied to '
+               'concurrently'),
+    ),
     cfg.StrOpt(
         'f5_vtep_folder', default='Common',
         help=_('Folder for the VTEP SelfIP'),
@@ -217,6 +247,14 @@ OPTS = [
         'icontrol_connection_retry_interval', default=10,
         help=_('How many seconds to wait between retry connection attempts'),
     ),
+    cfg.BoolOpt(
+        'icontrol_token_auth', default=True,
+        help=_('Use X-F5-Auth-Token instead of basic auth for iControl REST'),
+    ),
+    cfg.IntOpt(
+        'icontrol_connection_pool_size', default=10,
+        help=_('How many iControl REST connections to keep open per device'),
+    ),
     cfg.DictOpt(
         'common_network_ids', default={},
         help=_('network uuid to existing Common networks mapping')
@@ -272,6 +310,15 @@ class iControlDriver(LBaaSBaseDriver):
         # BIG-IP containers
         self.__bigips = {}
         self.__traffic_groups = []
+        # hostname -> time of the last configuration save
+        self.__config_saves = {}
+        self.config_save_stats = {'saves': 0, 'clean': 0, 'deferred': 0}
+        self.agent_configurations['config_save_stats'] = \
+            self.config_save_stats
+        # hostname -> counts of the last orphan purge
+        self.orphan_purge_stats = {}
+        self.agent_configurations['orphan_purge_stats'] = \
+            self.orphan_purge_stats
 
         if self.conf.f5_global_routed_mode:
             LOG.info(_('WARNING - f5_global_routed_mode enabled.'
@@ -318,6 +365,9 @@ class iControlDriver(LBaaSBaseDriver):
         self.lbaas_builder_bigip_iapp = None
         self.lbaas_builder_bigip_objects = None
         self.lbaas_builder_bigiq_iapp = None
+        self.stats_collector = None
+        self.device_fanout = None
+        self.sync_scheduler = None
 
         self._init_bigip_managers()
         self.connect_bigips()
@@ -353,6 +403,13 @@ class iControlDriver(LBaaSBaseDriver):
         self.vcmp_manager = VcmpManager(self)
         self.tenant_manager = BigipTenantManager(
             self.conf, self)
+        self.stats_collector = BigipStatsCollector(self)
+        self.device_fanout = DeviceFanout(self.conf.f5_device_fanout_workers)
+        if self.conf.f5_sync_window > 0:
+            self.sync_scheduler = ConfigSyncScheduler(
+                self, self.conf.f5_sync_window)
+            self.agent_configurations['config_sync_stats'] = \
+                self.sync_scheduler.stats
 
         if self.conf.vlan_binding_driver:
             try:
@@ -464,6 +521,12 @@ class iControlDriver(LBaaSBaseDriver):
             if self.conf.icontrol_connection_timeout:
                 f5const.CONNECTION_TIMEOUT = \
                     self.conf.icontrol_connection_timeout
+            f5const.ICR_TOKEN_AUTH = self.conf.icontrol_token_auth
+            if self.conf.icontrol_connection_pool_size:
+                f5const.ICR_POOL_SIZE = \
+                    self.conf.icontrol_connection_pool_size
+            if self.conf.f5_sync_max_time:
+                f5const.SYNC_MAX_TIME = self.conf.f5_sync_max_time
 
             first_bigip = self._open_bigip(self.hostnames[0])
             self._init_bigip(first_bigip, self.hostnames[0], None)
@@ -478,6 +541,16 @@ class iControlDriver(LBaaSBaseDriver):
                 self._init_bigip(bigip, hostname, device_group_name)
                 self.__bigips[hostname] = bigip
 
+            # cache and sync stats are reported with the agent state,
+            # request counts and latencies by get_icontrol_rest_stats
+            self.agent_configurations['folder_cache_stats'] = {}
+            self.agent_configurations['config_sync_latency'] = {}
+            for hostname in self.__bigips:
+                self.agent_configurations['folder_cache_stats'][hostname] = \
+                    self.__bigips[hostname].system.folder_cache_stats
+                self.agent_configurations['config_sync_latency'][
+                    hostname] = self.__bigips[hostname].cluster.sync_stats
+
             self.connected = True
 
         except NeutronException as exc:
@@ -497,7 +570,9 @@ class iControlDriver(LBaaSBaseDriver):
                    (self.conf.icontrol_username, hostname)))
         return f5_bigip.BigIP(hostname, self.conf.icontrol_username,
                               self.conf.icontrol_password,
-                              f5const.CONNECTION_TIMEOUT)
+                              f5const.CONNECTION_TIMEOUT,
+                              token_auth=f5const.ICR_TOKEN_AUTH,
+                              pool_size=f5const.ICR_POOL_SIZE)
 
     def _init_bigip(self, bigip, hostname, check_group_name=None):
         """ Prepare a bigip for usage """
@@ -549,7 +624,7 @@ class iControlDriver(LBaaSBaseDriver):
         bigip.mac_addresses = bigip.interface.get_mac_addresses()
         bigip.device_interfaces = \
             bigip.interface.get_interface_macaddresses_dict()
-        bigip.assured_networks = []
+        bigip.assured_networks = {}
         bigip.assured_tenant_snat_subnets = {}
         bigip.assured_gateway_subnets = []
 
@@ -680,7 +755,7 @@ class iControlDriver(LBaaSBaseDriver):
         if self.fdb_connector:
             self.fdb_connector.set_l2pop_rpc(l2pop_rpc)
 
-    @serialized('exists')
+    @serialized('exists', background=True)
     @is_connected
     def exists(self, service):
         """Check that service exists"""
@@ -689,66 +764,131 @@ class iControlDriver(LBaaSBaseDriver):
     def flush_cache(self):
         """Remove cached objects so they can be created if necessary"""
         for bigip in self.get_all_bigips():
-            bigip.assured_networks = []
+            bigip.assured_networks = {}
             bigip.assured_tenant_snat_subnets = {}
             bigip.assured_gateway_subnets = []
 
+    @serialized('verify_cache', background=True)
+    @is_connected
+    def verify_cache(self):
+        """ Remove cached objects which are no longer on the devices.
+            Runs exclusively, so no service assures objects meanwhile.
+            The cache is flushed if the devices can not be queried. """
+        try:
+            self.fanout(self.get_all_bigips(), self._verify_bigip_cache)
+        except Exception as exc:
+            LOG.error(_('Unable to verify cache, flushing it: %s'
+                        % exc.message))
+            self.flush_cache()
+
+    @serialized('warm_cache', background=True)
+    @is_connected
+    def warm_cache(self, tenant_ids):
+        """ Load the route domains of tenants from the devices """
+        if self.network_builder and self.conf.use_namespaces and \
+                not self.conf.f5_global_routed_mode:
+            self.network_builder.warm_rds_cache(tenant_ids)
+
+    @staticmethod
+    def _verify_bigip_cache(bigip):
+        """ Remove the networks, gateways and SNAT subnets assured on
+            bigip whose objects are gone, so the next service using
+            them creates them again. Objects assured while the device
+            is being queried are kept. """
+        networks = list(bigip.assured_networks.items())
+        gateway_subnets = list(bigip.assured_gateway_subnets)
+        snat_subnets = [(tenant_id, list(subnet_ids)) for
+                        (tenant_id, subnet_ids) in
+                        bigip.assured_tenant_snat_subnets.items()]
+
+        # names without folders of all vlans, tunnels, selfips and
+        # snat addresses on the device
+        network_names = set(bigip.vlan.get_vlans(folder=None))
+        network_names.update(bigip.vxlan.get_tunnels(folder=None) or [])
+        network_names.update(bigip.l2gre.get_tunnels(folder=None) or [])
+        selfip_subnet_ids = _object_ids(
+            bigip.selfip.get_selfip_list(folder=None))
+        snat_subnet_ids = _object_ids(
+            bigip.snat.get_snataddresses(folder=None))
+
+        total = len(networks) + len(gateway_subnets)
+        removed = 0
+        for (network_id, network_name) in networks:
+            if os.path.basename(network_name) not in network_names:
+                bigip.assured_networks.pop(network_id, None)
+                removed += 1
+        for subnet_id in gateway_subnets:
+            if subnet_id not in selfip_subnet_ids and \
+                    subnet_id in bigip.assured_gateway_subnets:
+                bigip.assured_gateway_subnets.remove(subnet_id)
+                removed += 1
+        for (tenant_id, subnet_ids) in snat_subnets:
+            assured = bigip.assured_tenant_snat_subnets.get(tenant_id, [])
+            total += len(subnet_ids)
+            for subnet_id in subnet_ids:
+                if subnet_id not in snat_subnet_ids and \
+                        subnet_id in assured:
+                    assured.remove(subnet_id)
+                    removed += 1
+        LOG.debug(_('verified cached networking of %s: %d of %d entries '
+                    'removed' % (bigip.icr_session.hostname, removed, total)))
+
     # pylint: disable=unused-argument
-    @serialized('create_vip')
+    @serialized('create_vip', coalesce=True)
     @is_connected
     def create_vip(self, vip, service):
         """Create virtual server"""
         self._common_service_handler(service)
 
-    @serialized('update_vip')
+    @serialized('update_vip', coalesce=True)
     @is_connected
     def update_vip(self, old_vip, vip, service):
         """Update virtual server"""
         self._common_service_handler(service)
 
-    @serialized('delete_vip')
+    @serialized('delete_vip', coalesce=True)
     @is_connected
     def delete_vip(self, vip, service):
         """Delete virtual server"""
         self._common_service_handler(service)
 
-    @serialized('create_pool')
+    @serialized('create_pool', coalesce=True)
     @is_connected
     def create_pool(self, pool, service):
         """Create lb pool"""
         self._common_service_handler(service)
 
-    @serialized('update_pool')
+    @serialized('update_pool', coalesce=True)
     @is_connected
     def update_pool(self, old_pool, pool, service):
         """Update lb pool"""
         self._common_service_handler(service)
 
-    @serialized('delete_pool')
+    @serialized('delete_pool', coalesce=True)
     @is_connected
     def delete_pool(self, pool, service):
         """Delete lb pool"""
         self._common_service_handler(service)
 
-    @serialized('create_member')
+    @serialized('create_member', coalesce=True)
     @is_connected
     def create_member(self, member, service):
         """Create pool member"""
         self._common_service_handler(service)
 
-    @serialized('update_member')
+    @serialized('update_member', coalesce=True)
     @is_connected
     def update_member(self, old_member, member, service):
         """Update pool member"""
         self._common_service_handler(service)
 
-    @serialized('delete_member')
+    @serialized('delete_member', coalesce=True)
     @is_connected
     def delete_member(self, member, service):
         """Delete pool member"""
         self._common_service_handler(service)
 
-    @serialized('create_pool_health_monitor')
+    @serialized('create_pool_health_monitor', coalesce=True)
     @is_connected
     def create_pool_health_monitor(self, health_monitor, pool, service):
         """Create pool health monitor"""
@@ -798,6 +938,11 @@ class iControlDriver(LBaaSBaseDriver):
         return True
     # pylint: enable=unused-argument
 
+    @is_connected
+    def refresh_stats(self):
+        """ Collect stats of all pools for the following get_stats """
+        self.stats_collector.refresh()
+
     @is_connected
     def get_stats(self, service):
         """Get service stats"""
@@ -810,19 +955,30 @@ class iControlDriver(LBaaSBaseDriver):
         stats[lb_const.STATS_TOTAL_CONNECTIONS] = 0
         # add a members stats return dictionary
         members = {}
-        for hostbigip in self.get_all_bigips():
-            # It appears that stats are collected for pools in a pending delete
-            # state which means that if those messages are queued (or delayed)
-            # it can result in the process of a stats request after the pool
-            # and tenant are long gone. Check if the tenant exists.
-            if not service['pool'] or not hostbigip.system.folder_exists(
-               bigip_interfaces.OBJ_PREFIX + service['pool']['tenant_id']):
+        if not service['pool']:
+            return None
+        # only query BIG-IP pool members if they
+        # not in a state indicating provisioning or error
+        # provisioning the pool member
+        update_if_status = [plugin_const.ACTIVE,
+                            plugin_const.DOWN,
+                            plugin_const.INACTIVE]
+        if PLUGIN_CREATED_FLAG not in update_if_status:
+            update_if_status.append(PLUGIN_CREATED_FLAG)
+        # are we have members who are in a
+        # state to update there status
+        some_members_require_status_update = False
+        for member in service.get('members', []):
+            if member['status'] in update_if_status:
+                some_members_require_status_update = True
+
+        all_bigip_stats = self.fanout(self.get_all_bigips(),
+                                      self._get_bigip_stats, service,
+                                      some_members_require_status_update)
+        for bigip_stats in all_bigip_stats:
+            if bigip_stats is None:
                 return None
-            pool = service['pool']
-            pool_stats = hostbigip.pool.get_statistics(
-                name=pool['id'],
-                folder=pool['tenant_id'],
-                config_mode=self.conf.icontrol_config_mode)
+            (pool_stats, monitor_states) = bigip_stats
             if 'STATISTIC_SERVER_SIDE_BYTES_IN' in pool_stats:
                 stats[lb_const.STATS_IN_BYTES] += \
                     pool_stats['STATISTIC_SERVER_SIDE_BYTES_IN']
@@ -833,74 +989,92 @@ class iControlDriver(LBaaSBaseDriver):
                 stats[lb_const.STATS_TOTAL_CONNECTIONS] += \
                     pool_stats['STATISTIC_SERVER_SIDE_TOTAL_CONNECTIONS']
                 # are there members to update status
-                if 'members' in service:
-                    # only query BIG-IP pool members if they
-                    # not in a state indicating provisioning or error
-                    # provisioning the pool member
-                    some_members_require_status_update = False
-                    update_if_status = [plugin_const.ACTIVE,
-                                        plugin_const.DOWN,
-                                        plugin_const.INACTIVE]
-                    if PLUGIN_CREATED_FLAG not in update_if_status:
-                        update_if_status.append(PLUGIN_CREATED_FLAG)
-
+                if monitor_states is not None:
                     for member in service['members']:
                         if member['status'] in update_if_status:
-                            some_members_require_status_update = True
-                    # are we have members who are in a
-                    # state to update there status
-                    if some_members_require_status_update:
-                        # query pool members on each BIG-IP
-                        monitor_states = \
-                            hostbigip.pool.get_members_monitor_status(
-                                name=pool['id'],
-                                folder=pool['tenant_id'],
-                                config_mode=self.conf.icontrol_config_mode
-                            )
-                        for member in service['members']:
-                            if member['status'] in update_if_status:
-                                # create the entry for this
-                                # member in the return status
-                                # dictionary set to ACTIVE
-                                if not member['id'] in members:
-                                    members[member['id']] = \
-                                        {'status': plugin_const.INACTIVE}
-                                # check if it down or up by monitor
-                                # and update the status
-                                for state in monitor_states:
-                                    # matched the pool member
-                                    # by address and port number
-                                    if member['address'] == \
-                                            strip_domain_address(
-                                            state['addr']) and \
-                                            int(member['protocol_port']) == \
-                                            int(state['port']):
-                                        # if the monitor says member is up
-                                        if state['state'] == \
-                                                'MONITOR_STATUS_UP' or \
-                                           state['state'] == \
-                                                'MONITOR_STATUS_UNCHECKED':
-                                            # set ACTIVE as long as the
-                                            # status was not set to 'DOWN'
-                                            # on another BIG-IP
-                                            if members[
-                                                member['id']]['status'] != \
-                                                    'DOWN':
-                                                if member['admin_state_up']:
-                                                    members[member['id']][
-                                                        'status'] = \
-                                                        plugin_const.ACTIVE
-                                                else:
-                                                    members[member['id']][
-                                                        'status'] = \
-                                                        plugin_const.INACTIVE
-                                        else:
-                                            members[member['id']]['status'] = \
-                                                plugin_const.DOWN
+                            # create the entry for this
+                            # member in the return status
+                            # dictionary set to ACTIVE
+                            if not member['id'] in members:
+                                members[member['id']] = \
+                                    {'status': plugin_const.INACTIVE}
+                            # check if it down or up by monitor
+                            # and update the status
+                            for state in monitor_states:
+                                # matched the pool member
+                                # by address and port number
+                                if member['address'] == \
+                                        strip_domain_address(
+                                        state['addr']) and \
+                                        int(member['protocol_port']) == \
+                                        int(state['port']):
+                                    # if the monitor says member is up
+                                    if state['state'] == \
+                                            'MONITOR_STATUS_UP' or \
+                                       state['state'] == \
+                                            'MONITOR_STATUS_UNCHECKED':
+                                        # set ACTIVE as long as the
+                                        # status was not set to 'DOWN'
+                                        # on another BIG-IP
+                                        if members[
+                                            member['id']]['status'] != \
+                                                'DOWN':
+                                            if member['admin_state_up']:
+                                                members[member['id']][
+                                                    'status'] = \
+                                                    plugin_const.ACTIVE
+                                            else:
+                                                members[member['id']][
+                                                    'status'] = \
+                                                    plugin_const.INACTIVE
+                                    else:
+                                        members[member['id']]['status'] = \
+                                            plugin_const.DOWN
         stats['members'] = members
         return stats
 
-    @serialized('remove_orphans')
+    def _get_bigip_stats(self, hostbigip, service, get_monitor_states):
+        """ Pool stats and member monitor states of the service on
+            one bigip. None if the pool is not on the bigip. """
+        pool = service['pool']
+        use_table = self.stats_collector.has_table(hostbigip)
+        if use_table:
+            # pools missing from the table are not on the bigip
+            pool_stats = self.stats_collector.get_pool_statistics(
+                hostbigip, pool,
+                config_mode=self.conf.icontrol_config_mode)
+            if pool_stats is None:
+                return None
+        else:
+            # It appears that stats are collected for pools in a
+            # pending delete state which means that if those
+            # messages are queued (or delayed) it can result in the
+            # process of a stats request after the pool and tenant
+            # are long gone. Check if the tenant exists.
+            if not hostbigip.system.folder_exists(
+                    bigip_interfaces.OBJ_PREFIX + pool['tenant_id']):
+                return None
+            pool_stats = hostbigip.pool.get_statistics(
+                name=pool['id'],
+                folder=pool['tenant_id'],
+                config_mode=self.conf.icontrol_config_mode)
+        monitor_states = None
+        if get_monitor_states and \
+                'STATISTIC_SERVER_SIDE_BYTES_IN' in pool_stats:
+            # query pool members on each BIG-IP
+            if use_table:
+                monitor_states = \
+                    self.stats_collector.get_members_monitor_status(
+                        hostbigip, pool,
+                        config_mode=self.conf.icontrol_config_mode)
+            else:
+                monitor_states = hostbigip.pool.get_members_monitor_status(
+                    name=pool['id'],
+                    folder=pool['tenant_id'],
+                    config_mode=self.conf.icontrol_config_mode)
+        return (pool_stats, monitor_states)
+
+    @serialized('remove_orphans', background=True)
     def remove_orphans(self, all_pools):
         """ Remove out-of-date configuration on big-ips """
         existing_tenants = []
@@ -908,10 +1082,8 @@ class iControlDriver(LBaaSBaseDriver):
         for pool in all_pools:
             existing_tenants.append(pool['tenant_id'])
             existing_pools.append(pool['pool_id'])
-        for bigip in self.get_all_bigips():
-            bigip.pool.purge_orphaned_pools(existing_pools)
-        for bigip in self.get_all_bigips():
-            bigip.system.purge_orphaned_folders_contents(existing_tenants)
+        self.fanout(self.get_all_bigips(), self._purge_bigip_orphans,
+                    existing_pools, existing_tenants)
 
         sudslog = std_logging.getLogger('suds.client')
         sudslog.setLevel(std_logging.FATAL)
@@ -922,6 +1094,19 @@ class iControlDriver(LBaaSBaseDriver):
         for bigip in self.get_all_bigips():
             bigip.system.purge_orphaned_folders(existing_tenants)
 
+    def _purge_bigip_orphans(self, bigip, existing_pools, existing_tenants):
+        """ Purge orphaned pools and folder contents from one
+            inventory of bigip """
+        hostname = bigip.icr_session.hostname
+        stats = bigip.inventory.purge_orphans(existing_pools,
+                                              existing_tenants)
+        self.orphan_purge_stats[hostname] = stats
+        LOG.info(_('purged orphans on %s with %d REST calls in %.2f secs: '
+                   '%d pools, %d virtual servers, %d folders, %d errors'
+                   % (hostname, stats['rest_calls'], stats['time'],
+                      stats['pools'], stats['virtuals'], stats['folders'],
+                      stats['errors'])))
+
     def fdb_add(self, fdb):
         """ Add (L2toL3) forwarding database entries """
         self.remove_ips_from_fdb_update(fdb)
@@ -970,7 +1155,7 @@ class iControlDriver(LBaaSBaseDriver):
         if self.fdb_connector:
             self.fdb_connector.advertise_tunnel_ips(tunnel_ips)
 
-    @serialized('sync')
+    @serialized('sync', coalesce=True, background=True)
     @is_connected
     def sync(self, service):
         """Sync service defintion to device"""
@@ -986,14 +1171,58 @@ class iControlDriver(LBaaSBaseDriver):
         else:
             LOG.debug("Attempted sync of deleted pool")
 
-    @serialized('backup_configuration')
     @is_connected
     def backup_configuration(self):
-        """ Save Configuration on Devices """
+        """ Save the configuration of devices changed since their
+            last save, at most every f5_config_save_interval seconds.
+            Nothing is queued when no device needs a save. """
+        now = time()
+        dirty_bigips = []
         for bigip in self.get_all_bigips():
-            LOG.debug(_('_backup_configuration: saving device %s.'
-                        % bigip.icontrol.hostname))
-            bigip.cluster.save_config()
+            hostname = bigip.icr_session.hostname
+            if not bigip.icr_session.config_dirty():
+                self.config_save_stats['clean'] += 1
+            elif now - self.__config_saves.get(hostname, 0) < \
+                    self.conf.f5_config_save_interval:
+                self.config_save_stats['deferred'] += 1
+            else:
+                dirty_bigips.append(bigip)
+        if dirty_bigips:
+            self._backup_configurations(dirty_bigips)
+
+    @serialized('backup_configuration', background=True)
+    def _backup_configurations(self, bigips):
+        """ Save the configuration of bigips """
+        self.fanout(bigips, self._backup_bigip_configuration)
+
+    def _backup_bigip_configuration(self, bigip):
+        """ Save the configuration of bigip """
+        hostname = bigip.icr_session.hostname
+        LOG.debug(_('_backup_configuration: saving device %s.' % hostname))
+        bigip.cluster.save_config()
+        self.__config_saves[hostname] = time()
+        self.config_save_stats['saves'] += 1
+
+    @is_connected
+    def get_existing_pool_ids(self):
+        """ Ids of the pools which are on every bigip, from one query
+            per bigip """
+        if self.lbaas_builder_bigiq_iapp:
+            # pools may be deployed by BIG-IQ instead
+            raise NotImplementedError()
+        pool_ids = None
+        for bigip_pool_ids in self.fanout(self.get_all_bigips(),
+                                          self._get_bigip_pool_ids):
+            if pool_ids is None:
+                pool_ids = bigip_pool_ids
+            else:
+                pool_ids &= bigip_pool_ids
+        return pool_ids or set()
+
+    @staticmethod
+    def _get_bigip_pool_ids(bigip):
+        """ Ids of the pools on bigip """
+        return bigip.pool.get_all_pool_ids()
 
     def _service_exists(self, service):
         """ Returns whether the bigip has a pool for the service """
@@ -1016,6 +1245,22 @@ class iControlDriver(LBaaSBaseDriver):
 
     def _common_service_handler(self, service):
         """ Assure that the service is configured on bigip(s) """
+        # reads are repeated a lot while assuring a service,
+        # so reuse them until the service is done
+        bigips = self.get_all_bigips()
+        for bigip in bigips:
+            bigip.icr_session.begin_read_cache()
+        try:
+            self._assure_service(service)
+        finally:
+            saved_reads = 0
+            for bigip in bigips:
+                saved_reads += bigip.icr_session.end_read_cache()
+            LOG.debug("    read cache saved %d iControl REST reads"
+                      % saved_reads)
+
+    def _assure_service(self, service):
+        """ Configure the service on bigip(s) """
         start_time = time()
 
         if not service['pool']:
@@ -1093,7 +1338,7 @@ class iControlDriver(LBaaSBaseDriver):
         self._update_service_status(service)
 
         start_time = time()
-        self.sync_if_clustered()
+        self.sync_if_clustered(deferred=True)
         LOG.debug("    final sync took %.5f secs" % (time() - start_time))
 
     def _update_service_status(self, service):
@@ -1259,6 +1504,17 @@ class iControlDriver(LBaaSBaseDriver):
         """ Get all big-ips under management """
         return self.__bigips.values()
 
+    def get_icontrol_rest_stats(self):
+        """ iControl REST request counts and average latencies
+            of all big-ips, by hostname """
+        return dict((hostname, bigip.icr_session.get_stats())
+                    for hostname, bigip in self.__bigips.items())
+
+    def fanout(self, bigips, method, *args, **kwargs):
+        """ Call method(bigip, *args, **kwargs) for bigips concurrently.
+            Returns once it finished on all of them. """
+        return self.device_fanout.run(bigips, method, *args, **kwargs)
+
     def get_config_bigips(self):
         """ Return a list of big-ips that need to be configured.
             In replication sync mode, we configure all big-ips
@@ -1332,18 +1588,34 @@ class iControlDriver(LBaaSBaseDriver):
             self.__traffic_groups.remove('traffic-group-local-only')
         self.__traffic_groups.sort()
 
-    def sync_if_clustered(self):
-        """ sync device group if not in replication mode """
+    def sync_if_clustered(self, deferred=False):
+        """ sync device group if not in replication mode.
+            Deferred syncs are combined by the sync scheduler. Syncs
+            which order changes between devices must not be deferred. """
         if self.conf.f5_ha_type == 'standalone' or \
                 self.conf.f5_sync_mode == 'replication' or \
                 len(self.get_all_bigips()) < 2:
             return
+        if deferred and self.sync_scheduler:
+            self.sync_scheduler.mark_dirty()
+            return
+        self.sync_cluster()
+        if self.sync_scheduler:
+            self.sync_scheduler.synced()
+
+    def sync_cluster(self):
+        """ sync device group now """
         bigip = self.get_bigip()
         self._sync_with_retries(bigip)
+        # the sync changed the peers behind their sessions' backs
+        for bigip in self.get_all_bigips():
+            bigip.icr_session.mark_config_dirty()
 
     def _sync_with_retries(self, bigip, force_now=False,
-                           attempts=4, retry_delay=130):
-        """ sync device group """
+                           attempts=4, retry_delay=10):
+        """ sync device group. Failed syncs are retried with a
+            jittered, doubling delay until f5_sync_max_time. """
+        deadline = time() + f5const.SYNC_MAX_TIME
         for attempt in range(1, attempts + 1):
             LOG.debug('Syncing Cluster... attempt %d of %d'
                       % (attempt, attempts))
@@ -1351,16 +1623,27 @@ class iControlDriver(LBaaSBaseDriver):
                 if attempt != 1:
                     force_now = False
                 bigip.cluster.sync(bigip.device_group_name,
-                                   force_now=force_now)
+                                   force_now=force_now,
+                                   max_time=max(deadline - time(), 1))
                 LOG.debug('Cluster synced.')
                 return
             except Exception as exc:
                 LOG.error('ERROR: Cluster sync failed: %s' % exc)
-                if attempt == attempts:
+                delay = retry_delay * random.uniform(0.8, 1.2)
+                if attempt == attempts or time() + delay >= deadline:
                     raise
                 LOG.error('Wait another %d seconds for devices '
-                          'to recover from failed sync.' % retry_delay)
-                greenthread.sleep(retry_delay)
+                          'to recover from failed sync.' % delay)
+                greenthread.sleep(delay)
+                retry_delay *= 2
+
+
+def _object_ids(names):
+    """ Set of the uuids found in object names """
+    object_ids = set()
+    for name in names:
+        object_ids.update(UUID_PATTERN.findall(name))
+    return object_ids
 
 
 def _validate_bigip_version(bigip, hostname):
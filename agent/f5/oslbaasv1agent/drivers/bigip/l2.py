@@ -156,7 +156,9 @@ class BigipL2Manager(object):
                             ' Cannot setup network.'
             LOG.error(_(error_message))
             raise f5ex.InvalidNetworkType(error_message)
-        bigip.assured_networks.append(network['id'])
+        # the name lets the driver check the network is still there
+        bigip.assured_networks[network['id']] = \
+            self.get_network_name(bigip, network)[0]
         if time() - start_time > .001:
             LOG.debug("        assure bigip network took %.5f secs" %
                       (time() - start_time))
@@ -414,8 +416,7 @@ class BigipL2Manager(object):
         else:
             LOG.error(_('Unsupported network type %s. Can not delete.'
                         % network['provider:network_type']))
-        if network['id'] in bigip.assured_networks:
-            bigip.assured_networks.remove(network['id'])
+        bigip.assured_networks.pop(network['id'], None)
 
     def _delete_device_vlan(self, bigip, network, network_folder):
         """ Delete tagged vlan on specific bigip """
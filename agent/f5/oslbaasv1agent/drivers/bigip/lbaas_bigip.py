@@ -83,31 +83,36 @@ class LBaaSBuilderBigipObjects(LBaaSBuilder):
     def _assure_pool_create(self, pool):
         """ Provision Pool - Create/Update """
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            self.bigip_pool_manager.assure_bigip_pool_create(bigip, pool)
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           self.bigip_pool_manager.assure_bigip_pool_create,
+                           pool)
 
     def _assure_pool_monitors(self, service):
         """
             Provision Health Monitors - Create/Update
         """
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            self.bigip_pool_manager.assure_bigip_pool_monitors(bigip, service)
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           self.bigip_pool_manager.assure_bigip_pool_monitors,
+                           service)
 
     def _assure_members(self, service, all_subnet_hints):
         """
             Provision Members - Create/Update
         """
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
+        def assure_bigip_members(bigip):
             subnet_hints = all_subnet_hints[bigip.device_name]
             self.bigip_pool_manager.assure_bigip_members(
                 bigip, service, subnet_hints)
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           assure_bigip_members)
 
         # avoids race condition:
         # deletion of pool member objects must sync before we
         # remove the selfip from the peer bigips.
-        self.driver.sync_if_clustered()
+        self.driver.sync_if_clustered(
+            deferred=not self._subnet_deletes_pending(all_subnet_hints))
 
     def _assure_vip(self, service, traffic_group, all_subnet_hints):
         """ Ensure the vip is on all bigips. """
@@ -115,35 +120,49 @@ class LBaaSBuilderBigipObjects(LBaaSBuilder):
         if 'id' not in vip:
             return
 
-        bigips = self.driver.get_config_bigips()
-        for bigip in bigips:
-            subnet_hints = all_subnet_hints[bigip.device_name]
-            subnet = vip['subnet']
-
-            if vip['status'] == plugin_const.PENDING_CREATE or \
-               vip['status'] == plugin_const.PENDING_UPDATE:
-                self.bigip_vip_manager.assure_bigip_create_vip(
-                    bigip, service, traffic_group)
-                if subnet and subnet['id'] in \
-                        subnet_hints['check_for_delete_subnets']:
-                    del subnet_hints['check_for_delete_subnets'][subnet['id']]
-                if subnet and subnet['id'] not in \
-                        subnet_hints['do_not_delete_subnets']:
-                    subnet_hints['do_not_delete_subnets'].append(subnet['id'])
-
-            elif vip['status'] == plugin_const.PENDING_DELETE:
-                self.bigip_vip_manager.assure_bigip_delete_vip(bigip, service)
-                if subnet and subnet['id'] not in \
-                        subnet_hints['do_not_delete_subnets']:
-                    subnet_hints['check_for_delete_subnets'][subnet['id']] = \
-                        {'network': vip['network'],
-                         'subnet': subnet,
-                         'is_for_member': False}
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           self._assure_bigip_vip,
+                           service, traffic_group, all_subnet_hints)
 
         # avoids race condition:
         # deletion of vip address must sync before we
         # remove the selfip from the peer bigips.
-        self.driver.sync_if_clustered()
+        self.driver.sync_if_clustered(
+            deferred=not self._subnet_deletes_pending(all_subnet_hints))
+
+    @staticmethod
+    def _subnet_deletes_pending(all_subnet_hints):
+        """ Will subnets be checked for deletion after this service """
+        for subnet_hints in all_subnet_hints.values():
+            if subnet_hints['check_for_delete_subnets']:
+                return True
+        return False
+
+    def _assure_bigip_vip(self, bigip, service, traffic_group,
+                          all_subnet_hints):
+        """ Ensure the vip is on a bigip """
+        vip = service['vip']
+        subnet_hints = all_subnet_hints[bigip.device_name]
+        subnet = vip['subnet']
+        if vip['status'] == plugin_const.PENDING_CREATE or \
+           vip['status'] == plugin_const.PENDING_UPDATE:
+            self.bigip_vip_manager.assure_bigip_create_vip(
+                bigip, service, traffic_group)
+            if subnet and subnet['id'] in \
+                    subnet_hints['check_for_delete_subnets']:
+                del subnet_hints['check_for_delete_subnets'][subnet['id']]
+            if subnet and subnet['id'] not in \
+                    subnet_hints['do_not_delete_subnets']:
+                subnet_hints['do_not_delete_subnets'].append(subnet['id'])
+
+        elif vip['status'] == plugin_const.PENDING_DELETE:
+            self.bigip_vip_manager.assure_bigip_delete_vip(bigip, service)
+            if subnet and subnet['id'] not in \
+                    subnet_hints['do_not_delete_subnets']:
+                subnet_hints['check_for_delete_subnets'][subnet['id']] = \
+                    {'network': vip['network'],
+                     'subnet': subnet,
+                     'is_for_member': False}
 
     def _assure_pool_delete(self, service):
         """ Assure pool is deleted from big-ip """
@@ -151,8 +170,9 @@ class LBaaSBuilderBigipObjects(LBaaSBuilder):
             return
 
         # Service Layer (Shared Config)
-        for bigip in self.driver.get_config_bigips():
-            self.bigip_pool_manager.assure_bigip_pool_delete(bigip, service)
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           self.bigip_pool_manager.assure_bigip_pool_delete,
+                           service)
 
     def _check_monitor_delete(self, service):
         """If the pool is being deleted, then delete related objects"""
@@ -178,9 +198,12 @@ class LBaaSBuilderBigipIApp(LBaaSBuilderIApp):
 
     def assure_service(self, service, traffic_group, all_subnet_hints):
         LOG.debug("    assure_service 1")
-        for bigip in self.driver.get_config_bigips():
+
+        def assure_bigip_service(bigip):
             subnet_hints = all_subnet_hints[bigip.device_name]
             self.assure_bigip_service(bigip, service, subnet_hints)
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           assure_bigip_service)
 
     def assure_bigip_service(self, bigip, service, subnet_hints):
         """ Configure the service """
@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 #
+from f5.oslbaasv1agent.drivers.bigip.service_queue import ServiceQueue
 
 
 class LBaaSBaseDriver(object):
@@ -23,7 +24,8 @@ class LBaaSBaseDriver(object):
         self.agent_id = None
         self.plugin_rpc = None
         self.connected = False
-        self.service_queue = []
+        self.service_queue = ServiceQueue(
+            getattr(conf, 'f5_service_queue_workers', 1))
         self.agent_configurations = {}
 
     def set_context(self, context):
@@ -50,10 +52,27 @@ class LBaaSBaseDriver(object):
         """ Remove all cached items """
         raise NotImplementedError()
 
+    def get_existing_pool_ids(self):
+        """ Set of the ids of all pools configured on the backend """
+        raise NotImplementedError()
+
+    def verify_cache(self):
+        """ Remove cached items which are no longer on the backend """
+        raise NotImplementedError()
+
+    def warm_cache(self, tenant_ids):
+        """ Cache backend state of tenants before their services are
+            processed """
+        raise NotImplementedError()
+
     def backup_configuration(self):
         """ Persist backend configuratoins """
         raise NotImplementedError()
 
+    def refresh_stats(self):
+        """ Collect stats for all pools before calls to get_stats """
+        raise NotImplementedError()
+
     def get_stats(self, service):
         """ Get Stats for a Pool Service """
         raise NotImplementedError()
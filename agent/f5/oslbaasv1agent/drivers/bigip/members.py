@@ -0,0 +1,63 @@
+""" Pool member reconciliation """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+from f5.bigip.interfaces import member_key
+
+ENABLED_SESSIONS = ['user-enabled', 'monitor-enabled']
+
+
+def diff_members(desired_members, existing_members):
+    """ Compare the members a pool should have with the members
+        it has on the device.
+
+        desired_members are dicts with address, port, enabled and
+        ratio. existing_members are dicts with addr, port and
+        optionally session and ratio, as returned by Pool.get_members.
+
+        Returns (add, update, remove). add and update hold desired
+        members, remove holds existing members. Runs in linear time. """
+    existing_by_key = {}
+    for member in existing_members:
+        existing_by_key[member_key(member['addr'], member['port'])] = member
+
+    add = []
+    update = []
+    desired_keys = set()
+    for member in desired_members:
+        key = member_key(member['address'], member['port'])
+        if key in desired_keys:
+            continue
+        desired_keys.add(key)
+        existing = existing_by_key.get(key)
+        if existing is None:
+            add.append(member)
+        elif _member_changed(member, existing):
+            update.append(member)
+
+    remove = [existing_by_key[key] for key in existing_by_key
+              if key not in desired_keys]
+    return (add, update, remove)
+
+
+def _member_changed(member, existing):
+    """ Do the enabled state or ratio of the member differ """
+    if 'session' in existing:
+        enabled = existing['session'] in ENABLED_SESSIONS
+        if enabled != bool(member.get('enabled', True)):
+            return True
+    if 'ratio' in existing:
+        if int(existing['ratio']) != int(member.get('ratio', 1)):
+            return True
+    return False
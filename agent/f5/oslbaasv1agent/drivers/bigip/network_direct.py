@@ -23,12 +23,15 @@ from neutron.plugins.common import constants as plugin_const
 from neutron.common.exceptions import NeutronException
 
 from f5.bigip import exceptions as f5ex
+from f5.bigip.interfaces import prefixed
 from f5.bigip.interfaces import strip_domain_address
+from f5.bigip.interfaces import strip_folder_and_prefix
 from f5.oslbaasv1agent.drivers.bigip.selfips import BigipSelfIpManager
 from f5.oslbaasv1agent.drivers.bigip.snats import BigipSnatManager
 
 import itertools
 import netaddr
+import os
 
 LOG = logging.getLogger(__name__)
 
@@ -249,56 +252,80 @@ class NetworkBuilderDirect(object):
     def update_rds_cache(self, tenant_id):
         """ Update the route domain cache from bigips  """
         if tenant_id not in self.rds_cache:
+            self.warm_rds_cache([tenant_id])
+
+    def warm_rds_cache(self, tenant_ids):
+        """ Add tenants to the route domain cache. Every bigip is
+            queried once for all tenants, concurrently. """
+        tenant_ids = set([tenant_id for tenant_id in tenant_ids
+                          if tenant_id not in self.rds_cache])
+        if not tenant_ids:
+            return
+        for tenant_id in tenant_ids:
             LOG.debug("rds_cache: adding tenant %s" % tenant_id)
             self.rds_cache[tenant_id] = {}
-            for bigip in self.driver.get_all_bigips():
-                self.update_rds_cache_bigip(tenant_id, bigip)
-            LOG.debug("rds_cache updated: " + str(self.rds_cache))
+        bigips = self.driver.get_all_bigips()
+        snapshots = self.driver.fanout(bigips, self._get_bigip_networks)
+        for bigip, snapshot in zip(bigips, snapshots):
+            for tenant_id in tenant_ids:
+                self.update_rds_cache_bigip(tenant_id, bigip, snapshot)
+        LOG.debug("rds_cache updated: " + str(self.rds_cache))
 
-    def update_rds_cache_bigip(self, tenant_id, bigip):
+    @staticmethod
+    def _get_bigip_networks(bigip):
+        """ Route domains, VLANs, tunnels and self IPs of bigip,
+            indexed for the route domain cache """
+        snapshot = bigip.inventory.get_network_snapshot()
+        networks = {'route_domains': snapshot['route_domains'],
+                    'vlans': {},
+                    'tunnels': {},
+                    'selfips': {}}
+        for vlan in snapshot['vlans']:
+            networks['vlans'][(vlan['partition'], vlan['name'])] = \
+                vlan.get('tag', 0)
+        for tunnel in snapshot['tunnels']:
+            networks['tunnels'][(tunnel['partition'], tunnel['name'])] = \
+                tunnel.get('key')
+        for selfip in snapshot['selfips']:
+            networks['selfips'].setdefault(
+                (selfip['partition'], selfip.get('vlan')), []).append(selfip)
+        return networks
+
+    def update_rds_cache_bigip(self, tenant_id, bigip, networks):
         """ Update the route domain cache for this tenant
             with information from bigip's vlan and tunnels """
         LOG.debug("rds_cache: processing bigip %s" % bigip.device_name)
-
-        route_domain_ids = bigip.route.get_domain_ids(folder=tenant_id)
-        # LOG.debug("rds_cache: got bigip route domains: %s" % route_domains)
-        for route_domain_id in route_domain_ids:
-            self.update_rds_cache_bigip_rd_vlans(
-                tenant_id, bigip, route_domain_id)
-
-    def update_rds_cache_bigip_rd_vlans(
-            self, tenant_id, bigip, route_domain_id):
-        """ Update the route domain cache with information
-            from the bigip vlans and tunnels from
-            this route domain """
-        LOG.debug("rds_cache: processing bigip %s rd %s"
-                  % (bigip.device_name, route_domain_id))
-        # this gets tunnels too
-        rd_vlans = bigip.route.get_vlans_in_domain_by_id(
-            folder=tenant_id, route_domain_id=route_domain_id)
-        LOG.debug("rds_cache: bigip %s rd %s vlans: %s"
-                  % (bigip.device_name, route_domain_id, rd_vlans))
-        if len(rd_vlans) == 0:
-            return
-
-        # make sure this rd has a cache entry
+        folder = bigip.decorate_folder(tenant_id)
         tenant_entry = self.rds_cache[tenant_id]
-        if route_domain_id not in tenant_entry:
-            tenant_entry[route_domain_id] = {}
+        for route_domain in networks['route_domains']:
+            if route_domain['partition'] != folder:
+                continue
+            route_domain_id = int(route_domain['id'])
+            # this gets tunnels too
+            rd_vlans = route_domain.get('vlans', [])
+            LOG.debug("rds_cache: bigip %s rd %s vlans: %s"
+                      % (bigip.device_name, route_domain_id, rd_vlans))
+            if len(rd_vlans) == 0:
+                continue
+
+            # make sure this rd has a cache entry
+            if route_domain_id not in tenant_entry:
+                tenant_entry[route_domain_id] = {}
 
-        # for every VLAN or TUNNEL on this bigip...
-        for rd_vlan in rd_vlans:
-            self.update_rds_cache_bigip_vlan(
-                tenant_id, bigip, route_domain_id, rd_vlan)
+            # for every VLAN or TUNNEL on this bigip...
+            for rd_vlan in rd_vlans:
+                self.update_rds_cache_bigip_vlan(
+                    tenant_id, bigip, route_domain_id, rd_vlan, networks)
 
     def update_rds_cache_bigip_vlan(
-            self, tenant_id, bigip, route_domain_id, rd_vlan):
+            self, tenant_id, bigip, route_domain_id, rd_vlan, networks):
         """ Update the route domain cache with information
             from the bigip vlan or tunnel """
         LOG.debug("rds_cache: processing bigip %s rd %d vlan %s"
                   % (bigip.device_name, route_domain_id, rd_vlan))
+        folder = bigip.decorate_folder(tenant_id)
         net_short_name = self.get_bigip_net_short_name(
-            bigip, tenant_id, rd_vlan)
+            networks, folder, rd_vlan)
 
         # make sure this net has a cache entry
         tenant_entry = self.rds_cache[tenant_id]
@@ -307,26 +334,26 @@ class NetworkBuilderDirect(object):
             rd_entry[net_short_name] = {'subnets': {}}
         net_subnets = rd_entry[net_short_name]['subnets']
 
-        selfips = bigip.selfip.get_selfips(folder=tenant_id, vlan=rd_vlan)
+        selfips = networks['selfips'].get((folder, rd_vlan), [])
         LOG.debug("rds_cache: got selfips: %s" % selfips)
         for selfip in selfips:
+            selfip_name = strip_folder_and_prefix(selfip['name'])
             LOG.debug("rds_cache: processing bigip %s rd %s vlan %s self %s" %
                       (bigip.device_name, route_domain_id, rd_vlan,
-                       selfip['name']))
-            if bigip.device_name not in selfip['name']:
+                       selfip_name))
+            if bigip.device_name not in selfip_name:
                 LOG.error("rds_cache: Found unexpected selfip %s for tenant %s"
-                          % (selfip['name'], tenant_id))
+                          % (selfip_name, tenant_id))
                 continue
-            subnet_id = selfip['name'].split(bigip.device_name + '-')[1]
+            subnet_id = selfip_name.split(bigip.device_name + '-')[1]
 
             # convert 10.1.1.1%1/24 to 10.1.1.1/24
             addr = selfip['address'].split('/')[0]
             addr = addr.split('%')[0]
             netbits = selfip['address'].split('/')[1]
-            selfip['address'] = addr + '/' + netbits
 
             # selfip addresses will have slash notation: 10.1.1.1/24
-            netip = netaddr.IPNetwork(selfip['address'])
+            netip = netaddr.IPNetwork(addr + '/' + netbits)
             LOG.debug("rds_cache: updating subnet %s with %s"
                       % (subnet_id, str(netip.cidr)))
             net_subnets[subnet_id] = {'cidr': netip.cidr}
@@ -353,18 +380,20 @@ class NetworkBuilderDirect(object):
                         del net_entry[subnet['id']]
 
     @staticmethod
-    def get_bigip_net_short_name(bigip, tenant_id, network_name):
-        """ Return <network_type>-<seg_id> for bigip network """
+    def get_bigip_net_short_name(networks, folder, network_name):
+        """ Return <network_type>-<seg_id> for bigip network, looked
+            up in the networks listed from the bigip """
+        if network_name.startswith('/Common/'):
+            folder = 'Common'
+        name = prefixed(os.path.basename(network_name))
         if '_tunnel-gre-' in network_name:
-            tunnel_key = bigip.l2gre.get_tunnel_key(
-                name=network_name, folder=tenant_id)
+            tunnel_key = networks['tunnels'].get((folder, name))
             return 'gre-%s' % tunnel_key
         elif '_tunnel-vxlan-' in network_name:
-            tunnel_key = bigip.vxlan.get_tunnel_key(
-                name=network_name, folder=tenant_id)
+            tunnel_key = networks['tunnels'].get((folder, name))
             return 'vxlan-%s' % tunnel_key
         else:
-            vlan_id = bigip.vlan.get_id(name=network_name, folder=tenant_id)
+            vlan_id = networks['vlans'].get((folder, name), 0)
             return 'vlan-%s' % vlan_id
 
     @staticmethod
@@ -436,22 +465,29 @@ class NetworkBuilderDirect(object):
 
         # Delete shared config objects
         deleted_names = set()
-        for bigip in self.driver.get_config_bigips():
+
+        def assure_delete_nets_shared(bigip):
             LOG.debug('    post_service_networking: calling '
                       '_assure_delete_networks del nets sh for bigip %s %s'
                       % (bigip.device_name, all_subnet_hints))
             subnet_hints = all_subnet_hints[bigip.device_name]
-            deleted_names = deleted_names.union(
-                self._assure_delete_nets_shared(bigip, service,
-                                                subnet_hints))
+            return self._assure_delete_nets_shared(bigip, service,
+                                                   subnet_hints)
+        for names in self.driver.fanout(self.driver.get_config_bigips(),
+                                        assure_delete_nets_shared):
+            deleted_names = deleted_names.union(names)
 
         # avoids race condition:
         # deletion of shared ip objects must sync before we
         # remove the selfips or vlans from the peer bigips.
-        self.driver.sync_if_clustered()
+        deletes_pending = False
+        for subnet_hints in all_subnet_hints.values():
+            if subnet_hints['check_for_delete_subnets']:
+                deletes_pending = True
+        self.driver.sync_if_clustered(deferred=not deletes_pending)
 
         # Delete non shared config objects
-        for bigip in self.driver.get_all_bigips():
+        def assure_delete_nets_nonshared(bigip):
             LOG.debug('    post_service_networking: calling '
                       '    _assure_delete_networks del nets ns for bigip %s'
                       % bigip.device_name)
@@ -463,9 +499,11 @@ class NetworkBuilderDirect(object):
                 # hints are stored. So, just use those hints for every bigip.
                 device_name = self.driver.get_bigip().device_name
                 subnet_hints = all_subnet_hints[device_name]
-            deleted_names = deleted_names.union(
-                self._assure_delete_nets_nonshared(
-                    bigip, service, subnet_hints))
+            return self._assure_delete_nets_nonshared(
+                bigip, service, subnet_hints)
+        for names in self.driver.fanout(self.driver.get_all_bigips(),
+                                        assure_delete_nets_nonshared):
+            deleted_names = deleted_names.union(names)
 
         for port_name in deleted_names:
             LOG.debug('    post_service_networking: calling '
@@ -476,20 +514,24 @@ class NetworkBuilderDirect(object):
 
     def update_bigip_l2(self, service):
         """ Update fdb entries on bigip """
+        self.driver.fanout(self.driver.get_all_bigips(),
+                           self.update_bigip_service_l2, service)
+
+    def update_bigip_service_l2(self, bigip, service):
+        """ Update fdb entries of the service on one bigip """
         vip = service['vip']
         pool = service['pool']
 
-        for bigip in self.driver.get_all_bigips():
-            for member in service['members']:
-                if member['status'] == plugin_const.PENDING_DELETE:
-                    self.delete_bigip_member_l2(bigip, pool, member)
-                else:
-                    self.update_bigip_member_l2(bigip, pool, member)
-            if 'id' in vip:
-                if vip['status'] == plugin_const.PENDING_DELETE:
-                    self.delete_bigip_vip_l2(bigip, vip)
-                else:
-                    self.update_bigip_vip_l2(bigip, vip)
+        for member in service['members']:
+            if member['status'] == plugin_const.PENDING_DELETE:
+                self.delete_bigip_member_l2(bigip, pool, member)
+            else:
+                self.update_bigip_member_l2(bigip, pool, member)
+        if 'id' in vip:
+            if vip['status'] == plugin_const.PENDING_DELETE:
+                self.delete_bigip_vip_l2(bigip, vip)
+            else:
+                self.update_bigip_vip_l2(bigip, vip)
 
     def update_bigip_member_l2(self, bigip, pool, member):
         """ update pool member l2 records """
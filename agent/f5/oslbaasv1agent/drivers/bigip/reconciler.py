@@ -0,0 +1,139 @@
+""" Rolling reconciliation of cached services """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+try:
+    from neutron.openstack.common import log as logging
+except ImportError:
+    from oslo_log import log as logging
+from time import time
+import math
+
+LOG = logging.getLogger(__name__)
+
+# seconds between reconciler runs
+RECONCILE_TICK = 10
+# part of the interval a cycle may fall behind before the reconciler
+# stops giving way to queued requests
+RECONCILE_MAX_LAG = 0.1
+
+
+class ServiceReconciler(object):
+    """ Checks the cached services of the agent a few pools at a time,
+        so that every pool is checked once per interval without a
+        burst of requests to the plugin and the devices.
+
+        Each run takes the pools due in this tick, asks the plugin
+        for their service hashes in one message, refreshes the pools
+        which changed and syncs the pools missing on the devices.
+        While requests are queued for the driver the reconciler gives
+        way to them, unless the cycle is behind schedule by more than
+        RECONCILE_MAX_LAG of the interval. A cycle which fell behind
+        catches up by checking up to twice the pools per tick. """
+
+    def __init__(self, manager, interval, tick=RECONCILE_TICK):
+        self.manager = manager
+        self.interval = max(interval, tick)
+        self.tick = tick
+        # pool ids left to check in the current cycle
+        self.pending = []
+        self.cycle_start = None
+        self.cycle_size = 0
+        self.stats = {'pools': 0,
+                      'progress': 100,
+                      'lag': 0,
+                      'checked': 0,
+                      'changed': 0,
+                      'missing': 0,
+                      'deferred': 0,
+                      'cycles': 0,
+                      'last_cycle_time': 0}
+
+    def run(self):
+        """ Check the pools due in this tick """
+        if not self.pending:
+            self._start_cycle()
+        per_tick = int(math.ceil(
+            self.cycle_size * self.tick / float(self.interval)))
+        behind = int(math.ceil(self._lag() * self.cycle_size /
+                               float(self.interval)))
+        count = min(max(per_tick, behind), 2 * per_tick)
+        batch = []
+        while self.pending and len(batch) < count:
+            pool_id = self.pending.pop()
+            # the pool may have been deleted since the cycle started
+            if self.manager.cache.get_by_pool_id(pool_id):
+                batch.append(pool_id)
+        if batch:
+            self._check(batch)
+        self._update_stats()
+
+    def get_stats(self):
+        """ Progress, lag and check counts """
+        self._update_stats()
+        return dict(self.stats)
+
+    def _start_cycle(self):
+        """ Schedule all cached pools of this agent for checking """
+        now = time()
+        if self.cycle_start is not None and self.cycle_size:
+            self.stats['cycles'] += 1
+            self.stats['last_cycle_time'] = now - self.cycle_start
+        agent_host = self.manager.agent_host
+        self.pending = [pool_id for (pool_id, service) in
+                        self.manager.cache.services.items()
+                        if service.agent_host == agent_host]
+        self.cycle_size = len(self.pending)
+        self.cycle_start = now
+
+    def _check(self, batch):
+        """ Refresh the changed and sync the missing pools of batch """
+        changed_pool_ids = self.manager.get_changed_pool_ids(batch)
+        while batch:
+            if self._busy() and self._lag() <= \
+                    RECONCILE_MAX_LAG * self.interval:
+                # leave the rest to the next tick
+                self.pending.extend(batch)
+                self.stats['deferred'] += len(batch)
+                return
+            pool_id = batch.pop()
+            self.stats['checked'] += 1
+            if changed_pool_ids and pool_id in changed_pool_ids:
+                self.stats['changed'] += 1
+                self.manager.refresh_service(pool_id)
+            elif self.manager.validate_cached_service(pool_id):
+                self.stats['missing'] += 1
+
+    def _busy(self):
+        """ Are requests queued for the driver """
+        service_queue = getattr(self.manager.lbdriver, 'service_queue', None)
+        return service_queue is not None and len(service_queue) > 0
+
+    def _lag(self):
+        """ Seconds the current cycle is behind schedule """
+        if not self.cycle_size:
+            return 0
+        done = self.cycle_size - len(self.pending)
+        on_time = self.interval * done / float(self.cycle_size)
+        return max(time() - self.cycle_start - on_time, 0)
+
+    def _update_stats(self):
+        """ Progress and lag of the current cycle """
+        self.stats['pools'] = self.cycle_size
+        if self.cycle_size:
+            done = self.cycle_size - len(self.pending)
+            self.stats['progress'] = 100 * done // self.cycle_size
+        else:
+            self.stats['progress'] = 100
+        self.stats['lag'] = int(self._lag())
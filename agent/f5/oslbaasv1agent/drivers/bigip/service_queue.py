@@ -0,0 +1,322 @@
+""" Queue of service requests handled by the iControl driver """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+try:
+    from neutron.openstack.common import log as logging
+except ImportError:
+    from oslo_log import log as logging
+from eventlet import event
+from eventlet import greenpool
+from collections import deque
+from time import time
+import sys
+import uuid
+
+LOG = logging.getLogger(__name__)
+
+# returned by _take_ready when no pool can be dispatched
+_NO_WORK = object()
+
+# request lanes, in order of priority
+INTERACTIVE = 0
+BACKGROUND = 1
+LANE_NAMES = ['interactive', 'background']
+# interactive dispatches in a row after which waiting background work
+# gets a turn
+INTERACTIVE_BURST = 4
+
+
+class ServiceRequest(object):
+    """ A single call waiting in the service queue """
+    def __init__(self, key, method_name, method, args, kwargs,
+                 coalesce=False, lane=INTERACTIVE):
+        self.request_id = uuid.uuid4()
+        self.key = key
+        self.method_name = method_name
+        self.coalesce = coalesce
+        self.lane = lane
+        # submission order over all pools
+        self.seq = 0
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.done = event.Event()
+        self.enqueued = time()
+
+
+class ServiceQueue(object):
+    """ Per-pool FIFO queues serviced by a bounded pool of greenthreads.
+
+        Requests for the same pool run one at a time in the order
+        they were submitted. Requests for different pools run
+        concurrently, up to the number of workers. Requests which
+        are not bound to a pool (key None) run exclusively: they
+        wait for running requests to finish and nothing queued
+        after them starts until they are done.
+
+        Consecutive pending requests for a pool which were submitted
+        with coalesce=True are executed once, using the arguments of
+        the newest request. Every caller gets that result.
+
+        Requests are submitted to the INTERACTIVE lane, for user
+        requests, or to the BACKGROUND lane, for maintenance work.
+        Pools with an interactive request pending are dispatched
+        before pools with only background requests, but after
+        INTERACTIVE_BURST interactive dispatches in a row a waiting
+        background pool gets a turn. Pools do not pass an exclusive
+        request submitted before their next request, in any lane. """
+
+    def __init__(self, workers=1):
+        self.workers = max(1, int(workers))
+        self.pool = greenpool.GreenPool(self.workers)
+        self.running = 0
+        # pool key -> deque of ServiceRequest
+        self.pending = {}
+        # per lane, deque of (pool key, token) for pools ready to run
+        self.lanes = [deque(), deque()]
+        # pool key -> (lane, token) of its current entry in the lanes
+        self.queued = {}
+        self.tokens = 0
+        # pool keys waiting for an exclusive request submitted before
+        # their next request
+        self.parked = set()
+        # pool keys with a request currently executing
+        self.active = set()
+        self.depth = 0
+        self.seq = 0
+        self.interactive_run = 0
+        self.stats = {}
+        self.lane_stats = [{'depth': 0, 'dispatched': 0, 'turns': 0}
+                           for _lane in LANE_NAMES]
+
+    def __len__(self):
+        return self.depth
+
+    def submit(self, key, method_name, method, *args, **kwargs):
+        """ Queue a request and block until it has been executed.
+            Returns the result of the method or raises its exception. """
+        coalesce = kwargs.pop('coalesce', False)
+        lane = kwargs.pop('lane', INTERACTIVE)
+        request = ServiceRequest(key, method_name, method, args, kwargs,
+                                 coalesce, lane)
+        self._enqueue(request)
+        self._fill()
+        return request.done.wait()
+
+    def get_stats(self):
+        """ Queue metrics per method name """
+        stats = {}
+        for method_name, method_stats in self.stats.items():
+            stats[method_name] = dict(method_stats)
+            finished = method_stats['executed'] + method_stats['failed']
+            if finished + method_stats['coalesced']:
+                stats[method_name]['avg_wait_time'] = \
+                    method_stats['wait_time'] / \
+                    (finished + method_stats['coalesced'])
+            if finished:
+                stats[method_name]['avg_run_time'] = \
+                    method_stats['run_time'] / finished
+                stats[method_name]['avg_absorbed'] = \
+                    float(method_stats['absorbed']) / finished
+        return stats
+
+    def get_lane_stats(self):
+        """ Depth and dispatch counts per lane. turns counts the
+            background dispatches made ahead of waiting interactive
+            requests. """
+        return dict((LANE_NAMES[lane], dict(lane_stats)) for
+                    (lane, lane_stats) in enumerate(self.lane_stats))
+
+    def _method_stats(self, method_name):
+        """ Get or create metrics for a method name """
+        if method_name not in self.stats:
+            self.stats[method_name] = {'depth': 0,
+                                       'executed': 0,
+                                       'failed': 0,
+                                       'coalesced': 0,
+                                       'absorbed': 0,
+                                       'max_absorbed': 0,
+                                       'wait_time': 0.0,
+                                       'max_wait_time': 0.0,
+                                       'run_time': 0.0,
+                                       'max_run_time': 0.0}
+        return self.stats[method_name]
+
+    def _enqueue(self, request):
+        """ Add request to the queue for its pool """
+        self.seq += 1
+        request.seq = self.seq
+        if request.key not in self.pending:
+            self.pending[request.key] = deque()
+        self.pending[request.key].append(request)
+        self.depth += 1
+        self._method_stats(request.method_name)['depth'] += 1
+        self.lane_stats[request.lane]['depth'] += 1
+        if request.key is not None:
+            self._queue_key(request.key)
+
+    def _queue_key(self, key):
+        """ Put pool key with pending requests in its lane, or park
+            it behind an earlier exclusive request """
+        if key in self.active or key in self.parked:
+            return
+        requests = self.pending[key]
+        if None in self.pending and \
+                requests[0].seq > self.pending[None][0].seq:
+            self.parked.add(key)
+            return
+        # a pool moves up to the lane of its most urgent request
+        lane = min(request.lane for request in requests)
+        if key in self.queued and self.queued[key][0] <= lane:
+            return
+        self.tokens += 1
+        self.queued[key] = (lane, self.tokens)
+        self.lanes[lane].append((key, self.tokens))
+
+    def _lane_head(self, lane):
+        """ First pool key queued in lane, dropping moved entries """
+        entries = self.lanes[lane]
+        while entries:
+            (key, token) = entries[0]
+            if self.queued.get(key) == (lane, token):
+                return key
+            entries.popleft()
+        return _NO_WORK
+
+    def _take_ready(self):
+        """ Remove and return the next pool key which may run now """
+        if None in self.active:
+            return _NO_WORK
+        interactive_key = self._lane_head(INTERACTIVE)
+        background_key = self._lane_head(BACKGROUND)
+        if interactive_key is not _NO_WORK and \
+                (background_key is _NO_WORK or
+                 self.interactive_run < INTERACTIVE_BURST):
+            lane = INTERACTIVE
+            key = interactive_key
+            if background_key is _NO_WORK:
+                self.interactive_run = 0
+            else:
+                self.interactive_run += 1
+        elif background_key is not _NO_WORK:
+            lane = BACKGROUND
+            key = background_key
+            if interactive_key is not _NO_WORK:
+                self.lane_stats[BACKGROUND]['turns'] += 1
+            self.interactive_run = 0
+        elif None in self.pending and not self.active:
+            # everything submitted before the exclusive request is done
+            self.active.add(None)
+            self.lane_stats[self.pending[None][0].lane]['dispatched'] += 1
+            return None
+        else:
+            return _NO_WORK
+        self.lanes[lane].popleft()
+        del self.queued[key]
+        self.active.add(key)
+        self.lane_stats[lane]['dispatched'] += 1
+        return key
+
+    def _fill(self):
+        """ Start workers for ready pools while there is capacity """
+        while self.running < self.workers:
+            key = self._take_ready()
+            if key is _NO_WORK:
+                break
+            self.running += 1
+            self.pool.spawn_n(self._worker, key)
+
+    def _worker(self, key):
+        """ Execute requests, moving to the next ready pool after each """
+        try:
+            while key is not _NO_WORK:
+                self._execute(self._take_requests(key))
+                self._finish(key)
+                key = self._take_ready()
+                if key is not _NO_WORK:
+                    # an exclusive request may have released other pools
+                    self._fill()
+        finally:
+            self.running -= 1
+
+    def _finish(self, key):
+        """ Release pool key, requeueing it behind other pools """
+        self.active.discard(key)
+        if not self.pending[key]:
+            del self.pending[key]
+        elif key is not None:
+            self._queue_key(key)
+        if key is None:
+            # release the pools which waited for the exclusive request,
+            # in the order of their next requests
+            parked = sorted(self.parked,
+                            key=lambda pool: self.pending[pool][0].seq)
+            self.parked = set()
+            for pool in parked:
+                self._queue_key(pool)
+
+    def _take_requests(self, key):
+        """ Remove the next request for a pool from its queue, along with
+            the coalescable requests queued directly behind it. """
+        requests = [self.pending[key].popleft()]
+        if requests[0].coalesce:
+            while self.pending[key] and self.pending[key][0].coalesce:
+                requests.append(self.pending[key].popleft())
+        return requests
+
+    def _execute(self, requests):
+        """ Run newest request and wake up the callers of all of them """
+        start_time = time()
+        for absorbed in requests:
+            absorbed_stats = self._method_stats(absorbed.method_name)
+            self.depth -= 1
+            absorbed_stats['depth'] -= 1
+            self.lane_stats[absorbed.lane]['depth'] -= 1
+            wait_time = start_time - absorbed.enqueued
+            absorbed_stats['wait_time'] += wait_time
+            absorbed_stats['max_wait_time'] = \
+                max(absorbed_stats['max_wait_time'], wait_time)
+            if absorbed is not requests[-1]:
+                absorbed_stats['coalesced'] += 1
+
+        request = requests[-1]
+        method_stats = self._method_stats(request.method_name)
+        method_stats['absorbed'] += len(requests) - 1
+        method_stats['max_absorbed'] = max(method_stats['max_absorbed'],
+                                           len(requests) - 1)
+        LOG.debug('%s request %s is running for %d requests'
+                  ' - queue depth: %d'
+                  % (str(request.method_name), request.request_id,
+                     len(requests), self.depth))
+        try:
+            result = request.method(*request.args, **request.kwargs)
+        except Exception:
+            exc_info = sys.exc_info()
+            method_stats['failed'] += 1
+            LOG.error('%s request %s FAILED'
+                      % (str(request.method_name), request.request_id))
+            for absorbed in requests:
+                absorbed.done.send_exception(*exc_info)
+        else:
+            method_stats['executed'] += 1
+            for absorbed in requests:
+                absorbed.done.send(result)
+        run_time = time() - start_time
+        method_stats['run_time'] += run_time
+        method_stats['max_run_time'] = max(method_stats['max_run_time'],
+                                           run_time)
+        LOG.debug('%s request %s took %.5f secs'
+                  % (str(request.method_name), request.request_id,
+                     run_time))
@@ -0,0 +1,167 @@
+""" Pool statistics collection and publishing """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+try:
+    from neutron.openstack.common import log as logging
+except ImportError:
+    from oslo_log import log as logging
+from f5.bigip.interfaces import prefixed
+from time import time
+
+LOG = logging.getLogger(__name__)
+
+# seconds a collected table may be used for
+STATS_MAX_AGE = 20
+
+
+class BigipStatsCollector(object):
+    """ Keeps a table of the statistics and member monitor states of
+        all pools on each BIG-IP. A refresh costs two queries per
+        device, after which stats for any pool are served from the
+        table instead of three queries per pool and device. """
+
+    def __init__(self, driver, max_age=STATS_MAX_AGE):
+        self.driver = driver
+        self.max_age = max_age
+        # bigip icr_url -> table
+        self.tables = {}
+
+    def refresh(self):
+        """ Collect the stats tables from every bigip """
+        self.driver.fanout(self.driver.get_all_bigips(), self.refresh_bigip)
+
+    def refresh_bigip(self, bigip):
+        """ Collect the stats table from bigip """
+        start_time = time()
+        table = {'time': start_time,
+                 'pools': bigip.pool.get_all_statistics(),
+                 'members': bigip.pool.get_all_members_monitor_status()}
+        self.tables[bigip.icr_url] = table
+        LOG.debug("collected stats of %d pools from %s in %.5f secs"
+                  % (len(table['pools']), bigip.icr_url,
+                     time() - start_time))
+
+    def has_table(self, bigip):
+        """ Is there a current table for bigip """
+        table = self.tables.get(bigip.icr_url)
+        return table is not None and time() - table['time'] < self.max_age
+
+    def get_pool_statistics(self, bigip, pool, config_mode='object'):
+        """ Stats of pool from the table, None if not on the bigip """
+        table = self.tables[bigip.icr_url]
+        return table['pools'].get(self._pool_path(pool, config_mode))
+
+    def get_members_monitor_status(self, bigip, pool, config_mode='object'):
+        """ Member monitor states of pool from the table. Queries
+            the bigip if the table has no member states. """
+        table = self.tables[bigip.icr_url]
+        if table['members'] is None:
+            return bigip.pool.get_members_monitor_status(
+                name=pool['id'],
+                folder=pool['tenant_id'],
+                config_mode=config_mode)
+        return table['members'].get(self._pool_path(pool, config_mode), [])
+
+    @staticmethod
+    def _pool_path(pool, config_mode):
+        """ Full path of the pool on the bigip """
+        folder = prefixed(pool['tenant_id'])
+        name = prefixed(pool['id'])
+        if config_mode == 'iapp':
+            return '/%s/%s.app/%s' % (folder, name, name)
+        return '/%s/%s' % (folder, name)
+
+
+class StatsPublishFilter(object):
+    """ Remembers the stats last published for each pool and removes
+        what the plugin already knows from new stats.
+
+        Member statuses are published when they change. Counters are
+        published when one of them moved by more than threshold
+        percent of its published value. The full stats of a pool are
+        published when they are older than max_age seconds or when a
+        new service definition version has been received for it. """
+
+    def __init__(self, threshold=0, max_age=300):
+        self.threshold = threshold
+        self.max_age = max_age
+        # pool id -> {'time', 'version', 'counters', 'members'}
+        self.published = {}
+        self.stats = {'published': 0,
+                      'suppressed': 0,
+                      'members_published': 0,
+                      'members_suppressed': 0}
+
+    def filter(self, pool_id, stats, version=None):
+        """ Stats of the pool which need to be published, or None """
+        last = self.published.get(pool_id)
+        now = time()
+        if last is None or last['version'] != version or \
+                now - last['time'] >= self.max_age:
+            last = {'time': now, 'version': version,
+                    'counters': {}, 'members': {}}
+            full = True
+        else:
+            full = False
+
+        counters = dict((key, value) for (key, value) in stats.items()
+                        if key != 'members')
+        members = {}
+        for member_id, member_stats in stats.get('members', {}).items():
+            if full or \
+                    last['members'].get(member_id) != member_stats:
+                members[member_id] = member_stats
+        self.stats['members_published'] += len(members)
+        self.stats['members_suppressed'] += \
+            len(stats.get('members', {})) - len(members)
+
+        if not full and not members and \
+                not self._counters_changed(last['counters'], counters):
+            self.stats['suppressed'] += 1
+            return None
+
+        last['counters'] = counters
+        last['members'].update(members)
+        self.published[pool_id] = last
+        self.stats['published'] += 1
+        # counters are always sent in full, the plugin replaces them
+        publish = dict(counters)
+        publish['members'] = members
+        return publish
+
+    def forget(self, pool_id):
+        """ Publish the full stats of pool next time """
+        self.published.pop(pool_id, None)
+
+    def purge(self, pool_ids):
+        """ Forget pools which are not in pool_ids """
+        for pool_id in list(self.published.keys()):
+            if pool_id not in pool_ids:
+                del self.published[pool_id]
+
+    def get_stats(self):
+        """ Publish and suppress counts """
+        return dict(self.stats)
+
+    def _counters_changed(self, last_counters, counters):
+        """ Did any counter move by more than the threshold """
+        for key, value in counters.items():
+            last_value = last_counters.get(key)
+            if last_value is None:
+                return True
+            if abs(value - last_value) > \
+                    abs(last_value) * self.threshold / 100.0:
+                return True
+        return False
@@ -0,0 +1,101 @@
+""" Deferred device group config sync """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+try:
+    from neutron.openstack.common import log as logging
+except ImportError:
+    from oslo_log import log as logging
+from eventlet import greenthread
+from f5.oslbaasv1agent.drivers.bigip.service_queue import BACKGROUND
+from time import time
+
+LOG = logging.getLogger(__name__)
+
+# seconds between checks for a pending sync
+SYNC_POLL_INTERVAL = 1
+
+
+class ConfigSyncScheduler(object):
+    """ Coalesces the config syncs requested by services.
+
+        A deferred sync only marks the device group dirty. The group
+        is synced once the service queue has drained, or window
+        seconds after it became dirty while services keep arriving.
+        The sync runs as an exclusive request in the service queue,
+        so no service is changing the configuration meanwhile. Any
+        sync, deferred or immediate, clears the dirty mark. """
+
+    def __init__(self, driver, window=5):
+        self.driver = driver
+        self.window = window
+        self.dirty_since = None
+        self.running = False
+        self.stats = {'deferred': 0,
+                      'coalesced': 0,
+                      'syncs': 0,
+                      'immediate_syncs': 0}
+
+    def mark_dirty(self):
+        """ Request a sync of the device group """
+        self.stats['deferred'] += 1
+        if self.dirty_since is None:
+            self.dirty_since = time()
+        else:
+            self.stats['coalesced'] += 1
+        if not self.running:
+            self.running = True
+            greenthread.spawn_n(self._run)
+
+    def synced(self, deferred=False):
+        """ The device group was synced """
+        self.dirty_since = None
+        if deferred:
+            self.stats['syncs'] += 1
+        else:
+            self.stats['immediate_syncs'] += 1
+
+    def get_stats(self):
+        """ Sync counts """
+        return dict(self.stats)
+
+    def _due(self):
+        """ Should the pending sync run now """
+        if self.dirty_since is None:
+            return False
+        return len(self.driver.service_queue) == 0 or \
+            time() - self.dirty_since >= self.window
+
+    def _run(self):
+        """ Run pending syncs until the group is clean """
+        try:
+            while self.dirty_since is not None:
+                greenthread.sleep(SYNC_POLL_INTERVAL)
+                if self._due():
+                    try:
+                        self.driver.service_queue.submit(
+                            None, 'config_sync', self._sync,
+                            lane=BACKGROUND)
+                    except Exception as exc:
+                        LOG.error('deferred config sync failed: %s'
+                                  % exc.message)
+                        greenthread.sleep(self.window)
+        finally:
+            self.running = False
+
+    def _sync(self):
+        """ Sync the device group if it is still dirty """
+        if self.dirty_since is not None:
+            self.driver.sync_cluster()
+            self.synced(deferred=True)
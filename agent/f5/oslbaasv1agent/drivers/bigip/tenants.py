@@ -40,31 +40,46 @@ class BigipTenantManager(object):
         traffic_group = '/Common/' + traffic_group
 
         # create tenant folder
-        for bigip in self.driver.get_config_bigips():
-            folder = bigip.decorate_folder(tenant_id)
-            if not bigip.system.folder_exists(folder):
-                bigip.system.create_folder(
-                    folder, change_to=True, traffic_group=traffic_group)
+        created = self.driver.fanout(self.driver.get_config_bigips(),
+                                     self._assure_bigip_folder,
+                                     tenant_id, traffic_group)
 
         # folder must sync before route domains are created.
-        self.driver.sync_if_clustered()
+        self.driver.sync_if_clustered(deferred=not any(created))
 
         # create tenant route domain
         if self.conf.use_namespaces:
-            for bigip in self.driver.get_all_bigips():
-                folder = bigip.decorate_folder(tenant_id)
-                if not bigip.route.domain_exists(folder):
-                    bigip.route.create_domain(
-                        folder, self.conf.f5_route_domain_strictness)
+            self.driver.fanout(self.driver.get_all_bigips(),
+                               self._assure_bigip_route_domain,
+                               tenant_id)
+
+    @staticmethod
+    def _assure_bigip_folder(bigip, tenant_id, traffic_group):
+        """ Create tenant partition on bigip. True if it was created """
+        folder = bigip.decorate_folder(tenant_id)
+        if not bigip.system.folder_exists(folder):
+            bigip.system.create_folder(
+                folder, change_to=True, traffic_group=traffic_group)
+            return True
+        return False
+
+    def _assure_bigip_route_domain(self, bigip, tenant_id):
+        """ Create tenant route domain on bigip """
+        folder = bigip.decorate_folder(tenant_id)
+        if not bigip.route.domain_exists(folder):
+            bigip.route.create_domain(
+                folder, self.conf.f5_route_domain_strictness)
 
     def assure_tenant_cleanup(self, service, all_subnet_hints):
         """ Delete tenant partition.
             Called for every bigip only in replication mode,
             otherwise called once.
         """
-        for bigip in self.driver.get_config_bigips():
+        def assure_bigip_tenant_cleanup(bigip):
             subnet_hints = all_subnet_hints[bigip.device_name]
             self._assure_bigip_tenant_cleanup(bigip, service, subnet_hints)
+        self.driver.fanout(self.driver.get_config_bigips(),
+                           assure_bigip_tenant_cleanup)
 
     # called for every bigip only in replication mode.
     # otherwise called once
@@ -84,6 +84,8 @@ setup(name='f5-oslbaasv1-agent',
                   'f5.oslbaasv1agent.drivers.bigip.agent_manager',
                   'f5.oslbaasv1agent.drivers.bigip.constants',
                   'f5.oslbaasv1agent.drivers.bigip.exceptions',
+                  'f5.oslbaasv1agent.drivers.bigip.fanout',
+                  'f5.oslbaasv1agent.drivers.bigip.fdb_aggregator',
                   'f5.oslbaasv1agent.drivers.bigip.fdb_connector',
                   'f5.oslbaasv1agent.drivers.bigip.fdb_connector_ml2',
                   'f5.oslbaasv1agent.drivers.bigip.icontrol_driver',
@@ -94,11 +96,16 @@ setup(name='f5-oslbaasv1-agent',
                   'f5.oslbaasv1agent.drivers.bigip.lbaas_bigiq',
                   'f5.oslbaasv1agent.drivers.bigip.lbaas_driver',
                   'f5.oslbaasv1agent.drivers.bigip.lbaas_iapp',
+                  'f5.oslbaasv1agent.drivers.bigip.members',
                   'f5.oslbaasv1agent.drivers.bigip.network_direct',
                   'f5.oslbaasv1agent.drivers.bigip.pools',
+                  'f5.oslbaasv1agent.drivers.bigip.reconciler',
                   'f5.oslbaasv1agent.drivers.bigip.rpc',
                   'f5.oslbaasv1agent.drivers.bigip.selfips',
+                  'f5.oslbaasv1agent.drivers.bigip.service_queue',
                   'f5.oslbaasv1agent.drivers.bigip.snats',
+                  'f5.oslbaasv1agent.drivers.bigip.stats',
+                  'f5.oslbaasv1agent.drivers.bigip.sync_scheduler',
                   'f5.oslbaasv1agent.drivers.bigip.tenants',
                   'f5.oslbaasv1agent.drivers.bigip.utils',
                   'f5.oslbaasv1agent.drivers.bigip.vcmp',
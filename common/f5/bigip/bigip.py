@@ -19,14 +19,18 @@ import logging
 import requests
 import socket
 
+from contextlib import contextmanager
+
 from f5.bigip.pycontrol import pycontrol as pc
 from f5.common import constants as const
 from f5.bigip import interfaces as bigip_interfaces
+from f5.bigip.icr_session import IcrSession
 
 from f5.bigip.interfaces.cluster import Cluster
 from f5.bigip.interfaces.device import Device
 from f5.bigip.interfaces.interface import Interface
 from f5.bigip.interfaces.iapp import IApp
+from f5.bigip.interfaces.inventory import Inventory
 from f5.bigip.interfaces.monitor import Monitor
 from f5.bigip.interfaces.pool import Pool
 from f5.bigip.interfaces.route import Route
@@ -48,10 +52,13 @@ LOG = logging.getLogger(__name__)
 
 class BigIP(object):
     """ An interface to a single BIG-IP """
-    def __init__(self, hostname, username, password, timeout=None):
+    def __init__(self, hostname, username, password, timeout=None,
+                 token_auth=None, pool_size=None):
         # get icontrol connection stub
         self.icontrol = self._get_icontrol(hostname, username, password)
-        self.icr_session = self._get_icr_session(hostname, username, password)
+        self.icr_session = self._get_icr_session(hostname, username, password,
+                                                 token_auth=token_auth,
+                                                 pool_size=pool_size)
         self.icr_url = 'https://%s/mgmt/tm' % hostname
 
         # interface instance cache
@@ -70,6 +77,17 @@ class BigIP(object):
             iapp.OBJ_PREFIX = bigip_interfaces.OBJ_PREFIX
             return iapp
 
+    @property
+    def inventory(self):
+        """ Inventory interface """
+        if 'inventory' in self.interfaces:
+            return self.interfaces['inventory']
+        else:
+            inventory = Inventory(self)
+            self.interfaces['inventory'] = inventory
+            inventory.OBJ_PREFIX = bigip_interfaces.OBJ_PREFIX
+            return inventory
+
     @property
     def system(self):
         """ System interface """
@@ -280,6 +298,35 @@ class BigIP(object):
             ssl.OBJ_PREFIX = bigip_interfaces.OBJ_PREFIX
             return ssl
 
+    @contextmanager
+    def transaction(self):
+        """ Group iControl REST writes made by interfaces in this
+            greenthread into one transaction, committed on exit.
+            If the block raises, nothing is applied. Nested
+            transactions join the outer one. Device fanouts started
+            in the block do not, their steps run in other
+            greenthreads.
+
+            Reads are not part of the transaction and do not see its
+            writes, and iControl SOAP writes are applied at once. Only
+            blocks which do not depend on either can use it, so
+            writes which read back earlier ones, like most of
+            assure_service, are not grouped. """
+        if self.icr_session.in_transaction():
+            yield
+            return
+        self.icr_session.begin_transaction()
+        try:
+            yield
+        except Exception:
+            self.icr_session.abort_transaction()
+            raise
+        self.icr_session.commit_transaction()
+
+    def after_commit(self, method, *args, **kwargs):
+        """ Call method after the open transaction commits, or now """
+        return self.icr_session.after_commit(method, *args, **kwargs)
+
     def set_timeout(self, timeout):
         """ Set iControl timeout """
         self.icontrol.set_timeout(timeout)
@@ -334,17 +381,21 @@ class BigIP(object):
         return icontrol
 
     @staticmethod
-    def _get_icr_session(hostname, username, password, timeout=None):
+    def _get_icr_session(hostname, username, password, timeout=None,
+                         token_auth=None, pool_size=None):
         """ Get iControl REST Session """
-        icr_session = requests.session()
-        icr_session.auth = (username, password)
-        icr_session.verify = False
+        if token_auth is None:
+            token_auth = const.ICR_TOKEN_AUTH
+        if not pool_size:
+            pool_size = const.ICR_POOL_SIZE
+        icr_session = IcrSession(hostname, username, password,
+                                 token_auth=token_auth,
+                                 pool_size=pool_size)
         if hasattr(requests, 'packages'):
             ul3 = requests.packages.urllib3  # @UndefinedVariable
             ul3.disable_warnings(
                 category=ul3.exceptions.InsecureRequestWarning
             )
-        icr_session.headers.update({'Content-Type': 'application/json'})
         if timeout:
             socket.setdefaulttimeout(timeout)
         else:
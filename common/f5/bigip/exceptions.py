@@ -316,3 +316,11 @@ class VXLANUpdateException(Exception):
 
 class VXLANDeleteException(Exception):
     pass
+
+
+class TransactionCreationException(Exception):
+    pass
+
+
+class TransactionCommitException(Exception):
+    pass
@@ -0,0 +1,380 @@
+""" iControl REST session for a single BIG-IP """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from f5.common import constants as const
+from f5.common.logger import Log
+from f5.bigip import exceptions
+
+import json
+import requests
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+
+TOKEN_HEADER = 'X-F5-Auth-Token'
+TRANSACTION_HEADER = 'X-F5-REST-Coordination-Id'
+
+# reads which change without REST writes through this session, like
+# statistics, sync status or objects written with iControl SOAP.
+# SOAP writers also drop cached reads with mark_config_dirty.
+READ_CACHE_EXCLUDED = ['/stats', '/cm/', '/net/arp', '/net/fdb',
+                       '/sys/crypto', '/sys/config', '/transaction',
+                       '/ltm/profile/client-ssl']
+# writes to a collection which also change other collections
+READ_CACHE_IMPLIED = {'/ltm/pool': ['/ltm/node'],
+                      '/ltm/snatpool': ['/ltm/snat-translation'],
+                      '/ltm/virtual': ['/ltm/virtual-address']}
+
+
+class IcrSession(requests.Session):
+    """ requests session which authenticates with an X-F5-Auth-Token.
+
+        Basic auth sends every request through PAM on the BIG-IP
+        management plane. With token_auth the session logs in once,
+        sends the token with each request and logs in again shortly
+        before the token expires or when the device rejects it. If a
+        token can not be obtained the session falls back to basic auth
+        and tries again after ICR_TOKEN_RETRY_INTERVAL.
+
+        Connections are kept alive in a pool of pool_size connections,
+        which should be at least the number of greenthreads that can
+        use the device concurrently.
+
+        Request counts and latencies are kept in stats, separately for
+        token and basic authenticated requests.
+
+        While a transaction is open in a (green)thread, the writes it
+        sends to /mgmt/tm are queued in an iControl REST transaction
+        instead of being applied. Reads are still sent outside of the
+        transaction, so they do not see its writes. The transaction is
+        created on the first write and applied by commit_transaction
+        in a single commit.
+
+        While a read cache is open in a (green)thread, GET responses
+        from /mgmt/tm are kept by URL and returned again for the same
+        URL. Responses below 500, including 404s, are cached. A write
+        through the session drops the cached reads of the collection
+        it changes, a change recorded with mark_config_dirty those of
+        the collection given or all of them.
+
+        Writes to /mgmt/tm count as configuration changes, so the
+        running configuration only needs to be saved when
+        config_dirty. """
+
+    def __init__(self, hostname, username, password,
+                 token_auth=True, pool_size=const.ICR_POOL_SIZE):
+        super(IcrSession, self).__init__()
+        self.hostname = hostname
+        self.username = username
+        self.password = password
+        self.token_auth = token_auth
+        self.token = None
+        self.token_expires = 0
+        # transactions are per greenthread once eventlet is patched in
+        self._local = threading.local()
+
+        self.verify = False
+        self.headers.update({'Content-Type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        if not token_auth:
+            self.auth = (username, password)
+
+        self.stats = {'token_logins': 0,
+                      'token_login_failures': 0,
+                      'transactions': 0,
+                      'transaction_writes': 0,
+                      'cached_reads': 0}
+        for mode in ['token', 'basic']:
+            self.stats[mode] = {'requests': 0,
+                                'errors': 0,
+                                'total_time': 0.0,
+                                'max_time': 0.0}
+        # the configuration may have changed before the session existed
+        self.config_writes = 1
+        self.saved_config_writes = 0
+
+    def request(self, method, url, **kwargs):
+        """ Send request, authenticating with a current token """
+        read_cache = self.get_read_cache()
+        key = None
+        if read_cache is not None:
+            if method.upper() == 'GET':
+                key = self._read_cache_key(url, kwargs.get('params'))
+                if key in read_cache['responses']:
+                    read_cache['saved'] += 1
+                    self.stats['cached_reads'] += 1
+                    return read_cache['responses'][key]
+            else:
+                self._invalidate_reads(read_cache, url)
+        if method.upper() != 'GET' and self._changes_config(url):
+            self.config_writes += 1
+        if self.token_auth and time.time() >= self.token_expires:
+            self._login()
+        if self.token:
+            mode = 'token'
+        else:
+            mode = 'basic'
+        transaction = self._get_transaction()
+        if transaction is not None and method.upper() != 'GET' and \
+                '/mgmt/tm/' in url and '/mgmt/tm/transaction' not in url:
+            if transaction['id'] is None:
+                transaction['id'] = self._create_transaction()
+            headers = dict(kwargs.get('headers') or {})
+            headers[TRANSACTION_HEADER] = str(transaction['id'])
+            kwargs['headers'] = headers
+            transaction['writes'] += 1
+        start_time = time.time()
+        try:
+            response = super(IcrSession, self).request(method, url, **kwargs)
+            if response.status_code == 401 and self.token:
+                # token was revoked or timed out early on the device
+                self._login()
+                response = super(IcrSession, self).request(
+                    method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(mode, start_time, error=True)
+            raise
+        self._record(mode, start_time, error=(response.status_code >= 500))
+        if key is not None and response.status_code < 500:
+            read_cache['responses'][key] = response
+        return response
+
+    def in_read_cache(self):
+        """ Is a read cache open in this greenthread """
+        return self.get_read_cache() is not None
+
+    def begin_read_cache(self):
+        """ Reuse GET responses in this greenthread until the end """
+        self._local.read_cache = {'responses': {}, 'saved': 0}
+
+    def end_read_cache(self):
+        """ Drop the read cache. Returns the number of saved GETs. """
+        read_cache = self.get_read_cache()
+        self._local.read_cache = None
+        if read_cache is None:
+            return 0
+        return read_cache['saved']
+
+    def clear_read_cache(self):
+        """ Drop cached reads, for changes made outside the session """
+        read_cache = self.get_read_cache()
+        if read_cache is not None:
+            read_cache['responses'] = {}
+
+    def config_dirty(self):
+        """ Has the configuration changed since it was last saved """
+        return self.config_writes != self.saved_config_writes
+
+    def mark_config_dirty(self, collection=None):
+        """ Record a change made outside of iControl REST, like an
+            iControl SOAP write to collection, e.g. '/net/arp'. Cached
+            reads of the collection are dropped, all cached reads if
+            the collection is not given. """
+        self.config_writes += 1
+        read_cache = self.get_read_cache()
+        if read_cache is None:
+            return
+        if collection:
+            self._invalidate_reads(
+                read_cache, 'https://%s/mgmt/tm%s' % (self.hostname,
+                                                      collection))
+        else:
+            read_cache['responses'] = {}
+
+    def config_saved(self, config_writes):
+        """ The configuration was saved after config_writes changes """
+        self.saved_config_writes = config_writes
+
+    def in_transaction(self):
+        """ Is a transaction open in this greenthread """
+        return self._get_transaction() is not None
+
+    def begin_transaction(self):
+        """ Queue writes from this greenthread until commit or abort """
+        self._local.transaction = {'id': None,
+                                   'writes': 0,
+                                   'after_commit': []}
+
+    def after_commit(self, method, *args, **kwargs):
+        """ Call method once the open transaction has been committed,
+            or immediately when there is no open transaction. """
+        transaction = self._get_transaction()
+        if transaction is None:
+            return method(*args, **kwargs)
+        transaction['after_commit'].append((method, args, kwargs))
+
+    def commit_transaction(self):
+        """ Apply all queued writes. Returns the number of writes. """
+        transaction = self._get_transaction()
+        self._local.transaction = None
+        self.clear_read_cache()
+        if transaction is None:
+            return 0
+        if transaction['id'] is not None:
+            request_url = 'https://%s/mgmt/tm/transaction/%s' % \
+                (self.hostname, transaction['id'])
+            response = self.patch(request_url,
+                                  data=json.dumps({'state': 'VALIDATING'}),
+                                  timeout=const.CONNECTION_TIMEOUT)
+            state = None
+            if response.status_code < 400:
+                state = json.loads(response.text).get('state')
+            if state != 'COMPLETED':
+                Log.error('transaction', response.text)
+                raise exceptions.TransactionCommitException(response.text)
+            self.stats['transactions'] += 1
+            self.stats['transaction_writes'] += transaction['writes']
+        for (method, args, kwargs) in transaction['after_commit']:
+            method(*args, **kwargs)
+        return transaction['writes']
+
+    def abort_transaction(self):
+        """ Discard all queued writes """
+        transaction = self._get_transaction()
+        self._local.transaction = None
+        self.clear_read_cache()
+        if transaction is None or transaction['id'] is None:
+            return
+        request_url = 'https://%s/mgmt/tm/transaction/%s' % \
+            (self.hostname, transaction['id'])
+        response = self.delete(request_url, timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code >= 400 and response.status_code != 404:
+            Log.error('transaction', response.text)
+
+    def get_stats(self):
+        """ Request counts and latencies by authentication mode """
+        stats = {'token_logins': self.stats['token_logins'],
+                 'token_login_failures': self.stats['token_login_failures'],
+                 'transactions': self.stats['transactions'],
+                 'transaction_writes': self.stats['transaction_writes'],
+                 'cached_reads': self.stats['cached_reads']}
+        for mode in ['token', 'basic']:
+            stats[mode] = dict(self.stats[mode])
+            if stats[mode]['requests']:
+                stats[mode]['avg_time'] = \
+                    stats[mode]['total_time'] / stats[mode]['requests']
+        return stats
+
+    def get_request_count(self):
+        """ Number of requests sent to the device """
+        return self.stats['token']['requests'] + \
+            self.stats['basic']['requests']
+
+    def _get_transaction(self):
+        """ Transaction open in this greenthread, if any """
+        return getattr(self._local, 'transaction', None)
+
+    def get_read_cache(self):
+        """ Read cache open in this greenthread, if any """
+        return getattr(self._local, 'read_cache', None)
+
+    def set_read_cache(self, read_cache):
+        """ Share the read cache of another greenthread with this one """
+        self._local.read_cache = read_cache
+
+    @staticmethod
+    def _read_cache_key(url, params=None):
+        """ Cache key of a GET, None if it must not be cached """
+        path = url.split('?', 1)[0]
+        if '/mgmt/tm/' not in path:
+            return None
+        for excluded in READ_CACHE_EXCLUDED:
+            if excluded in path:
+                return None
+        if params:
+            return url + '|' + json.dumps(params, sort_keys=True)
+        return url
+
+    @staticmethod
+    def _changes_config(url):
+        """ Does a write to url change the configuration """
+        path = url.split('?', 1)[0].rstrip('/')
+        if '/mgmt/tm/' not in path:
+            return False
+        # saving the config and running a config sync do not change it
+        return not (path.endswith('/sys/config') or
+                    path.endswith('/mgmt/tm/cm'))
+
+    @staticmethod
+    def _invalidate_reads(read_cache, url):
+        """ Drop cached reads of the collection a write to url changes """
+        path = url.split('?', 1)[0]
+        if '/mgmt/tm/' not in path or '/sys/folder' in path:
+            # unknown scope, or deleting a folder deletes its contents
+            read_cache['responses'] = {}
+            return
+        (tm_url, tm_path) = path.split('/mgmt/tm/', 1)
+        tm_url += '/mgmt/tm'
+        # module and collection, like /ltm/pool
+        collection = '/' + '/'.join(tm_path.split('/')[:2])
+        prefixes = [tm_url + collection]
+        for implied in READ_CACHE_IMPLIED.get(collection, []):
+            prefixes.append(tm_url + implied)
+        for key in list(read_cache['responses'].keys()):
+            for prefix in prefixes:
+                if key.startswith(prefix):
+                    del read_cache['responses'][key]
+                    break
+
+    def _create_transaction(self):
+        """ Create an iControl REST transaction and return its id """
+        request_url = 'https://%s/mgmt/tm/transaction' % self.hostname
+        response = self.post(request_url, data=json.dumps({}),
+                             timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            return json.loads(response.text)['transId']
+        else:
+            Log.error('transaction', response.text)
+            raise exceptions.TransactionCreationException(response.text)
+
+    def _record(self, mode, start_time, error=False):
+        """ Update request metrics """
+        elapsed = time.time() - start_time
+        mode_stats = self.stats[mode]
+        mode_stats['requests'] += 1
+        if error:
+            mode_stats['errors'] += 1
+        mode_stats['total_time'] += elapsed
+        mode_stats['max_time'] = max(mode_stats['max_time'], elapsed)
+
+    def _login(self):
+        """ Get a new auth token, or fall back to basic auth """
+        self.token = None
+        self.headers.pop(TOKEN_HEADER, None)
+        login_url = 'https://%s/mgmt/shared/authn/login' % self.hostname
+        payload = {'username': self.username,
+                   'password': self.password,
+                   'loginProviderName': 'tmos'}
+        response = super(IcrSession, self).request(
+            'POST', login_url, data=json.dumps(payload),
+            timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code < 400:
+            token = json.loads(response.text)['token']
+            self.token = token['token']
+            timeout = int(token.get('timeout', const.ICR_TOKEN_TIMEOUT))
+            self.token_expires = time.time() + \
+                max(timeout - const.ICR_TOKEN_REFRESH_MARGIN, 1)
+            self.headers[TOKEN_HEADER] = self.token
+            self.auth = None
+            self.stats['token_logins'] += 1
+        else:
+            Log.error('IcrSession', 'token login to %s failed, using basic '
+                      'auth: %s' % (self.hostname, response.text))
+            self.auth = (self.username, self.password)
+            self.token_expires = time.time() + const.ICR_TOKEN_RETRY_INTERVAL
+            self.stats['token_login_failures'] += 1
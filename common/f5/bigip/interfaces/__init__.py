@@ -240,6 +240,22 @@ def split_addr_port(dest):
     return (parts[0], parts[1])
 
 
+def member_key(address, port):
+    """ Normalized (address, route domain, port) of a pool member.
+        10.0.0.1%2 and 10.0.0.1 are different members, as are
+        10.0.0.1 and 10.0.0.10. IPv6 addresses compare in any
+        notation. """
+    route_domain = 0
+    if '%' in address:
+        address, route_domain = address.split('%', 1)
+        route_domain = int(route_domain)
+    try:
+        address = str(netaddr.IPAddress(address))
+    except (netaddr.AddrFormatError, ValueError):
+        address = address.lower()
+    return (address, route_domain, int(port))
+
+
 def log(method):
     """Decorator helping to log method calls."""
     def wrapper(*args, **kwargs):
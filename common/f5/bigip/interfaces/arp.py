@@ -77,6 +77,7 @@ class ARP(object):
                 entry = create_arp('Networking.ARP.StaticEntry')
                 entry.address = ip_address
                 entry.mac_address = mac_address
+                self.bigip.icr_session.mark_config_dirty('/net/arp')
                 self.net_arp.add_static_entry([entry])
                 return True
             except Exception as exc:
@@ -84,6 +85,52 @@ class ARP(object):
                 raise exceptions.StaticARPCreationException(exc.message)
         return False
 
+    @icontrol_folder
+    @log
+    def create_entries(self, entries=None, folder='Common'):
+        """ Create ARP static entries for a dict of ip address to mac
+            address in one request. Entries which exist in the folder
+            are skipped. Returns the ip addresses of created entries. """
+        if not entries:
+            return []
+        arp_index = self.get_index(folder=folder)
+        create_arp = self.net_arp.typefactory.create
+        new_entries = []
+        for ip_address in entries:
+            # ARP entries can't handle %0 on them like other
+            # TMOS objects.
+            address = self._remove_route_domain_zero(ip_address)
+            if address in arp_index:
+                continue
+            entry = create_arp('Networking.ARP.StaticEntry')
+            entry.address = address
+            entry.mac_address = entries[ip_address]
+            new_entries.append(entry)
+            arp_index.add(address)
+        if not new_entries:
+            return []
+        try:
+            self.bigip.icr_session.mark_config_dirty('/net/arp')
+            self.net_arp.add_static_entry(new_entries)
+        except Exception as exc:
+            Log.error('ARP', 'create exception: ' + exc.message)
+            raise exceptions.StaticARPCreationException(exc.message)
+        return [entry.address for entry in new_entries]
+
+    @icontrol_folder
+    @log
+    def get_index(self, folder='Common'):
+        """ Addresses of the ARP static entries in folder """
+        try:
+            arp_list = self.net_arp.get_static_entry_list()
+        except Exception as exc:
+            Log.error('ARP', 'query exception: %s on %s' %
+                      (exc.message, self.bigip.device_name))
+            raise exceptions.StaticARPQueryException(exc.message)
+        prefix = '/' + folder + '/'
+        return set([path[len(prefix):] for path in arp_list
+                    if path.startswith(prefix)])
+
     # pylint: disable=pointless-string-statement
     '''
     @icontrol_rest_folder
@@ -115,6 +162,7 @@ class ARP(object):
             # TMOS objects.
             ip_address = self._remove_route_domain_zero(ip_address)
             try:
+                self.bigip.icr_session.mark_config_dirty('/net/arp')
                 self.net_arp.delete_static_entry_v2(
                     ['/' + folder + '/' + ip_address])
                 return True
@@ -277,6 +325,7 @@ class ARP(object):
     def delete_all(self, folder='Common'):
         """ Delete all ARP entries """
         try:
+            self.bigip.icr_session.mark_config_dirty('/net/arp')
             self.net_arp.delete_all_static_entries()
         except Exception as exc:
             Log.error('ARP', 'delete exception: ' + exc.message)
@@ -22,6 +22,7 @@ import time
 import os
 import json
 import base64
+import random
 
 
 # Management - Cluster
@@ -31,6 +32,8 @@ class Cluster(object):
 
         self.bigip.icontrol.add_interfaces(['Management.Trust'])
         self.mgmt_trust = self.bigip.icontrol.Management.Trust
+        # device group name -> sync counts and latency histogram
+        self.sync_stats = {}
 
     @log
     def get_sync_status(self):
@@ -72,10 +75,13 @@ class Cluster(object):
         request_url = self.bigip.icr_url + '/sys/config'
         payload = dict()
         payload['command'] = 'save'
+        # changes made while saving leave the configuration dirty
+        config_writes = self.bigip.icr_session.config_writes
         response = self.bigip.icr_session.post(
             request_url, data=json.dumps(payload),
             timeout=const.CONNECTION_TIMEOUT)
         if response.status_code < 400:
+            self.bigip.icr_session.config_saved(config_writes)
             return True
         else:
             Log.error('config', response.text)
@@ -139,119 +145,129 @@ class Cluster(object):
     # In order to avoid sync problems, you should wait until devices
     # in the group are connected.
     @log
-    def sync(self, name, force_now=False):
-        """ Ensure local device in sync with group """
+    def sync(self, name, force_now=False, max_time=None):
+        """ Ensure local device in sync with group.
+
+            The sync status is polled with a jittered exponential
+            backoff, starting at SYNC_POLL_INITIAL seconds, so that a
+            quick sync is seen as soon as it completes. A pending
+            sync is pushed to the group again with a growing delay
+            until max_time seconds have passed. """
         sync_start_time = time.time()
+        if max_time is None:
+            max_time = const.SYNC_MAX_TIME
+        deadline = sync_start_time + max_time
         dev_name = self.get_local_device_name()
-        sleep_delay = const.SYNC_DELAY
 
         attempts = 0
+        push_delay = const.SYNC_DELAY
+        last_push_time = None
         if force_now:
             self.sync_local_device_to_group(name)
-            time.sleep(sleep_delay)
+            last_push_time = time.time()
             attempts += 1
 
-        while attempts < const.MAX_SYNC_ATTEMPTS:
+        poll_delay = const.SYNC_POLL_INITIAL
+        last_log_time = 0
+        while True:
             state = self.get_sync_status()
+            now = time.time()
             if state in ['Standalone', 'In Sync']:
-                break
-
-            elif state == 'Awaiting Initial Sync':
-                attempts += 1
-                Log.info(
-                    'Cluster',
-                    "Device %s - Synchronizing initial config to group %s"
-                    % (dev_name, name))
-                self.sync_local_device_to_group(name)
-                time.sleep(sleep_delay)
+                self._record_sync(name, now - sync_start_time)
+                Log.debug('Cluster', 'SYNC SECONDS(Success): ' +
+                          str(now - sync_start_time))
+                return
 
-            elif state in ['Disconnected',
-                           'Not All Devices Synced',
-                           'Changes Pending']:
-                attempts += 1
-
-                last_log_time = 0
-                now = time.time()
-                wait_start_time = now
-                # Keep checking the sync state in a quick loop.
-                # We want to detect In Sync as quickly as possible.
-                while now - wait_start_time < sleep_delay:
-                    # Only log once per second
-                    if now - last_log_time >= 1:
-                        Log.info(
-                            'Cluster',
-                            'Device %s, Group %s not synced. '
-                            % (dev_name, name) +
-                            'Waiting. State is: %s'
-                            % state)
-                        last_log_time = now
-                    state = self.get_sync_status()
-                    if state in ['Standalone', 'In Sync']:
-                        break
-                    time.sleep(.5)
-                    now = time.time()
-                else:
-                    # if we didn't break out due to the group being in sync
-                    # then attempt to force a sync.
-                    self.sync_local_device_to_group(name)
-                    sleep_delay += const.SYNC_DELAY
-                    # no need to sleep here because we already spent the sleep
-                    # interval checking status.
-                    continue
-
-                # Only a break from the inner while loop due to Standalone or
-                # In Sync will reach here.
-                # Normal exit of the while loop reach the else statement
-                # above which continues the outer loop
-                break
-
-            elif state == 'Sync Failure':
+            if state == 'Sync Failure':
                 Log.info('Cluster',
                          "Device %s - Synchronization failed for %s"
                          % (dev_name, name))
                 Log.debug('Cluster', 'SYNC SECONDS (Sync Failure): ' +
-                          str(time.time() - sync_start_time))
+                          str(now - sync_start_time))
+                self._record_sync(name, now - sync_start_time, failed=True)
                 raise exceptions.BigIPClusterSyncFailure(
                     'Device service group %s' % name +
                     ' failed after ' +
-                    '%s attempts.' % const.MAX_SYNC_ATTEMPTS +
+                    '%s attempts.' % attempts +
                     ' Correct sync problem manually' +
                     ' according to sol13946 on ' +
                     ' support.f5.com.')
-            else:
-                attempts += 1
-                Log.info('Cluster',
-                         "Device %s " % dev_name +
-                         "Synchronizing config attempt %s to group %s:"
-                         % (attempts, name) + " current state: %s" % state)
-                self.sync_local_device_to_group(name)
-                time.sleep(sleep_delay)
-                sleep_delay += const.SYNC_DELAY
-        else:
-            if state == 'Disconnected':
-                Log.debug('Cluster',
-                          'SYNC SECONDS(Disconnected): ' +
-                          str(time.time() - sync_start_time))
-                raise exceptions.BigIPClusterSyncFailure(
-                    'Device service group %s' % name +
-                    ' could not reach a sync state' +
-                    ' because they can not communicate' +
-                    ' over the sync network. Please' +
-                    ' check connectivity.')
-            else:
+
+            if now >= deadline or attempts >= const.MAX_SYNC_ATTEMPTS:
+                self._record_sync(name, now - sync_start_time, failed=True)
+                if state == 'Disconnected':
+                    Log.debug('Cluster',
+                              'SYNC SECONDS(Disconnected): ' +
+                              str(now - sync_start_time))
+                    raise exceptions.BigIPClusterSyncFailure(
+                        'Device service group %s' % name +
+                        ' could not reach a sync state' +
+                        ' because they can not communicate' +
+                        ' over the sync network. Please' +
+                        ' check connectivity.')
                 Log.debug('Cluster', 'SYNC SECONDS(Timeout): ' +
-                          str(time.time() - sync_start_time))
+                          str(now - sync_start_time))
                 raise exceptions.BigIPClusterSyncFailure(
                     'Device service group %s' % name +
                     ' could not reach a sync state after ' +
-                    '%s attempts.' % const.MAX_SYNC_ATTEMPTS +
+                    '%s attempts.' % attempts +
                     ' It is in %s state currently.' % state +
                     ' Correct sync problem manually' +
                     ' according to sol13946 on ' +
                     ' support.f5.com.')
 
-        Log.debug('Cluster', 'SYNC SECONDS(Success): ' +
-                  str(time.time() - sync_start_time))
+            # push the config when nothing was pushed yet, or when
+            # the last push did not bring the group in sync in time
+            if last_push_time is None or \
+                    now - last_push_time >= push_delay:
+                if last_push_time is not None:
+                    push_delay *= 2
+                attempts += 1
+                Log.info('Cluster',
+                         "Device %s " % dev_name +
+                         "Synchronizing config attempt %s to group %s:"
+                         % (attempts, name) + " current state: %s" % state)
+                self.sync_local_device_to_group(name)
+                last_push_time = time.time()
+            elif now - last_log_time >= 1:
+                # Only log once per second
+                Log.info('Cluster',
+                         'Device %s, Group %s not synced. '
+                         % (dev_name, name) +
+                         'Waiting. State is: %s' % state)
+                last_log_time = now
+
+            # jitter keeps agents sharing a group from polling in step
+            sleep_time = poll_delay * random.uniform(0.8, 1.2)
+            time.sleep(max(0, min(sleep_time, deadline - time.time())))
+            poll_delay = min(poll_delay * 2, const.SYNC_POLL_MAX)
+
+    def _record_sync(self, name, elapsed, failed=False):
+        """ Add a sync of device group name to the latency histogram """
+        if name not in self.sync_stats:
+            buckets = {}
+            for bucket in const.SYNC_LATENCY_BUCKETS:
+                buckets['<=%s' % bucket] = 0
+            buckets['>%s' % const.SYNC_LATENCY_BUCKETS[-1]] = 0
+            self.sync_stats[name] = {'syncs': 0,
+                                     'failures': 0,
+                                     'total_time': 0.0,
+                                     'max_time': 0.0,
+                                     'latency': buckets}
+        group_stats = self.sync_stats[name]
+        if failed:
+            group_stats['failures'] += 1
+            return
+        group_stats['syncs'] += 1
+        group_stats['total_time'] += elapsed
+        group_stats['max_time'] = max(group_stats['max_time'], elapsed)
+        for bucket in const.SYNC_LATENCY_BUCKETS:
+            if elapsed <= bucket:
+                group_stats['latency']['<=%s' % bucket] += 1
+                break
+        else:
+            group_stats['latency'][
+                '>%s' % const.SYNC_LATENCY_BUCKETS[-1]] += 1
 
     @log
     def sync_failover_dev_group_exists(self, name):
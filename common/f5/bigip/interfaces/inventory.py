@@ -0,0 +1,232 @@
+""" Inventory of the objects on a bigip and orphan collection """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# pylint: disable=broad-except
+
+from f5.common.logger import Log
+from f5.common import constants as const
+from f5.bigip import exceptions
+from f5.bigip.interfaces import log
+
+import json
+import os
+import time
+
+# collections listed in one query each
+INVENTORY_COLLECTIONS = {'pools': '/ltm/pool',
+                         'virtuals': '/ltm/virtual',
+                         'rules': '/ltm/rule',
+                         'snatpools': '/ltm/snatpool',
+                         'snats': '/ltm/snat-translation'}
+# collections with one sub collection per type
+INVENTORY_TYPED_COLLECTIONS = {'profiles': '/ltm/profile',
+                               'persistence': '/ltm/persistence',
+                               'monitors': '/ltm/monitor'}
+# network collections, listed with all objects
+NETWORK_COLLECTIONS = {'route_domains': ('/net/route-domain',
+                                         'id,partition,vlans'),
+                       'vlans': ('/net/vlan', 'name,partition,tag'),
+                       'tunnels': ('/net/tunnels/tunnel',
+                                   'name,partition,key'),
+                       'selfips': ('/net/self',
+                                   'name,partition,address,vlan')}
+# objects are deleted in this order, so nothing is deleted while
+# another object still refers to it
+PURGE_ORDER = ['virtuals', 'persistence', 'profiles', 'rules',
+               'pools', 'monitors', 'snatpools', 'snats']
+
+
+class Inventory(object):
+    """ Takes one snapshot of the plugin's LTM objects in all
+        partitions of a bigip and purges orphans from it.
+
+        Instead of listing a partition again for every orphan, the
+        objects to delete are found in memory and deleted in
+        dependency order. The network objects of all partitions can
+        be listed the same way. """
+
+    OBJ_PREFIX = 'uuid_'
+
+    def __init__(self, bigip):
+        self.bigip = bigip
+
+    @log
+    def get_snapshot(self):
+        """ Folders and plugin objects of all partitions, by kind.
+            Objects are dicts with name, partition and selfLink. """
+        snapshot = {'folders': self.bigip.system.get_folders()}
+        for kind, path in INVENTORY_COLLECTIONS.items():
+            select = 'name,partition,selfLink'
+            if kind == 'virtuals':
+                select += ',pool'
+            snapshot[kind] = self._get_objects(
+                self.bigip.icr_url + path + '?$select=' + select)
+        for kind, path in INVENTORY_TYPED_COLLECTIONS.items():
+            snapshot[kind] = self._get_typed_objects(path)
+        return snapshot
+
+    @log
+    def get_network_snapshot(self):
+        """ Route domains, VLANs, tunnels and self IPs of all
+            partitions, from one query each """
+        snapshot = {}
+        for kind, (path, select) in NETWORK_COLLECTIONS.items():
+            snapshot[kind] = self._get_objects(
+                self.bigip.icr_url + path + '?$select=' + select,
+                prefixed_only=False)
+        return snapshot
+
+    @log
+    def purge_orphans(self, known_pools, known_folders):
+        """ Delete plugin objects of pools which are not in known_pools
+            and the contents of plugin folders which are not in
+            known_folders. Returns counts of deleted objects, errors and
+            REST calls made. """
+        start_time = time.time()
+        start_calls = self.bigip.icr_session.get_request_count()
+        snapshot = self.get_snapshot()
+        orphans = self.get_orphans(snapshot, known_pools, known_folders)
+
+        stats = {'errors': 0}
+        for kind in PURGE_ORDER:
+            stats[kind] = 0
+            for obj in orphans[kind]:
+                try:
+                    if kind == 'pools':
+                        # also removes the nodes of the pool
+                        self.bigip.pool.delete(name=obj['name'],
+                                               folder=obj['partition'])
+                    else:
+                        self._delete(obj)
+                    stats[kind] += 1
+                except Exception as exc:
+                    Log.error('inventory', 'purging %s %s failed: %s'
+                              % (kind, obj['name'], exc.message))
+                    stats['errors'] += 1
+        # network objects are not part of the snapshot, there are few
+        # of them and only orphaned folders hold them
+        for folder in orphans['folders']:
+            try:
+                self.bigip.arp.delete_all(folder=folder)
+                self.bigip.selfip.delete_all(folder=folder)
+                self.bigip.vlan.delete_all(folder=folder)
+                self.bigip.l2gre.delete_all(folder=folder)
+                self.bigip.route.delete_domain(folder=folder)
+            except Exception as exc:
+                Log.error('inventory', 'purging folder %s failed: %s'
+                          % (folder, exc.message))
+                stats['errors'] += 1
+        stats['folders'] = len(orphans['folders'])
+        stats['rest_calls'] = \
+            self.bigip.icr_session.get_request_count() - start_calls
+        stats['time'] = time.time() - start_time
+        return stats
+
+    def get_orphans(self, snapshot, known_pools, known_folders):
+        """ Objects of snapshot to purge, by kind, and the orphaned
+            folders """
+        known_folders = set([self.bigip.decorate_folder(folder)
+                             for folder in known_folders])
+        orphan_folders = set()
+        for folder in snapshot['folders']:
+            # iapp folders are purged by removing the iapp
+            if folder.startswith(self.OBJ_PREFIX) and \
+                    not folder.endswith('.app') and \
+                    folder not in known_folders:
+                orphan_folders.add(folder)
+        known_pools = set([self.OBJ_PREFIX + pool for pool in known_pools])
+
+        orphans = {'folders': sorted(orphan_folders)}
+        # (partition, pool name) of the pools to purge
+        pools = set()
+        orphans['pools'] = []
+        for pool in snapshot['pools']:
+            if pool['partition'] in orphan_folders or \
+                    pool['name'] not in known_pools:
+                pools.add((pool['partition'], pool['name']))
+                orphans['pools'].append(pool)
+
+        # partition -> names of the virtual servers to purge
+        virtuals = {}
+        orphans['virtuals'] = []
+        for virtual in snapshot['virtuals']:
+            pool_name = os.path.basename(virtual.get('pool', ''))
+            if virtual['partition'] in orphan_folders or \
+                    (virtual['partition'], pool_name) in pools:
+                virtuals.setdefault(virtual['partition'], []).append(
+                    virtual['name'])
+                orphans['virtuals'].append(virtual)
+
+        # objects named after a virtual server belong to it
+        for kind in ['persistence', 'profiles', 'rules']:
+            orphans[kind] = []
+            for obj in snapshot[kind]:
+                if obj['partition'] in orphan_folders:
+                    orphans[kind].append(obj)
+                    continue
+                for virtual_name in virtuals.get(obj['partition'], []):
+                    if obj['name'].find(virtual_name) > -1:
+                        orphans[kind].append(obj)
+                        break
+
+        for kind in ['monitors', 'snatpools', 'snats']:
+            orphans[kind] = [obj for obj in snapshot[kind]
+                             if obj['partition'] in orphan_folders]
+        return orphans
+
+    def _get_objects(self, request_url, prefixed_only=True):
+        """ Objects of a collection in all partitions, only those of
+            the plugin if prefixed_only """
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        objects = []
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            for obj in return_obj.get('items', []):
+                if not prefixed_only or \
+                        obj['name'].startswith(self.OBJ_PREFIX):
+                    objects.append(obj)
+        elif response.status_code != 404:
+            Log.error('inventory', response.text)
+            raise exceptions.SystemQueryException(response.text)
+        return objects
+
+    def _get_typed_objects(self, path):
+        """ Plugin objects of all types of a collection in all
+            partitions """
+        request_url = self.bigip.icr_url + path
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        objects = []
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            for obj_type in return_obj.get('items', []):
+                type_url = self.bigip.icr_link(
+                    obj_type['reference']['link']).split('?')[0]
+                objects.extend(self._get_objects(
+                    type_url + '?$select=name,partition,selfLink'))
+        elif response.status_code != 404:
+            Log.error('inventory', response.text)
+            raise exceptions.SystemQueryException(response.text)
+        return objects
+
+    def _delete(self, obj):
+        """ Delete obj by its selfLink """
+        response = self.bigip.icr_session.delete(
+            self.bigip.icr_link(obj['selfLink'].split('?')[0]),
+            timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code > 399 and response.status_code != 404:
+            Log.error('inventory', response.text)
+            raise exceptions.SystemDeleteException(response.text)
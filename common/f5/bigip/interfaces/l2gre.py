@@ -266,6 +266,8 @@ class L2GRE(object):
     @log
     def add_fdb_entries(self, fdb_entries=None):
         """ Add fdb entries for a tunnel """
+        # folder -> {ip address: mac address} of static ARP entries
+        arp_entries = {}
         for tunnel_name in fdb_entries:
             folder = fdb_entries[tunnel_name]['folder']
             if folder != 'Common':
@@ -306,18 +308,20 @@ class L2GRE(object):
                 timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
                 if const.FDB_POPULATE_STATIC_ARP:
+                    folder_entries = arp_entries.setdefault(folder, {})
                     for mac in new_arp_addresses:
-                        try:
-                            self.bigip.arp.create(
-                                ip_address=new_arp_addresses[mac],
-                                mac_address=mac,
-                                folder=folder)
-                        except Exception as exc:
-                            Log.error('L2GRE',
-                                      'could not create static arp: %s'
-                                      % exc.message)
-            return True
-        return False
+                        folder_entries[new_arp_addresses[mac]] = mac
+            else:
+                Log.error('L2GRE', response.text)
+        # one request per folder for the ARP entries of all tunnels
+        for folder in arp_entries:
+            try:
+                self.bigip.arp.create_entries(entries=arp_entries[folder],
+                                              folder=folder)
+            except Exception as exc:
+                Log.error('L2GRE', 'could not create static arp: %s'
+                          % exc.message)
+        return len(fdb_entries) > 0
 
     @icontrol_rest_folder
     @log
@@ -462,9 +466,9 @@ class L2GRE(object):
     @log
     def get_tunnels(self, folder='Common'):
         """ Get tunnels """
-        folder = str(folder).replace('/', '')
         request_url = self.bigip.icr_url + '/net/tunnels/tunnel'
         if folder:
+            folder = str(folder).replace('/', '')
             request_filter = 'partition eq ' + folder
             request_url += '?$filter=' + request_filter
         response = self.bigip.icr_session.get(
@@ -16,6 +16,7 @@
 from f5.common.logger import Log
 from f5.common import constants as const
 from f5.bigip.interfaces import icontrol_rest_folder
+from f5.bigip.interfaces import member_key
 from f5.bigip.interfaces import strip_folder_and_prefix
 from f5.bigip.interfaces import split_addr_port
 from f5.bigip import exceptions
@@ -79,28 +80,38 @@ class Pool(object):
             response = self.bigip.icr_session.delete(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400 or response.status_code == 404:
-                for node_address in node_addresses:
-                    node_url = self.bigip.icr_url + '/ltm/node/'
-                    node_url += '~' + folder + '~' + urllib.quote(node_address)
-                    node_res = self.bigip.icr_session.delete(
-                        node_url, timeout=const.CONNECTION_TIMEOUT)
-                    # we only care if this works.  Otherwise node is likely
-                    # in use by another pool
-                    if node_res.status_code < 400:
-                        self._del_arp_and_fdb(node_address, folder)
-                    elif node_res.status_code == 400 and \
-                            node_res.text.find('is referenced') > 0:
-                        # same node can be in multiple pools
-                        pass
-                    else:
-                        raise exceptions.PoolDeleteException(node_res.text)
+                deleted_addresses = []
+                try:
+                    for node_address in node_addresses:
+                        node_url = self.bigip.icr_url + '/ltm/node/'
+                        node_url += '~' + folder + '~' + \
+                            urllib.quote(node_address)
+                        node_res = self.bigip.icr_session.delete(
+                            node_url, timeout=const.CONNECTION_TIMEOUT)
+                        # we only care if this works.  Otherwise node is
+                        # likely in use by another pool
+                        if node_res.status_code < 400:
+                            deleted_addresses.append(node_address)
+                        elif node_res.status_code == 400 and \
+                                node_res.text.find('is referenced') > 0:
+                            # same node can be in multiple pools
+                            pass
+                        else:
+                            raise exceptions.PoolDeleteException(
+                                node_res.text)
+                finally:
+                    self._del_arp_and_fdb(deleted_addresses, folder)
             return True
         return False
 
     # best effort ARP and fdb cleanup
-    def _del_arp_and_fdb(self, ip_address, folder):
-        if not const.FDB_POPULATE_STATIC_ARP:
+    def _del_arp_and_fdb(self, ip_addresses, folder):
+        """ Delete the static ARP entries of the ip_addresses and the
+            fdb records of their MAC addresses, listing the ARP entries
+            and the fdb tunnels of the folder once """
+        if not const.FDB_POPULATE_STATIC_ARP or not ip_addresses:
             return
+        ip_addresses = set(ip_addresses)
         arp_req = self.bigip.icr_url + '/net/arp'
         arp_req += '?$select=ipAddress,macAddress,selfLink'
         arp_req += '&$filter=partition eq ' + folder
@@ -111,8 +122,9 @@ class Pool(object):
         arp_obj = json.loads(arp_res.text)
         if 'items' not in arp_obj:
             return
+        mac_addresses = set()
         for arp in arp_obj['items']:
-            if ip_address != arp['ipAddress']:
+            if arp['ipAddress'] not in ip_addresses:
                 continue
             # iControl REST ARP is broken < 11.7
             # self.bigip.arp.delete(
@@ -122,34 +134,32 @@ class Pool(object):
                 self.bigip.arp.delete(arp['ipAddress'], folder=folder)
             except Exception as exc:
                 Log.error('ARP', exc.message)
-            fdb_req = self.bigip.icr_url + '/net/fdb/tunnel'
-            fdb_req += '?$select=records,selfLink'
-            fdb_req += '&$filter=partition eq ' + folder
-            response = self.bigip.icr_session.get(
-                fdb_req, timeout=const.CONNECTION_TIMEOUT)
-            if not response.status_code < 400:
+            mac_addresses.add(arp['macAddress'])
+        if not mac_addresses:
+            return
+        fdb_req = self.bigip.icr_url + '/net/fdb/tunnel'
+        fdb_req += '?$select=records,selfLink'
+        fdb_req += '&$filter=partition eq ' + folder
+        response = self.bigip.icr_session.get(
+            fdb_req, timeout=const.CONNECTION_TIMEOUT)
+        if not response.status_code < 400:
+            return
+        fdb_obj = json.loads(response.text)
+        for tunnel in fdb_obj.get('items', []):
+            if 'records' not in tunnel:
                 continue
-            fdb_obj = json.loads(response.text)
-            if 'items' not in fdb_obj:
+            records = [record for record in tunnel['records']
+                       if record['name'] not in mac_addresses]
+            if len(records) == len(tunnel['records']):
                 continue
-            for tunnel in fdb_obj['items']:
-                if 'records' not in tunnel:
-                    continue
-                records = list(tunnel['records'])
-                need_to_update = False
-                for record in tunnel['records']:
-                    if record['name'] == arp['macAddress']:
-                        records.remove(record)
-                        need_to_update = True
-                if need_to_update:
-                    payload = dict()
-                    payload['records'] = records
-                    response = self.bigip.icr_session.put(
-                        self.bigip.icr_link(tunnel['selfLink']),
-                        data=json.dumps(payload),
-                        timeout=const.CONNECTION_TIMEOUT)
-                if response.status_code > 399:
-                    Log.error('fdb', response.text)
+            payload = dict()
+            payload['records'] = records
+            response = self.bigip.icr_session.patch(
+                self.bigip.icr_link(tunnel['selfLink'].split('?')[0]),
+                data=json.dumps(payload),
+                timeout=const.CONNECTION_TIMEOUT)
+            if response.status_code > 399:
+                Log.error('fdb', response.text)
 
     @icontrol_rest_folder
     @log
@@ -181,7 +191,7 @@ class Pool(object):
             folder = str(folder).replace('/', '')
             request_url = self.bigip.icr_url + '/ltm/pool/'
             request_url += '~' + folder + '~' + name
-            request_url += '/members?$select=name'
+            request_url += '/members?$select=name,session,ratio'
             response = self.bigip.icr_session.get(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             members = []
@@ -190,9 +200,13 @@ class Pool(object):
                 if 'items' in return_obj:
                     for member in return_obj['items']:
                         (addr, port) = split_addr_port(member['name'])
-                        members.append(
-                            {'addr': addr,
-                             'port': int(port)})
+                        pool_member = {'addr': addr,
+                                       'port': int(port)}
+                        if 'session' in member:
+                            pool_member['session'] = member['session']
+                        if 'ratio' in member:
+                            pool_member['ratio'] = int(member['ratio'])
+                        members.append(pool_member)
             elif response.status_code != 404:
                 Log.error('pool', response.text)
                 raise exceptions.PoolQueryException(response.text)
@@ -221,6 +235,26 @@ class Pool(object):
             raise exceptions.PoolQueryException(response.text)
         return pool_names
 
+    @log
+    def get_all_pool_ids(self):
+        """ Names without prefix of all pools created by the plugin,
+            in all partitions, from one query """
+        request_url = self.bigip.icr_url + '/ltm/pool'
+        request_url += '?$select=name,partition'
+
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        pool_ids = set()
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            for pool in return_obj.get('items', []):
+                if pool['name'].startswith(self.OBJ_PREFIX):
+                    pool_ids.add(pool['name'][len(self.OBJ_PREFIX):])
+        elif response.status_code != 404:
+            Log.error('pool', response.text)
+            raise exceptions.PoolQueryException(response.text)
+        return pool_ids
+
     @log
     def purge_orphaned_pools(self, known_pools, delete_virtual_server=True):
         request_url = self.bigip.icr_url + '/ltm/pool'
@@ -318,6 +352,73 @@ class Pool(object):
             return members
         return None
 
+    @log
+    def get_all_statistics(self):
+        """ Statistics of every pool on the device in one query,
+            keyed by pool path (/folder/name). """
+        request_url = self.bigip.icr_url + '/ltm/pool/stats'
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        all_stats = {}
+        if response.status_code < 400:
+            return_obj = json.loads(response.text)
+            for entry in return_obj.get('entries', {}).values():
+                if 'nestedStats' not in entry:
+                    continue
+                stats = entry['nestedStats']['entries']
+                if 'tmName' not in stats:
+                    continue
+                pool_stats = {}
+                for name in stats:
+                    value = None
+                    if 'value' in stats[name]:
+                        value = stats[name]['value']
+                    if 'description' in stats[name]:
+                        value = stats[name]['description']
+                    if value is None:
+                        continue
+                    (st, val) = self._get_icontrol_stat(name, value)
+                    if st:
+                        pool_stats[st] = val
+                all_stats[stats['tmName']['description']] = pool_stats
+        elif response.status_code != 404:
+            Log.error('pool', response.text)
+            raise exceptions.PoolQueryException(response.text)
+        return all_stats
+
+    @log
+    def get_all_members_monitor_status(self):
+        """ Monitor status of every pool member on the device in one
+            query, keyed by pool path (/folder/name). Returns None if
+            the device does not support the query. """
+        request_url = self.bigip.icr_url + '/ltm/pool/members/stats'
+        response = self.bigip.icr_session.get(
+            request_url, timeout=const.CONNECTION_TIMEOUT)
+        if response.status_code == 404 or response.status_code == 400:
+            return None
+        elif response.status_code >= 400:
+            Log.error('pool', response.text)
+            raise exceptions.PoolQueryException(response.text)
+        all_members = {}
+        return_obj = json.loads(response.text)
+        for entry in return_obj.get('entries', {}).values():
+            if 'nestedStats' not in entry:
+                continue
+            stats = entry['nestedStats']['entries']
+            if 'poolName' not in stats or 'monitorStatus' not in stats:
+                continue
+            pool_path = stats['poolName']['description']
+            member_state = 'MONITOR_STATUS_' + \
+                stats['monitorStatus']['description'].upper().replace(' ',
+                                                                      '_')
+            if pool_path not in all_members:
+                all_members[pool_path] = []
+            all_members[pool_path].append(
+                {'addr': stats['addr']['description'],
+                 'port': stats['port']['value'],
+                 'state': member_state})
+        return all_members
+
     @icontrol_rest_folder
     @log
     def get_statistics(self, name=None, folder='Common', config_mode='object'):
@@ -392,6 +493,71 @@ class Pool(object):
                 raise exceptions.PoolCreationException(response.text)
         return False
 
+    @icontrol_rest_folder
+    @log
+    def replace_members(self, name=None, members=None, folder='Common',
+                        existing_members=None, lb_method=None):
+        """ Replace all pool members with one write of the pool's
+            members collection. members is a list of dicts with
+            address, port, enabled and ratio. Members not in the list
+            are removed and their nodes are deleted. existing_members,
+            as returned by get_members, saves a query for them.
+            lb_method is set in the same write when given. """
+        if name:
+            folder = str(folder).replace('/', '')
+            if existing_members is None:
+                existing_members = self.get_members(name=name, folder=folder)
+            request_url = self.bigip.icr_url + '/ltm/pool/'
+            request_url += '~' + folder + '~' + name
+            payload = dict()
+            payload['members'] = []
+            # (address, route domain) of the nodes still in use
+            nodes = set()
+            for member in members or []:
+                ip_address = member['address']
+                pool_member = dict()
+                if ':' in ip_address:
+                    pool_member['name'] = \
+                        ip_address + '.' + str(member['port'])
+                else:
+                    pool_member['name'] = \
+                        ip_address + ':' + str(member['port'])
+                pool_member['partition'] = folder
+                pool_member['address'] = ip_address
+                if member.get('enabled', True):
+                    pool_member['session'] = 'user-enabled'
+                else:
+                    pool_member['session'] = 'user-disabled'
+                pool_member['ratio'] = int(member.get('ratio', 1))
+                payload['members'].append(pool_member)
+                nodes.add(member_key(ip_address, 0)[:2])
+            if lb_method:
+                payload['loadBalancingMode'] = \
+                    self._get_rest_lb_method_type(lb_method)
+            response = self.bigip.icr_session.patch(
+                request_url, data=json.dumps(payload),
+                timeout=const.CONNECTION_TIMEOUT)
+            if response.status_code < 400:
+                removed = []
+                for member in existing_members or []:
+                    node = member_key(member['addr'], 0)[:2]
+                    if node not in nodes:
+                        nodes.add(node)
+                        removed.append(member['addr'])
+                if removed:
+                    self.bigip.after_commit(self._remove_member_nodes,
+                                            removed, folder)
+                return True
+            elif response.status_code == 404:
+                Log.error('pool',
+                          'tried to replace members of non-existant pool %s.'
+                          % ('/' + folder + '/' + name))
+                return False
+            else:
+                Log.error('pool', response.text)
+                raise exceptions.PoolUpdateException(response.text)
+        return False
+
     @icontrol_rest_folder
     @log
     def enable_member(self, name=None, ip_address=None, port=None,
@@ -506,7 +672,22 @@ class Pool(object):
             response = self.bigip.icr_session.delete(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400 or response.status_code == 404:
-                # delete nodes
+                # the node is still referenced until a transaction
+                # removing the member has been committed
+                self.bigip.after_commit(self._remove_member_nodes,
+                                        [ip_address], folder)
+            else:
+                Log.error('pool', response.text)
+                raise exceptions.PoolDeleteException(response.text)
+        return False
+
+    def _remove_member_nodes(self, ip_addresses, folder):
+        """ Delete nodes of removed members unless other pools use
+            them, then clean up ARP and fdb entries of the deleted
+            nodes at once """
+        deleted_addresses = []
+        try:
+            for ip_address in ip_addresses:
                 node_req = self.bigip.icr_url + '/ltm/node/'
                 node_req += '~' + folder + '~' + urllib.quote(ip_address)
                 response = self.bigip.icr_session.delete(
@@ -520,11 +701,9 @@ class Pool(object):
                     Log.error('node', response.text)
                     raise exceptions.PoolDeleteException(response.text)
                 else:
-                    self._del_arp_and_fdb(ip_address, folder)
-            else:
-                Log.error('pool', response.text)
-                raise exceptions.PoolDeleteException(response.text)
-        return False
+                    deleted_addresses.append(ip_address)
+        finally:
+            self._del_arp_and_fdb(deleted_addresses, folder)
 
     @icontrol_rest_folder
     @log
@@ -537,14 +716,14 @@ class Pool(object):
             request_url, timeout=const.CONNECTION_TIMEOUT)
         if response.status_code < 400:
             return_obj = json.loads(response.text)
-            if 'items' in return_obj:
-                for node in return_obj['items']:
-                    ip_address = node['address']
-                    response = self.bigip.icr_session.delete(
-                        self.bigip.icr_link(node['selfLink']),
-                        timeout=const.CONNECTION_TIMEOUT)
-                    if response.status_code < 400:
-                        self._del_arp_and_fdb(ip_address, folder)
+            deleted_addresses = []
+            for node in return_obj.get('items', []):
+                response = self.bigip.icr_session.delete(
+                    self.bigip.icr_link(node['selfLink']),
+                    timeout=const.CONNECTION_TIMEOUT)
+                if response.status_code < 400:
+                    deleted_addresses.append(node['address'])
+            self._del_arp_and_fdb(deleted_addresses, folder)
         elif response.status_code != 404:
             Log.error('node', response.text)
             return False
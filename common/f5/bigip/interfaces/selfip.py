@@ -230,10 +230,10 @@ class SelfIP(object):
     @log
     def get_selfip_list(self, folder='Common'):
         """ Get selfips """
-        folder = str(folder).replace('/', '')
         request_url = self.bigip.icr_url + '/net/self/'
         request_url += '?$select=name'
         if folder:
+            folder = str(folder).replace('/', '')
             request_filter = 'partition eq ' + folder
             request_url += '&$filter=' + request_filter
         response = self.bigip.icr_session.get(
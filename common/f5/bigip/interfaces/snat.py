@@ -194,10 +194,10 @@ class SNAT(object):
     @log
     def get_snataddresses(self, folder='Common'):
         """ Get SNAT addresses """
-        folder = str(folder).replace('/', '')
         request_url = self.bigip.icr_url + '/ltm/snat-translation/'
         request_url += '?$select=name'
         if folder:
+            folder = str(folder).replace('/', '')
             request_filter = 'partition eq ' + folder
             request_url += '&$filter=' + request_filter
         response = self.bigip.icr_session.get(
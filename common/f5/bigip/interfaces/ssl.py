@@ -274,6 +274,8 @@ class SSL(object):
             user_default_parent = False
 
         if not self.client_profile_exits(name=profile_name, folder=folder):
+            self.bigip.icr_session.mark_config_dirty(
+                '/ltm/profile/client-ssl')
             # add certificates to group
             self.mgmt_keycert.certificate_import_from_pem(
                 mode='MANAGEMENT_MODE_DEFAULT',
@@ -336,6 +338,8 @@ class SSL(object):
         profile_name = certificate.certifcate_id
 
         if self.client_profile_exits(name=profile_name, folder=folder):
+            self.bigip.icr_session.mark_config_dirty(
+                '/ltm/profile/client-ssl')
             # remove ssl profile
             self.lb_clientssl.delete_profile([profile_name])
             # remove certificate
@@ -56,8 +56,9 @@ class System(object):
         self.current_folder = None
         self.systeminfo = None
         self.exempt_folders = ['/', 'Common']
+        # folder -> (exists, time checked)
         self.existing_folders = {}
-        self.existint_folders_updated = None
+        self.folder_cache_stats = {'hits': 0, 'misses': 0}
 
     @log
     def folder_exists(self, folder):
@@ -67,22 +68,26 @@ class System(object):
             if folder == 'Common':
                 return True
             if folder in self.existing_folders:
-                now = time.time()
-                if self.existint_folders_updated:
-                    if ((now - self.existint_folders_updated) <
-                            const.FOLDER_CACHE_TIMEOUT):
-                        return True
-                    else:
-                        del self.existing_folders[folder]
+                (exists, checked) = self.existing_folders[folder]
+                if exists:
+                    timeout = const.FOLDER_CACHE_TIMEOUT
+                else:
+                    timeout = const.FOLDER_NEGATIVE_CACHE_TIMEOUT
+                if time.time() - checked < timeout:
+                    self.folder_cache_stats['hits'] += 1
+                    return exists
+                del self.existing_folders[folder]
+            self.folder_cache_stats['misses'] += 1
             request_url = self.bigip.icr_url + '/sys/folder/'
             request_url += '~' + folder
             request_url += '?$select=name'
             response = self.bigip.icr_session.get(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
-                self.existing_folders[folder] = 1
+                self._cache_folder(folder, True)
                 return True
             elif response.status_code == 404:
+                self._cache_folder(folder, False)
                 return False
             else:
                 Log.error('folder', response.text)
@@ -111,8 +116,8 @@ class System(object):
                 request_url, data=json.dumps(payload),
                 timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
+                self._cache_folder(folder, True)
                 if change_to:
-                    self.existing_folders[folder] = 1
                     self.set_folder(folder)
                 else:
                     self.set_folder('/Common')
@@ -150,17 +155,28 @@ class System(object):
             response = self.bigip.icr_session.delete(
                 request_url, timeout=const.CONNECTION_TIMEOUT)
             if response.status_code < 400:
-                if folder in self.existing_folders:
-                    del self.existing_folders[folder]
+                self._cache_folder(folder, False)
                 self.set_folder('/Common')
                 return True
             elif response.status_code == 404:
+                self._cache_folder(folder, False)
                 return True
             else:
                 Log.error('folder', response.text)
                 raise exceptions.SystemDeleteException(response.text)
         return False
 
+    def _cache_folder(self, folder, exists):
+        """ Remember whether folder exists """
+        self.existing_folders[folder] = (exists, time.time())
+
+    def invalidate_folder_cache(self, folder=None):
+        """ Forget cached folder existence, for all folders by default """
+        if folder:
+            self.existing_folders.pop(str(folder).replace('/', ''), None)
+        else:
+            self.existing_folders = {}
+
     @log
     def get_folders(self):
         """ Get Folders """
@@ -174,6 +190,7 @@ class System(object):
             if 'items' in return_obj:
                 for folder in return_obj['items']:
                     return_list.append(folder['name'])
+                    self._cache_folder(folder['name'], True)
         elif response.status_code != 404:
             Log.error('folder', response.text)
             raise exceptions.SystemQueryException(response.text)
@@ -187,6 +204,11 @@ class System(object):
             Log.error('System', msg)
             raise exceptions.SystemUpdateException(msg)
 
+        # the folder may have been synced from a peer since a cached
+        # miss, so only trust a cached hit before failing
+        cached = self.existing_folders.get(str(folder).replace('/', ''))
+        if cached and not cached[0]:
+            self.invalidate_folder_cache(folder)
         if not self.folder_exists(folder):
             msg = 'set_folder:set_active_folder failed, ' + \
                   'folder does not exist!'
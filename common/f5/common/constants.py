@@ -21,7 +21,14 @@ DEFAULT_HOSTNAME = 'bigip1'
 MAX_HOSTNAME_LENGTH = 128
 DEFAULT_FOLDER = "/Common"
 FOLDER_CACHE_TIMEOUT = 120
+FOLDER_NEGATIVE_CACHE_TIMEOUT = 10
 CONNECTION_TIMEOUT = 30
+# ICONTROL REST SESSION CONSTANTS
+ICR_TOKEN_AUTH = True
+ICR_POOL_SIZE = 10
+ICR_TOKEN_TIMEOUT = 1200
+ICR_TOKEN_REFRESH_MARGIN = 60
+ICR_TOKEN_RETRY_INTERVAL = 300
 FDB_POPULATE_STATIC_ARP = True
 # DEVICE LOCK PREFIX
 DEVICE_LOCK_PREFIX = 'lock_'
@@ -52,10 +59,16 @@ DEVICE_HEALTH_SCORE_CPS_MAX = 100
 PEER_ADD_ATTEMPTS_MAX = 10
 PEER_ADD_ATTEMPT_DELAY = 2
 DEFAULT_SYNC_MODE = 'autosync'
-# MAX RAM SYNC DELAY IS 63 SECONDS
-# (3+6+9+12+15+18) = 63
+# sync status is polled after SYNC_POLL_INITIAL seconds, doubling
+# up to SYNC_POLL_MAX. A pending sync is pushed again after SYNC_DELAY
+# seconds, doubling, until SYNC_MAX_TIME seconds have passed.
 SYNC_DELAY = 3
+SYNC_POLL_INITIAL = 0.1
+SYNC_POLL_MAX = 2
+SYNC_MAX_TIME = 300
 MAX_SYNC_ATTEMPTS = 10
+# upper bounds in seconds of the sync latency histogram buckets
+SYNC_LATENCY_BUCKETS = [0.5, 1, 2, 5, 10, 30, 60, 120]
 # SHARED CONFIG CONSTANTS
 SHARED_CONFIG_DEFAULT_TRAFFIC_GROUP = 'traffic-group-local-only'
 SHARED_CONFIG_DEFAULT_FLOATING_TRAFFIC_GROUP = 'traffic-group-1'
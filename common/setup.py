@@ -71,11 +71,13 @@ setup(name='f5-bigip-common',
       py_modules=[
                   'f5.bigip.bigip',
                   'f5.bigip.exceptions',
+                  'f5.bigip.icr_session',
                   'f5.bigip.interfaces.arp',
                   'f5.bigip.interfaces.cluster',
                   'f5.bigip.interfaces.device',
                   'f5.bigip.interfaces.iapp',
                   'f5.bigip.interfaces.interface',
+                  'f5.bigip.interfaces.inventory',
                   'f5.bigip.interfaces.l2gre',
                   'f5.bigip.interfaces.monitor',
                   'f5.bigip.interfaces.nat',
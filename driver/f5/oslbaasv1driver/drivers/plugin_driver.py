@@ -33,6 +33,7 @@ from neutron.db import agents_db
 from neutron.context import get_admin_context
 from neutron.extensions import portbindings
 import f5.oslbaasv1driver.drivers.constants as lbaasv1constants
+from f5.oslbaasv1driver.drivers.service_hash import service_hash
 
 PREJUNO = False
 PREKILO = False
@@ -330,9 +331,28 @@ class LoadBalancerCallbacks(object):
             service['vip'] = self._get_extended_vip(
                 context, pool, global_routed_mode)
 
+            # agents cache the service by this hash
+            service['service_hash'] = service_hash(service)
+
         LOG.debug(_('Built pool %s service: %s' % (pool_id, service)))
         return service
 
+    @log.log
+    def get_service_hashes(self, context, pool_ids=None,
+                           global_routed_mode=False, host=None):
+        """ Hashes of the service definitions of pools, keyed by pool
+            id. Agents compare them with the service_hash of the
+            services they cached to find the ones which changed, a
+            mismatch makes the agent refresh the service. Deleted pools
+            are left out. """
+        hashes = {}
+        for pool_id in pool_ids or []:
+            service = self.get_service_by_pool_id(
+                context, pool_id, global_routed_mode, host)
+            if service.get('pool'):
+                hashes[pool_id] = service['service_hash']
+        return hashes
+
     def _get_extended_pool(self, context, pool_id, global_routed_mode):
         """ Get Pool from Neutron and add extended data """
         # Start with neutron pool definition
@@ -1086,23 +1106,73 @@ class LoadBalancerCallbacks(object):
                 filters={'pool_id': [pool_id], },
                 fields=['id', 'pool_id', 'status']
             )
-            for member in members:
-                if member['status'] == 'PENDING_DELETE':
-                    LOG.debug('Member status is PENDING_DELETE. Remove from '
-                              'stats member list (when present):%s' % member)
-                    if member['id'] in stats['members']:
-                        del stats['members'][member['id']]
-                        LOG.debug(
-                            'Member removed from stats members:%s' % stats)
-                    else:
-                        LOG.debug(
-                            'Member not found in stats.  Stats not modified.')
+            self._remove_deleted_member_stats(stats, members)
             self.plugin.update_pool_stats(context, pool_id, stats)
         except PoolNotFound:
             pass
         except Exception as ex:
             LOG.error(_('error updating pool stats: %s' % ex.message))
 
+    @log.log
+    def update_pools_stats(self, context, pools_stats=None, host=None):
+        """ Update stats of many pools. pools_stats maps pool ids to
+            the stats update_pool_stats would receive for the pool. """
+        if not pools_stats:
+            return
+        try:
+            pool_ids = list(pools_stats.keys())
+            pools = self.plugin.get_pools(
+                context,
+                filters={'id': pool_ids},
+                fields=['id', 'status']
+            )
+            members = self.plugin.get_members(
+                context,
+                filters={'pool_id': pool_ids},
+                fields=['id', 'pool_id', 'status']
+            )
+            members_by_pool = {}
+            for member in members:
+                members_by_pool.setdefault(member['pool_id'], []).append(
+                    member)
+            with context.session.begin(subtransactions=True):
+                for pool in pools:
+                    if pool['status'] == 'PENDING_DELETE':
+                        LOG.debug('Pool status is PENDING_DELETE. '
+                                  'Pool stats were not updated. %s' % pool)
+                        continue
+                    # a savepoint per pool, so a failed pool does not
+                    # roll back the stats of the others
+                    try:
+                        with context.session.begin_nested():
+                            stats = pools_stats[pool['id']]
+                            self._remove_deleted_member_stats(
+                                stats, members_by_pool.get(pool['id'], []))
+                            self.plugin.update_pool_stats(
+                                context, pool['id'], stats)
+                    except PoolNotFound:
+                        pass
+                    except Exception as ex:
+                        LOG.error(_('error updating pool %s stats: %s'
+                                    % (pool['id'], ex.message)))
+        except Exception as ex:
+            LOG.error(_('error updating pools stats: %s' % ex.message))
+
+    @staticmethod
+    def _remove_deleted_member_stats(stats, members):
+        """ Remove members in a PENDING_DELETE state from the stats """
+        for member in members:
+            if member['status'] == 'PENDING_DELETE':
+                LOG.debug('Member status is PENDING_DELETE. Remove from '
+                          'stats member list (when present):%s' % member)
+                if member['id'] in stats.get('members', {}):
+                    del stats['members'][member['id']]
+                    LOG.debug(
+                        'Member removed from stats members:%s' % stats)
+                else:
+                    LOG.debug(
+                        'Member not found in stats.  Stats not modified.')
+
     def create_rpc_dispatcher(self):
         """ Create rpc dispatcher """
         return q_rpc.PluginRpcDispatcher(  # @UndefinedVariable
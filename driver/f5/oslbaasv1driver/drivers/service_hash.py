@@ -0,0 +1,45 @@
+""" Hash of the configuration of a service definition """
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+import hashlib
+import json
+
+# keys which change while the configuration stays the same, at any
+# level of a service definition
+IGNORED_KEYS = ['status', 'status_description', 'revision_number',
+                'updated_at', 'service_hash']
+
+
+def service_hash(service):
+    """ Hash of the configuration of service. Statuses are left out,
+        so a service hashes the same while its changes are pending
+        as once the agent reported them done. """
+    return hashlib.md5(json.dumps(
+        _config(service), sort_keys=True,
+        default=str).encode('utf-8')).hexdigest()
+
+
+def _config(value):
+    """ Copy of value without the ignored keys. Lists of objects are
+        sorted by id, the database returns them in no set order. """
+    if isinstance(value, dict):
+        return dict((key, _config(item)) for key, item in value.items()
+                    if key not in IGNORED_KEYS)
+    if isinstance(value, (list, tuple)):
+        items = [_config(item) for item in value]
+        if all(isinstance(item, dict) and 'id' in item for item in items):
+            items.sort(key=lambda item: item['id'])
+        return items
+    return value
@@ -56,6 +56,7 @@ setup(
     py_modules=['f5.oslbaasv1driver.drivers.agent_scheduler',
                 'f5.oslbaasv1driver.drivers.plugin_driver',
                 'f5.oslbaasv1driver.drivers.rpc',
+                'f5.oslbaasv1driver.drivers.service_hash',
                 'f5.oslbaasv1driver.drivers.constants'],
     packages=['f5.oslbaasv1driver',
               'f5.oslbaasv1driver.drivers',
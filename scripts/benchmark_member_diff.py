@@ -0,0 +1,84 @@
+# Copyright 2014 F5 Networks Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Compare the set-indexed member diff against the linear scan which
+# BigipPoolManager used before. Run with the agent and common
+# packages installed:
+#
+#   python scripts/benchmark_member_diff.py 10000
+#
+import sys
+from time import time
+
+from f5.oslbaasv1agent.drivers.bigip.members import diff_members
+
+
+def scan_members(desired_members, existing_members):
+    """ Member matching as previously done by assure_bigip_members """
+    existing_members = list(existing_members)
+    add = []
+    for member in desired_members:
+        found_existing = None
+        for existing_member in existing_members:
+            if member['address'].startswith(existing_member['addr']) and \
+               (member['port'] == existing_member['port']):
+                found_existing = existing_member
+                break
+        if found_existing:
+            existing_members.remove(found_existing)
+        else:
+            add.append(member)
+    return (add, existing_members)
+
+
+def make_members(count, route_domain=2):
+    """ count members, 10% new and 10% stale on the device """
+    desired_members = []
+    existing_members = []
+    for i in range(count):
+        address = '10.%d.%d.%d%%%d' % \
+            (i // 65536, (i // 256) % 256, i % 256, route_domain)
+        member = {'address': address, 'port': 80, 'enabled': True,
+                  'ratio': 1}
+        if i % 10 != 0:
+            desired_members.append(member)
+        if i % 10 != 1:
+            existing_members.append({'addr': address, 'port': 80,
+                                     'session': 'monitor-enabled',
+                                     'ratio': 1})
+    return (desired_members, existing_members)
+
+
+def main():
+    count = 10000
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+    desired_members, existing_members = make_members(count)
+
+    start_time = time()
+    (add, update, remove) = diff_members(desired_members, existing_members)
+    diff_time = time() - start_time
+    print('diff_members: %d members, add %d, update %d, remove %d: '
+          '%.3f secs' % (count, len(add), len(update), len(remove),
+                         diff_time))
+
+    start_time = time()
+    (add, remove) = scan_members(desired_members, existing_members)
+    scan_time = time() - start_time
+    print('linear scan:  %d members, add %d, remove %d: %.3f secs'
+          % (count, len(add), len(remove), scan_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,20 @@
+""" Makes the agent, common and driver packages importable from the
+    source tree, merged into one f5 package as when installed """
+import gettext
+import os
+import sys
+
+gettext.install('test')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGES = ['agent', 'common', 'driver']
+
+for package in PACKAGES:
+    sys.path.insert(0, os.path.join(ROOT, package))
+
+import f5  # noqa
+
+for package in PACKAGES:
+    path = os.path.join(ROOT, package, 'f5')
+    if path not in f5.__path__:
+        f5.__path__.append(path)
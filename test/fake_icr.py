@@ -0,0 +1,39 @@
+""" Fake iControl REST transport for IcrSession tests """
+import json
+
+import requests
+from requests.adapters import BaseAdapter
+
+
+class FakeAdapter(BaseAdapter):
+    """ Answers requests from dicts of URL to status code and body
+        and records the requests sent """
+
+    def __init__(self):
+        super(FakeAdapter, self).__init__()
+        self.statuses = {}
+        self.bodies = {}
+        # (method, url, headers) of each request
+        self.requests = []
+        self.sent = []
+        # (method, url, body) of each request
+        self.payloads = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request.method, request.url))
+        self.requests.append((request.method, request.url,
+                              dict(request.headers)))
+        self.payloads.append((request.method, request.url, request.body))
+        response = requests.Response()
+        response.status_code = self.statuses.get(request.url, 200)
+        body = self.bodies.get(request.url, {'items': []})
+        response._content = json.dumps(body).encode('utf-8')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+    def count(self, method, url):
+        return self.sent.count((method, url))
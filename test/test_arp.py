@@ -0,0 +1,95 @@
+""" Bulk static ARP entries """
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces.arp import ARP
+
+
+class StaticEntry(object):
+    pass
+
+
+class FakeTypeFactory(object):
+
+    def create(self, type_name):
+        return StaticEntry()
+
+
+class FakeNetworkingARP(object):
+    """ Networking.ARP iControl SOAP interface """
+
+    def __init__(self):
+        self.typefactory = FakeTypeFactory()
+        self.static_entries = []
+        self.calls = []
+
+    def get_static_entry_list(self):
+        self.calls.append('get_static_entry_list')
+        return list(self.static_entries)
+
+    def add_static_entry(self, entries):
+        self.calls.append('add_static_entry')
+        self.static_entries.extend('/uuid_tenant/' + entry.address
+                                   for entry in entries)
+
+
+class FakeIControl(object):
+
+    def __init__(self):
+        self.Networking = type('Networking', (object,), {})()
+        self.Networking.ARP = FakeNetworkingARP()
+
+    def add_interfaces(self, interfaces):
+        pass
+
+
+class FakeBigIP(object):
+
+    def __init__(self):
+        self.device_name = 'bigip1'
+        self.icr_session = IcrSession('bigip1', 'admin', 'admin',
+                                      token_auth=False)
+        self.icontrol = FakeIControl()
+        self.arp = ARP(self)
+        self.folders = []
+
+    def set_folder(self, name, folder='/Common'):
+        self.folders.append(folder)
+        return name
+
+
+class TestCreateEntries(unittest.TestCase):
+
+    def setUp(self):
+        self.bigip = FakeBigIP()
+        self.net_arp = self.bigip.icontrol.Networking.ARP
+        self.net_arp.static_entries = ['/uuid_tenant/10.0.0.1%2',
+                                       '/uuid_other/10.0.0.2%2']
+        self.bigip.icr_session.config_saved(
+            self.bigip.icr_session.config_writes)
+
+    def test_new_entries_are_added_in_one_call(self):
+        created = self.bigip.arp.create_entries(
+            entries={'10.0.0.1%2': 'fa:16:3e:00:00:01',
+                     '10.0.0.2%2': 'fa:16:3e:00:00:02',
+                     '10.0.0.3%0': 'fa:16:3e:00:00:03'},
+            folder='tenant')
+        # existing entries of the folder are skipped, route domain
+        # zero is left out of the address
+        self.assertEqual(sorted(created), ['10.0.0.2%2', '10.0.0.3'])
+        self.assertEqual(self.net_arp.calls,
+                         ['get_static_entry_list', 'add_static_entry'])
+        self.assertEqual(self.bigip.folders, ['uuid_tenant', 'uuid_tenant'])
+        self.assertTrue(self.bigip.icr_session.config_dirty())
+
+    def test_existing_entries_are_not_added(self):
+        created = self.bigip.arp.create_entries(
+            entries={'10.0.0.1%2': 'fa:16:3e:00:00:01'}, folder='tenant')
+        self.assertEqual(created, [])
+        self.assertEqual(self.net_arp.calls, ['get_static_entry_list'])
+        self.assertFalse(self.bigip.icr_session.config_dirty())
+
+    def test_no_entries(self):
+        self.assertEqual(self.bigip.arp.create_entries(entries={},
+                                                       folder='tenant'), [])
+        self.assertEqual(self.net_arp.calls, [])
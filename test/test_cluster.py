@@ -0,0 +1,156 @@
+""" Sync status polling of the device group """
+import unittest
+
+from f5.bigip import exceptions
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces import cluster
+from f5.bigip.interfaces.cluster import Cluster
+from f5.common import constants as const
+
+from fake_icr import FakeAdapter
+
+HOST = 'bigip1'
+TM = 'https://%s/mgmt/tm' % HOST
+
+
+class FakeClock(object):
+    """ Stands in for the time module, sleeping advances the clock """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeIControl(object):
+    """ iControl SOAP client, not used by the sync """
+
+    Management = type('Management', (object,), {'Trust': None})
+
+    def add_interfaces(self, interfaces):
+        pass
+
+
+class FakeBigIP(object):
+
+    def __init__(self):
+        self.icr_url = TM
+        self.icr_session = IcrSession(HOST, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+        devices_url = TM + '/cm/device' + \
+            '?$select=selfDevice,name,hostname,managementIp'
+        self.adapter.bodies[devices_url] = \
+            {'items': [{'selfDevice': True, 'name': 'bigip1'}]}
+        self.icontrol = FakeIControl()
+
+
+class TestClusterSync(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.time = cluster.time
+        cluster.time = self.clock
+        self.bigip = FakeBigIP()
+        self.cluster = Cluster(self.bigip)
+        # states of the polls, the last one repeats
+        self.states = []
+
+        def get_sync_status():
+            if len(self.states) > 1:
+                return self.states.pop(0)
+            return self.states[0]
+        self.cluster.get_sync_status = get_sync_status
+
+        # time of each push of the config to the group
+        self.pushes = []
+        push = self.cluster.sync_local_device_to_group
+
+        def sync_local_device_to_group(name):
+            self.pushes.append(self.clock.now)
+            return push(name)
+        self.cluster.sync_local_device_to_group = sync_local_device_to_group
+
+    def tearDown(self):
+        cluster.time = self.time
+
+    def test_quick_sync_is_seen_at_once(self):
+        self.states = ['Changes Pending', 'Changes Pending', 'In Sync']
+        self.cluster.sync('group')
+        self.assertEqual(len(self.clock.sleeps), 2)
+        # jittered, doubling poll delays
+        first, second = self.clock.sleeps
+        self.assertTrue(0.8 * const.SYNC_POLL_INITIAL <= first <=
+                        1.2 * const.SYNC_POLL_INITIAL)
+        self.assertTrue(1.6 * const.SYNC_POLL_INITIAL <= second <=
+                        2.4 * const.SYNC_POLL_INITIAL)
+        self.assertEqual(self.bigip.adapter.count('POST', TM + '/cm'), 1)
+        stats = self.cluster.sync_stats['group']
+        self.assertEqual(stats['syncs'], 1)
+        self.assertEqual(stats['latency']['<=0.5'], 1)
+
+    def test_pending_sync_is_pushed_with_growing_delay(self):
+        self.states = ['Changes Pending']
+        self.assertRaises(exceptions.BigIPClusterSyncFailure,
+                          self.cluster.sync, 'group', max_time=60)
+        self.assertTrue(max(self.clock.sleeps) <=
+                        1.2 * const.SYNC_POLL_MAX)
+        # the last sleep ends at the deadline
+        self.assertEqual(self.clock.now, 1060.0)
+        pushes = self.pushes
+        delays = [pushes[i + 1] - pushes[i] for i in range(len(pushes) - 1)]
+        self.assertEqual(self.bigip.adapter.count('POST', TM + '/cm'),
+                         len(pushes))
+        self.assertTrue(len(delays) >= 3)
+        for (i, delay) in enumerate(delays):
+            self.assertTrue(delay >= const.SYNC_DELAY * 2 ** i)
+        self.assertEqual(self.cluster.sync_stats['group']['failures'], 1)
+
+    def test_sync_failure_is_raised_at_once(self):
+        self.states = ['Sync Failure']
+        self.assertRaises(exceptions.BigIPClusterSyncFailure,
+                          self.cluster.sync, 'group', force_now=True)
+        self.assertEqual(self.clock.sleeps, [])
+        self.assertEqual(self.bigip.adapter.count('POST', TM + '/cm'), 1)
+
+
+class TestConfigSave(unittest.TestCase):
+
+    def setUp(self):
+        self.bigip = FakeBigIP()
+        self.session = self.bigip.icr_session
+        self.cluster = Cluster(self.bigip)
+
+    def test_save_cleans_the_configuration(self):
+        # changes may have been made before the agent connected
+        self.assertTrue(self.session.config_dirty())
+        self.cluster.save_config()
+        self.assertFalse(self.session.config_dirty())
+
+    def test_writes_dirty_the_configuration(self):
+        self.cluster.save_config()
+        self.session.get(TM + '/ltm/pool/~tenant~pool')
+        self.cluster.sync_local_device_to_group('group')
+        self.session.post('https://%s/mgmt/shared/echo' % HOST, data='{}')
+        self.assertFalse(self.session.config_dirty())
+        self.session.patch(TM + '/ltm/pool/~tenant~pool', data='{}')
+        self.assertTrue(self.session.config_dirty())
+
+    def test_soap_writes_dirty_the_configuration(self):
+        self.cluster.save_config()
+        self.session.mark_config_dirty()
+        self.assertTrue(self.session.config_dirty())
+
+    def test_changes_during_a_save_keep_it_dirty(self):
+        config_writes = self.session.config_writes
+        self.session.delete(TM + '/ltm/pool/~tenant~pool')
+        # a save which started before the delete
+        self.session.config_saved(config_writes)
+        self.assertTrue(self.session.config_dirty())
@@ -0,0 +1,72 @@
+""" Device fanout of configuration steps """
+import unittest
+
+import eventlet
+
+from f5.bigip.icr_session import IcrSession
+from f5.oslbaasv1agent.drivers.bigip.exceptions import DeviceFanoutException
+from f5.oslbaasv1agent.drivers.bigip.fanout import DeviceFanout
+
+from fake_icr import FakeAdapter
+
+
+class FakeBigIP(object):
+
+    def __init__(self, hostname):
+        self.icr_session = IcrSession(hostname, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+
+
+def hostname(bigip):
+    eventlet.sleep(0)
+    return bigip.icr_session.hostname
+
+
+class TestDeviceFanout(unittest.TestCase):
+
+    def setUp(self):
+        self.bigips = [FakeBigIP('bigip%d' % i) for i in range(3)]
+        self.timeout = eventlet.Timeout(10)
+
+    def tearDown(self):
+        self.timeout.cancel()
+
+    def test_results_are_in_bigip_order(self):
+        fanout = DeviceFanout(workers=4)
+        self.assertEqual(fanout.run(self.bigips, hostname),
+                         ['bigip0', 'bigip1', 'bigip2'])
+
+    def test_errors_are_raised(self):
+        fanout = DeviceFanout(workers=4)
+
+        def fail(bigip, hostnames):
+            if bigip.icr_session.hostname in hostnames:
+                raise ValueError(bigip.icr_session.hostname)
+
+        self.assertRaises(ValueError, fanout.run, self.bigips, fail,
+                          ['bigip1'])
+        self.assertRaises(DeviceFanoutException, fanout.run, self.bigips,
+                          fail, ['bigip1', 'bigip2'])
+
+    def test_read_cache_is_shared(self):
+        fanout = DeviceFanout(workers=4)
+        for bigip in self.bigips:
+            bigip.icr_session.set_read_cache({'responses': {}})
+
+        def read_cache(bigip):
+            return bigip.icr_session.get_read_cache()
+
+        self.assertEqual(fanout.run(self.bigips, read_cache),
+                         [{'responses': {}}] * 3)
+
+    def test_nested_fanout_runs_inline(self):
+        # every worker is busy with the outer fanout
+        fanout = DeviceFanout(workers=2)
+
+        def nested(bigip):
+            return fanout.run(self.bigips, hostname)
+
+        self.assertEqual(fanout.run(self.bigips, nested),
+                         [['bigip0', 'bigip1', 'bigip2']] * 3)
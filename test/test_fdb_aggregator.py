@@ -0,0 +1,91 @@
+""" Merging of L2 population fdb updates """
+import unittest
+
+import eventlet
+
+from f5.oslbaasv1agent.drivers.bigip.fdb_aggregator import FdbAggregator
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def fdb_add(self, fdb):
+        self.calls.append(('add', fdb))
+
+    def fdb_remove(self, fdb):
+        self.calls.append(('remove', fdb))
+
+
+class FakeManager(object):
+
+    def __init__(self):
+        self.lbdriver = FakeDriver()
+
+
+def fdb(vtep, *entries):
+    return {'net_1': {'network_type': 'vxlan', 'segment_id': 100,
+                      'ports': {vtep: [list(entry) for entry in entries]}}}
+
+
+MAC_1 = ('fa:16:3e:00:00:01', '10.0.0.1')
+MAC_2 = ('fa:16:3e:00:00:02', '10.0.0.2')
+MAC_3 = ('fa:16:3e:00:00:03', '10.0.0.3')
+
+
+class TestFdbAggregator(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = FakeManager()
+        self.timeout = eventlet.Timeout(10)
+
+    def tearDown(self):
+        self.timeout.cancel()
+
+    def test_burst_is_merged_into_one_update(self):
+        aggregator = FdbAggregator(self.manager, 0.05)
+        aggregator.add(fdb('192.168.0.1', MAC_1))
+        aggregator.add(fdb('192.168.0.1', MAC_2))
+        aggregator.remove(fdb('192.168.0.1', MAC_2))
+        aggregator.remove(fdb('192.168.0.2', MAC_3))
+        aggregator.add(fdb('192.168.0.1', MAC_1))
+        self.assertEqual(self.manager.lbdriver.calls, [])
+        stats = aggregator.get_stats()
+        self.assertEqual(stats['pending_networks'], 1)
+        self.assertEqual(stats['pending_entries'], 3)
+        self.assertEqual(stats['merged'], 2)
+        eventlet.sleep(0.1)
+        # removes go first, one call each for all tunnels
+        removes = fdb('192.168.0.1', MAC_2)
+        removes['net_1']['ports'].update(
+            fdb('192.168.0.2', MAC_3)['net_1']['ports'])
+        self.assertEqual(self.manager.lbdriver.calls,
+                         [('remove', removes),
+                          ('add', fdb('192.168.0.1', MAC_1))])
+        stats = aggregator.get_stats()
+        self.assertEqual(stats['flushes'], 1)
+        self.assertEqual(stats['messages'], 5)
+        self.assertEqual(stats['pending_entries'], 0)
+
+    def test_last_operation_wins(self):
+        aggregator = FdbAggregator(self.manager, 0.05)
+        aggregator.remove(fdb('192.168.0.1', MAC_1))
+        aggregator.add(fdb('192.168.0.1', MAC_1))
+        aggregator.flush()
+        self.assertEqual(self.manager.lbdriver.calls,
+                         [('add', fdb('192.168.0.1', MAC_1))])
+
+    def test_without_interval_updates_apply_at_once(self):
+        aggregator = FdbAggregator(self.manager, 0)
+        aggregator.add(fdb('192.168.0.1', MAC_1))
+        aggregator.remove(fdb('192.168.0.1', MAC_1))
+        self.assertEqual(self.manager.lbdriver.calls,
+                         [('add', fdb('192.168.0.1', MAC_1)),
+                          ('remove', fdb('192.168.0.1', MAC_1))])
+
+    def test_networks_without_ports_are_ignored(self):
+        aggregator = FdbAggregator(self.manager, 0)
+        aggregator.add({'net_1': {'network_type': 'vxlan',
+                                  'segment_id': 100}})
+        self.assertEqual(self.manager.lbdriver.calls, [])
@@ -0,0 +1,158 @@
+""" Read cache of the iControl REST session """
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.icr_session import READ_CACHE_EXCLUDED
+from f5.bigip.icr_session import TRANSACTION_HEADER
+
+from fake_icr import FakeAdapter
+
+HOST = 'bigip1'
+TM = 'https://%s/mgmt/tm' % HOST
+
+
+class TestReadCache(unittest.TestCase):
+
+    def setUp(self):
+        self.session = IcrSession(HOST, 'admin', 'admin', token_auth=False)
+        self.adapter = FakeAdapter()
+        self.session.mount('https://', self.adapter)
+        self.session.begin_read_cache()
+
+    def tearDown(self):
+        self.session.end_read_cache()
+
+    def get_twice(self, url):
+        self.session.get(url)
+        self.session.get(url)
+        return self.adapter.count('GET', url)
+
+    def test_reads_are_cached(self):
+        url = TM + '/ltm/pool/~tenant~pool?$select=name'
+        self.assertEqual(self.get_twice(url), 1)
+        self.assertEqual(self.session.end_read_cache(), 1)
+        self.assertEqual(self.session.stats['cached_reads'], 1)
+
+    def test_missing_objects_are_cached(self):
+        url = TM + '/ltm/pool/~tenant~missing'
+        self.adapter.statuses[url] = 404
+        self.assertEqual(self.get_twice(url), 1)
+        self.assertEqual(self.session.get(url).status_code, 404)
+
+    def test_server_errors_are_not_cached(self):
+        url = TM + '/ltm/pool/~tenant~pool'
+        self.adapter.statuses[url] = 500
+        self.assertEqual(self.get_twice(url), 2)
+
+    def test_excluded_reads_are_not_cached(self):
+        for excluded in READ_CACHE_EXCLUDED:
+            url = TM + excluded + '/x'
+            self.assertEqual(self.get_twice(url), 2, excluded)
+        url = TM + '/ltm/pool/~tenant~pool/stats'
+        self.assertEqual(self.get_twice(url), 2)
+        url = 'https://%s/mgmt/shared/echo' % HOST
+        self.assertEqual(self.get_twice(url), 2)
+
+    def test_write_drops_reads_of_its_collection(self):
+        pool_url = TM + '/ltm/pool/~tenant~pool'
+        monitor_url = TM + '/ltm/monitor/http/~tenant~monitor'
+        self.session.get(pool_url)
+        self.session.get(monitor_url)
+        self.session.patch(pool_url + '/members', data='{}')
+        self.session.get(pool_url)
+        self.session.get(monitor_url)
+        self.assertEqual(self.adapter.count('GET', pool_url), 2)
+        self.assertEqual(self.adapter.count('GET', monitor_url), 1)
+
+    def test_write_drops_reads_of_implied_collections(self):
+        node_url = TM + '/ltm/node/~tenant~10.0.0.1'
+        address_url = TM + '/ltm/virtual-address/~tenant~10.0.0.2'
+        self.session.get(node_url)
+        self.session.get(address_url)
+        self.session.delete(TM + '/ltm/pool/~tenant~pool')
+        self.session.get(node_url)
+        self.session.get(address_url)
+        self.assertEqual(self.adapter.count('GET', node_url), 2)
+        self.assertEqual(self.adapter.count('GET', address_url), 1)
+        self.session.delete(TM + '/ltm/virtual/~tenant~vip')
+        self.session.get(address_url)
+        self.assertEqual(self.adapter.count('GET', address_url), 2)
+
+    def test_folder_delete_drops_all_reads(self):
+        pool_url = TM + '/ltm/pool/~tenant~pool'
+        self.session.get(pool_url)
+        self.session.delete(TM + '/sys/folder/~tenant')
+        self.session.get(pool_url)
+        self.assertEqual(self.adapter.count('GET', pool_url), 2)
+
+    def test_soap_writes_drop_reads(self):
+        profile_url = TM + '/ltm/profile/server-ssl/~tenant~profile'
+        pool_url = TM + '/ltm/pool/~tenant~pool'
+        self.session.get(profile_url)
+        self.session.get(pool_url)
+        self.session.mark_config_dirty('/ltm/profile/client-ssl')
+        self.assertTrue(self.session.config_dirty())
+        self.session.get(profile_url)
+        self.session.get(pool_url)
+        self.assertEqual(self.adapter.count('GET', profile_url), 2)
+        self.assertEqual(self.adapter.count('GET', pool_url), 1)
+        # a change of unknown scope drops everything
+        self.session.mark_config_dirty()
+        self.session.get(pool_url)
+        self.assertEqual(self.adapter.count('GET', pool_url), 2)
+
+    def test_reads_are_not_cached_without_read_cache(self):
+        self.session.end_read_cache()
+        url = TM + '/ltm/pool/~tenant~pool'
+        self.assertEqual(self.get_twice(url), 2)
+        # nothing to drop
+        self.session.mark_config_dirty('/ltm/pool')
+
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        self.session = IcrSession(HOST, 'admin', 'admin', token_auth=False)
+        self.adapter = FakeAdapter()
+        self.session.mount('https://', self.adapter)
+        self.adapter.bodies[TM + '/transaction'] = {'transId': 7}
+        self.adapter.bodies[TM + '/transaction/7'] = {'state': 'COMPLETED'}
+        self.removed = []
+
+    def update_pool(self):
+        """ Pool description and member writes, nodes removed once the
+            members are """
+        pool_url = TM + '/ltm/pool/~tenant~pool'
+        self.session.patch(pool_url, data='{"description": "pool"}')
+        self.session.patch(pool_url, data='{"members": []}')
+        self.session.after_commit(self.removed.append, '10.0.0.1')
+        self.session.get(pool_url)
+
+    def test_writes_commit_together(self):
+        self.session.begin_transaction()
+        self.update_pool()
+        self.assertEqual(self.removed, [])
+        self.assertEqual(self.session.commit_transaction(), 2)
+        self.assertEqual(self.removed, ['10.0.0.1'])
+        trans_ids = [headers.get(TRANSACTION_HEADER) for
+                     (method, url, headers) in self.adapter.requests
+                     if url.endswith('~pool')]
+        # reads are not part of the transaction
+        self.assertEqual(trans_ids, ['7', '7', None])
+        self.assertEqual(self.adapter.count('PATCH', TM + '/transaction/7'),
+                         1)
+
+    def test_abort_discards_writes(self):
+        self.session.begin_transaction()
+        self.update_pool()
+        self.session.abort_transaction()
+        self.assertFalse(self.session.in_transaction())
+        self.assertEqual(self.removed, [])
+        self.assertEqual(self.adapter.count('DELETE', TM + '/transaction/7'),
+                         1)
+
+    def test_writes_without_transaction_apply_at_once(self):
+        self.update_pool()
+        self.assertEqual(self.removed, ['10.0.0.1'])
+        self.assertEqual(self.session.commit_transaction(), 0)
+        self.assertEqual(self.adapter.count('POST', TM + '/transaction'), 0)
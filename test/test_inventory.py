@@ -0,0 +1,145 @@
+""" Orphan collection from one inventory of a bigip """
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces import prefixed
+from f5.bigip.interfaces.inventory import Inventory
+
+from fake_icr import FakeAdapter
+
+HOST = 'bigip1'
+TM = 'https://%s/mgmt/tm' % HOST
+SELECT = '?$select=name,partition,selfLink'
+
+
+def item(path, name, partition, **attrs):
+    """ Object as listed by the inventory queries """
+    obj = {'name': name, 'partition': partition,
+           'selfLink': 'https://localhost/mgmt/tm%s/~%s~%s?ver=11.6.0'
+                       % (path, partition, name)}
+    obj.update(attrs)
+    return obj
+
+
+class Recorder(object):
+    """ Records the calls of the interfaces the inventory delegates
+        deletes to """
+
+    def __init__(self, name, calls):
+        self.name = name
+        self.calls = calls
+
+    def __getattr__(self, method):
+        def call(**kwargs):
+            self.calls.append((self.name, method, kwargs))
+        return call
+
+
+class FakeBigIP(object):
+
+    def __init__(self, folders):
+        self.icr_url = TM
+        self.icr_session = IcrSession(HOST, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+        self.folders = folders
+        self.calls = []
+        for name in ['pool', 'arp', 'selfip', 'vlan', 'l2gre', 'route']:
+            setattr(self, name, Recorder(name, self.calls))
+        self.system = self
+        self.inventory = Inventory(self)
+
+    def get_folders(self):
+        return self.folders
+
+    def decorate_folder(self, folder='Common'):
+        return prefixed(str(folder).replace('/', ''))
+
+    def icr_link(self, selfLink):
+        return selfLink.replace('https://localhost/mgmt/tm', self.icr_url)
+
+    def answer(self, path, items, select=SELECT):
+        self.adapter.bodies[TM + path + select] = {'items': items}
+
+
+class TestInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.bigip = FakeBigIP(['Common', 'uuid_tenant', 'uuid_gone'])
+        self.bigip.answer(
+            '/ltm/virtual',
+            [item('/ltm/virtual', 'uuid_vip', 'uuid_tenant',
+                  pool='/uuid_tenant/uuid_pool'),
+             item('/ltm/virtual', 'uuid_old_vip', 'uuid_tenant',
+                  pool='/uuid_tenant/uuid_old_pool'),
+             item('/ltm/virtual', 'uuid_gone_vip', 'uuid_gone')],
+            SELECT + ',pool')
+        self.bigip.answer(
+            '/ltm/pool',
+            [item('/ltm/pool', 'uuid_pool', 'uuid_tenant'),
+             item('/ltm/pool', 'uuid_old_pool', 'uuid_tenant'),
+             item('/ltm/pool', 'uuid_gone_pool', 'uuid_gone')])
+        self.bigip.answer(
+            '/ltm/rule',
+            [item('/ltm/rule', 'uuid_old_vip_rule', 'uuid_tenant'),
+             item('/ltm/rule', 'uuid_vip_rule', 'uuid_tenant')])
+        self.bigip.answer(
+            '/ltm/snatpool',
+            [item('/ltm/snatpool', 'uuid_tenant', 'uuid_tenant'),
+             item('/ltm/snatpool', 'uuid_gone', 'uuid_gone')])
+        self.bigip.answer(
+            '/ltm/snat-translation',
+            [item('/ltm/snat-translation', 'uuid_snat_1', 'uuid_tenant'),
+             item('/ltm/snat-translation', 'uuid_snat_2', 'uuid_gone')])
+        self.bigip.adapter.bodies[TM + '/ltm/monitor'] = {'items': [
+            {'reference': {'link':
+                           'https://localhost/mgmt/tm/ltm/monitor/http'
+                           '?ver=11.6.0'}}]}
+        self.bigip.answer(
+            '/ltm/monitor/http',
+            [item('/ltm/monitor/http', 'uuid_monitor', 'uuid_tenant'),
+             item('/ltm/monitor/http', 'uuid_gone_monitor', 'uuid_gone')])
+
+    def deleted(self):
+        return [url.split(TM)[1] for (method, url) in self.bigip.adapter.sent
+                if method == 'DELETE']
+
+    def test_orphans(self):
+        inventory = self.bigip.inventory
+        orphans = inventory.get_orphans(inventory.get_snapshot(),
+                                        ['pool'], ['tenant'])
+        names = dict((kind, [obj['name'] for obj in objs])
+                     for (kind, objs) in orphans.items()
+                     if kind != 'folders')
+        self.assertEqual(orphans['folders'], ['uuid_gone'])
+        self.assertEqual(names['virtuals'], ['uuid_old_vip', 'uuid_gone_vip'])
+        self.assertEqual(names['pools'], ['uuid_old_pool', 'uuid_gone_pool'])
+        self.assertEqual(names['rules'], ['uuid_old_vip_rule'])
+        self.assertEqual(names['monitors'], ['uuid_gone_monitor'])
+        self.assertEqual(names['snatpools'], ['uuid_gone'])
+        self.assertEqual(names['snats'], ['uuid_snat_2'])
+
+    def test_purge_order(self):
+        stats = self.bigip.inventory.purge_orphans(['pool'], ['tenant'])
+        # snat addresses are deleted once no snatpool refers to them
+        self.assertEqual(self.deleted(),
+                         ['/ltm/virtual/~uuid_tenant~uuid_old_vip',
+                          '/ltm/virtual/~uuid_gone~uuid_gone_vip',
+                          '/ltm/rule/~uuid_tenant~uuid_old_vip_rule',
+                          '/ltm/monitor/http/~uuid_gone~uuid_gone_monitor',
+                          '/ltm/snatpool/~uuid_gone~uuid_gone',
+                          '/ltm/snat-translation/~uuid_gone~uuid_snat_2'])
+        self.assertEqual([(name, method) for (name, method, kwargs)
+                          in self.bigip.calls if name == 'pool'],
+                         [('pool', 'delete'), ('pool', 'delete')])
+        # then the network objects of the orphaned folder
+        self.assertEqual([(name, method) for (name, method, kwargs)
+                          in self.bigip.calls if name != 'pool'],
+                         [('arp', 'delete_all'), ('selfip', 'delete_all'),
+                          ('vlan', 'delete_all'), ('l2gre', 'delete_all'),
+                          ('route', 'delete_domain')])
+        self.assertEqual(stats['snatpools'], 1)
+        self.assertEqual(stats['snats'], 1)
+        self.assertEqual(stats['folders'], 1)
+        self.assertEqual(stats['errors'], 0)
@@ -0,0 +1,98 @@
+""" Pool member keys and diffs """
+import unittest
+
+from f5.bigip.interfaces import member_key
+from f5.bigip.interfaces import split_addr_port
+from f5.oslbaasv1agent.drivers.bigip.members import diff_members
+
+
+def desired(address, port=80, enabled=True, ratio=1):
+    return {'address': address, 'port': port, 'enabled': enabled,
+            'ratio': ratio}
+
+
+def existing(name, session='monitor-enabled', ratio=1):
+    """ Member as returned by Pool.get_members for a member name """
+    (addr, port) = split_addr_port(name)
+    return {'addr': addr, 'port': int(port), 'session': session,
+            'ratio': ratio}
+
+
+class TestMemberKey(unittest.TestCase):
+
+    def test_address_prefix_is_another_member(self):
+        self.assertNotEqual(member_key('10.0.0.1', 80),
+                            member_key('10.0.0.10', 80))
+
+    def test_route_domain(self):
+        self.assertEqual(member_key('10.0.0.1%2', '80'),
+                         ('10.0.0.1', 2, 80))
+        self.assertEqual(member_key('10.0.0.1', 80), ('10.0.0.1', 0, 80))
+        self.assertNotEqual(member_key('10.0.0.1%2', 80),
+                            member_key('10.0.0.1', 80))
+
+    def test_ipv6_notation(self):
+        self.assertEqual(member_key('2001:0DB8:0:0::1%2', 80),
+                         member_key('2001:db8::1%2', 80))
+
+    def test_ipv6_member_names(self):
+        # bigip names IPv6 members addr.port and IPv4 members addr:port
+        member = existing('2001:db8::1%2.8080')
+        self.assertEqual(member_key(member['addr'], member['port']),
+                         member_key('2001:0db8::0001%2', 8080))
+        member = existing('10.0.0.1%2:8080')
+        self.assertEqual(member_key(member['addr'], member['port']),
+                         ('10.0.0.1', 2, 8080))
+
+
+class TestDiffMembers(unittest.TestCase):
+
+    def test_no_changes(self):
+        members = [desired('10.0.0.1%2'), desired('2001:db8::1%2', 443)]
+        existing_members = [existing('10.0.0.1%2:80'),
+                            existing('2001:db8::1%2.443')]
+        self.assertEqual(diff_members(members, existing_members),
+                         ([], [], []))
+
+    def test_address_prefix_is_not_matched(self):
+        (add, update, remove) = diff_members(
+            [desired('10.0.0.1')], [existing('10.0.0.10:80')])
+        self.assertEqual(add, [desired('10.0.0.1')])
+        self.assertEqual(update, [])
+        self.assertEqual(remove, [existing('10.0.0.10:80')])
+
+    def test_add_update_remove(self):
+        members = [desired('10.0.0.1'),
+                   desired('10.0.0.2', enabled=False),
+                   desired('10.0.0.3', ratio=5),
+                   desired('10.0.0.4')]
+        existing_members = [existing('10.0.0.2:80'),
+                            existing('10.0.0.3:80'),
+                            existing('10.0.0.4:80', session='user-enabled'),
+                            existing('10.0.0.5:80')]
+        (add, update, remove) = diff_members(members, existing_members)
+        self.assertEqual(add, [desired('10.0.0.1')])
+        self.assertEqual(update, [desired('10.0.0.2', enabled=False),
+                                  desired('10.0.0.3', ratio=5)])
+        self.assertEqual(remove, [existing('10.0.0.5:80')])
+
+    def test_port_is_part_of_the_member(self):
+        (add, update, remove) = diff_members(
+            [desired('10.0.0.1', 8080)], [existing('10.0.0.1:80')])
+        self.assertEqual(add, [desired('10.0.0.1', 8080)])
+        self.assertEqual(remove, [existing('10.0.0.1:80')])
+
+    def test_duplicate_members(self):
+        members = [desired('10.0.0.1%2'), desired('10.0.0.1%2'),
+                   desired('10.0.0.2%2'), desired('10.0.0.2%2')]
+        (add, update, remove) = diff_members(
+            members, [existing('10.0.0.1%2:80')])
+        self.assertEqual(add, [desired('10.0.0.2%2')])
+        self.assertEqual(update, [])
+        self.assertEqual(remove, [])
+
+    def test_empty_pool(self):
+        self.assertEqual(diff_members([], []), ([], [], []))
+        (add, update, remove) = diff_members(
+            [], [existing('10.0.0.1:80'), existing('10.0.0.2:80')])
+        self.assertEqual(len(remove), 2)
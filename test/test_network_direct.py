@@ -0,0 +1,122 @@
+""" Route domain cache warmed from bulk network queries """
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces import prefixed
+from f5.bigip.interfaces.inventory import Inventory
+
+from fake_icr import FakeAdapter
+
+ROUTE_DOMAINS = '/net/route-domain?$select=id,partition,vlans'
+VLANS = '/net/vlan?$select=name,partition,tag'
+TUNNELS = '/net/tunnels/tunnel?$select=name,partition,key'
+SELFIPS = '/net/self?$select=name,partition,address,vlan'
+
+
+class FakeBigIP(object):
+
+    def __init__(self, device_name):
+        self.device_name = device_name
+        self.icr_url = 'https://%s/mgmt/tm' % device_name
+        self.icr_session = IcrSession(device_name, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+        self.inventory = Inventory(self)
+        self.answer(ROUTE_DOMAINS, [
+            {'id': 0, 'partition': 'Common',
+             'vlans': ['/Common/http-tunnel']},
+            {'id': 2, 'partition': 'uuid_tenant_1',
+             'vlans': ['/uuid_tenant_1/uuid_vlan-1',
+                       '/uuid_tenant_1/uuid_tunnel-vxlan-2']},
+            {'id': 3, 'partition': 'uuid_tenant_2',
+             'vlans': ['/uuid_tenant_2/uuid_vlan-3']}])
+        self.answer(VLANS, [
+            {'name': 'uuid_vlan-1', 'partition': 'uuid_tenant_1',
+             'tag': 101},
+            {'name': 'uuid_vlan-3', 'partition': 'uuid_tenant_2',
+             'tag': 103}])
+        self.answer(TUNNELS, [
+            {'name': 'uuid_tunnel-vxlan-2', 'partition': 'uuid_tenant_1',
+             'key': 5002}])
+        self.answer(SELFIPS, [
+            self.selfip('uuid_tenant_1', 'subnet_1', '10.1.1.5%2/24',
+                        '/uuid_tenant_1/uuid_vlan-1'),
+            self.selfip('uuid_tenant_1', 'subnet_2', '10.2.0.5%2/16',
+                        '/uuid_tenant_1/uuid_tunnel-vxlan-2'),
+            self.selfip('uuid_tenant_2', 'subnet_3', '10.3.3.5%3/24',
+                        '/uuid_tenant_2/uuid_vlan-3')])
+
+    def answer(self, path, items):
+        self.adapter.bodies[self.icr_url + path] = {'items': items}
+
+    def selfip(self, partition, subnet_id, address, vlan):
+        return {'name': 'uuid_local-%s-%s' % (self.device_name, subnet_id),
+                'partition': partition, 'address': address, 'vlan': vlan}
+
+    def decorate_folder(self, folder='Common'):
+        return prefixed(str(folder).replace('/', ''))
+
+
+class FakeDriver(object):
+
+    def __init__(self, bigips):
+        self.bigips = bigips
+
+    def get_all_bigips(self):
+        return self.bigips
+
+    def fanout(self, bigips, method, *args, **kwargs):
+        return [method(bigip, *args, **kwargs) for bigip in bigips]
+
+
+class TestNetworkSnapshot(unittest.TestCase):
+
+    def test_one_query_per_collection(self):
+        bigip = FakeBigIP('bigip1')
+        snapshot = bigip.inventory.get_network_snapshot()
+        self.assertEqual(sorted(snapshot),
+                         ['route_domains', 'selfips', 'tunnels', 'vlans'])
+        self.assertEqual(len(snapshot['route_domains']), 3)
+        self.assertEqual(len(snapshot['selfips']), 3)
+        # network objects of other partitions are kept
+        self.assertEqual(snapshot['route_domains'][0]['partition'], 'Common')
+        self.assertEqual(len(bigip.adapter.sent), 4)
+
+
+class TestWarmRdsCache(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            from f5.oslbaasv1agent.drivers.bigip.network_direct import \
+                NetworkBuilderDirect
+        except ImportError:
+            raise unittest.SkipTest('neutron is not installed')
+        self.bigips = [FakeBigIP('bigip1'), FakeBigIP('bigip2')]
+        self.builder = NetworkBuilderDirect(None, FakeDriver(self.bigips))
+
+    def test_all_tenants_from_one_snapshot(self):
+        self.builder.warm_rds_cache(['tenant_1', 'tenant_2', 'tenant_3'])
+        for bigip in self.bigips:
+            self.assertEqual(len(bigip.adapter.sent), 4)
+        rds_cache = self.builder.rds_cache
+        self.assertEqual(rds_cache['tenant_3'], {})
+        self.assertEqual(sorted(rds_cache['tenant_1'][2]),
+                         ['vlan-101', 'vxlan-5002'])
+        self.assertEqual(
+            str(rds_cache['tenant_1'][2]['vlan-101']['subnets']
+                ['subnet_1']['cidr']), '10.1.1.0/24')
+        self.assertEqual(
+            str(rds_cache['tenant_1'][2]['vxlan-5002']['subnets']
+                ['subnet_2']['cidr']), '10.2.0.0/16')
+        self.assertEqual(list(rds_cache['tenant_2']), [3])
+        self.assertEqual(
+            str(rds_cache['tenant_2'][3]['vlan-103']['subnets']
+                ['subnet_3']['cidr']), '10.3.3.0/24')
+
+    def test_cached_tenants_are_not_queried_again(self):
+        self.builder.warm_rds_cache(['tenant_1'])
+        self.builder.update_rds_cache('tenant_1')
+        self.builder.warm_rds_cache(['tenant_1'])
+        for bigip in self.bigips:
+            self.assertEqual(len(bigip.adapter.sent), 4)
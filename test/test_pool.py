@@ -0,0 +1,139 @@
+""" Member writes and node cleanup of the pool interface """
+import json
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces.pool import Pool
+
+from fake_icr import FakeAdapter
+
+HOST = 'bigip1'
+TM = 'https://%s/mgmt/tm' % HOST
+
+
+class FakeArp(object):
+
+    def __init__(self):
+        self.deleted = []
+
+    def delete(self, ip_address, folder='Common'):
+        self.deleted.append((ip_address, folder))
+
+
+class FakeBigIP(object):
+
+    def __init__(self):
+        self.icr_url = TM
+        self.icr_session = IcrSession(HOST, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+        self.pool = Pool(self)
+        self.arp = FakeArp()
+        self.committed = []
+
+    def icr_link(self, selfLink):
+        return selfLink.replace('https://localhost/mgmt/tm', self.icr_url)
+
+    def after_commit(self, method, *args, **kwargs):
+        self.committed.append((method.__name__, args))
+
+
+def desired(address, port=80):
+    return {'address': address, 'port': port, 'enabled': True, 'ratio': 1}
+
+
+class TestReplaceMembers(unittest.TestCase):
+
+    def setUp(self):
+        self.bigip = FakeBigIP()
+
+    def replace(self, members, existing_members):
+        # names are passed prefixed, as the decorated name keyword
+        # needs python 2
+        self.assertTrue(self.bigip.pool.replace_members(
+            'uuid_pool', members=members, folder='tenant',
+            existing_members=existing_members, lb_method='ROUND_ROBIN'))
+        return self.bigip.committed
+
+    def test_one_write(self):
+        committed = self.replace(
+            [desired('10.0.0.1%2'), desired('2001:db8::1%2', 443)], [])
+        self.assertEqual(self.bigip.adapter.sent,
+                         [('PATCH', TM + '/ltm/pool/~uuid_tenant~uuid_pool')])
+        self.assertEqual(committed, [])
+
+    def test_nodes_of_removed_members_are_deleted(self):
+        committed = self.replace(
+            [desired('10.0.0.1%2')],
+            [{'addr': '10.0.0.1%2', 'port': 80},
+             {'addr': '10.0.0.2%2', 'port': 80},
+             {'addr': '10.0.0.2%2', 'port': 8080}])
+        self.assertEqual(committed,
+                         [('_remove_member_nodes',
+                           (['10.0.0.2%2'], 'uuid_tenant'))])
+
+    def test_nodes_in_use_are_kept(self):
+        # another port, another IPv6 notation of the same node
+        committed = self.replace(
+            [desired('10.0.0.1%2', 8080), desired('2001:DB8:0::1%2', 443)],
+            [{'addr': '10.0.0.1%2', 'port': 80},
+             {'addr': '2001:db8::1%2', 'port': 80},
+             {'addr': '10.0.0.1', 'port': 80}])
+        # the node of another route domain is another node
+        self.assertEqual(committed,
+                         [('_remove_member_nodes',
+                           (['10.0.0.1'], 'uuid_tenant'))])
+
+
+def fdb_tunnel(name, macs):
+    return {'selfLink': 'https://localhost/mgmt/tm/net/fdb/tunnel/'
+                        '~uuid_tenant~%s?ver=11.6.0' % name,
+            'records': [{'name': mac, 'endpoint': '192.168.0.1'}
+                        for mac in macs]}
+
+
+class TestArpAndFdbCleanup(unittest.TestCase):
+
+    def setUp(self):
+        self.bigip = FakeBigIP()
+        arp_url = TM + '/net/arp?$select=ipAddress,macAddress,selfLink' + \
+            '&$filter=partition eq uuid_tenant'
+        fdb_url = TM + '/net/fdb/tunnel?$select=records,selfLink' + \
+            '&$filter=partition eq uuid_tenant'
+        self.bigip.adapter.bodies[arp_url.replace(' ', '%20')] = {'items': [
+            {'ipAddress': '10.0.0.1%2', 'macAddress': 'fa:16:3e:00:00:01'},
+            {'ipAddress': '10.0.0.2%2', 'macAddress': 'fa:16:3e:00:00:02'},
+            {'ipAddress': '10.0.0.3%2', 'macAddress': 'fa:16:3e:00:00:03'}]}
+        self.bigip.adapter.bodies[fdb_url.replace(' ', '%20')] = {'items': [
+            fdb_tunnel('tunnel-vxlan-1', ['fa:16:3e:00:00:01',
+                                          'fa:16:3e:00:00:03']),
+            fdb_tunnel('tunnel-vxlan-2', ['fa:16:3e:00:00:02']),
+            fdb_tunnel('tunnel-vxlan-3', ['fa:16:3e:00:00:04'])]}
+
+    def test_entries_of_deleted_nodes_are_removed(self):
+        self.bigip.pool._del_arp_and_fdb(['10.0.0.1%2', '10.0.0.2%2'],
+                                         'uuid_tenant')
+        self.assertEqual(sorted(self.bigip.arp.deleted),
+                         [('10.0.0.1%2', 'uuid_tenant'),
+                          ('10.0.0.2%2', 'uuid_tenant')])
+        # one listing of ARP entries and of fdb tunnels for all nodes,
+        # one write per changed tunnel
+        self.assertEqual(
+            [(method, url.split('?')[0].split(TM)[1]) for
+             (method, url) in self.bigip.adapter.sent],
+            [('GET', '/net/arp'), ('GET', '/net/fdb/tunnel'),
+             ('PATCH', '/net/fdb/tunnel/~uuid_tenant~tunnel-vxlan-1'),
+             ('PATCH', '/net/fdb/tunnel/~uuid_tenant~tunnel-vxlan-2')])
+        patches = [json.loads(body) for (method, url, body) in
+                   self.bigip.adapter.payloads if method == 'PATCH']
+        self.assertEqual([[record['name'] for record in patch['records']]
+                          for patch in patches],
+                         [['fa:16:3e:00:00:03'], []])
+
+    def test_nothing_to_clean_up(self):
+        self.bigip.pool._del_arp_and_fdb([], 'uuid_tenant')
+        self.bigip.pool._del_arp_and_fdb(['10.0.0.9%2'], 'uuid_tenant')
+        self.assertEqual(self.bigip.arp.deleted, [])
+        self.assertEqual([method for (method, url) in
+                          self.bigip.adapter.sent], ['GET'])
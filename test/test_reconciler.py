@@ -0,0 +1,136 @@
+""" Rolling reconciliation of the cached services """
+import unittest
+
+from f5.oslbaasv1agent.drivers.bigip import reconciler
+from f5.oslbaasv1agent.drivers.bigip.reconciler import ServiceReconciler
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class CachedService(object):
+
+    def __init__(self, agent_host):
+        self.agent_host = agent_host
+
+
+class FakeCache(object):
+
+    def __init__(self):
+        self.services = {}
+
+    def get_by_pool_id(self, pool_id):
+        return self.services.get(pool_id)
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.service_queue = []
+
+
+class FakeManager(object):
+    """ Agent manager answering for the plugin and the devices """
+
+    def __init__(self, pool_count):
+        self.agent_host = 'host_1'
+        self.cache = FakeCache()
+        for i in range(pool_count):
+            self.cache.services['pool_%02d' % i] = CachedService('host_1')
+        self.cache.services['other_host_pool'] = CachedService('host_2')
+        self.lbdriver = FakeDriver()
+        self.changed = set()
+        self.missing = set()
+        self.hash_requests = []
+        self.refreshed = []
+        self.validated = []
+
+    def get_changed_pool_ids(self, pool_ids):
+        self.hash_requests.append(list(pool_ids))
+        return self.changed & set(pool_ids)
+
+    def refresh_service(self, pool_id):
+        self.refreshed.append(pool_id)
+
+    def validate_cached_service(self, pool_id):
+        self.validated.append(pool_id)
+        return pool_id in self.missing
+
+
+class TestServiceReconciler(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.time = reconciler.time
+        reconciler.time = self.clock
+        self.manager = FakeManager(30)
+        self.reconciler = ServiceReconciler(self.manager, 60, tick=10)
+
+    def tearDown(self):
+        reconciler.time = self.time
+
+    def run_ticks(self, ticks):
+        for _i in range(ticks):
+            self.reconciler.run()
+            self.clock.now += self.reconciler.tick
+
+    def checked(self):
+        return self.manager.refreshed + self.manager.validated
+
+    def test_each_pool_is_checked_once_per_interval(self):
+        self.run_ticks(6)
+        self.assertEqual([len(pool_ids) for pool_ids in
+                          self.manager.hash_requests], [5] * 6)
+        self.assertEqual(sorted(self.checked()),
+                         sorted(pool_id for pool_id in
+                                self.manager.cache.services
+                                if pool_id != 'other_host_pool'))
+        stats = self.reconciler.get_stats()
+        self.assertEqual(stats['progress'], 100)
+        self.assertEqual(stats['lag'], 0)
+        self.run_ticks(1)
+        self.assertEqual(self.reconciler.get_stats()['cycles'], 1)
+        self.assertEqual(len(self.checked()), 35)
+
+    def test_changed_pools_are_refreshed_and_missing_ones_synced(self):
+        self.manager.changed = set(['pool_01'])
+        self.manager.missing = set(['pool_02'])
+        self.run_ticks(6)
+        self.assertEqual(self.manager.refreshed, ['pool_01'])
+        self.assertNotIn('pool_01', self.manager.validated)
+        stats = self.reconciler.get_stats()
+        self.assertEqual(stats['checked'], 30)
+        self.assertEqual(stats['changed'], 1)
+        self.assertEqual(stats['missing'], 1)
+
+    def test_deleted_pools_are_skipped(self):
+        self.reconciler.run()
+        for pool_id in self.reconciler.pending[:10]:
+            del self.manager.cache.services[pool_id]
+        self.clock.now += self.reconciler.tick
+        self.run_ticks(4)
+        self.assertEqual(len(self.checked()), 20)
+        self.assertEqual(self.reconciler.pending, [])
+
+    def test_queued_requests_go_first(self):
+        self.manager.lbdriver.service_queue = ['update_pool']
+        self.run_ticks(1)
+        self.assertEqual(self.checked(), [])
+        self.assertEqual(self.reconciler.get_stats()['deferred'], 5)
+        self.assertEqual(len(self.reconciler.pending), 30)
+
+    def test_late_cycle_catches_up(self):
+        self.reconciler.run()
+        # the queue kept the reconciler from running for a while
+        self.manager.lbdriver.service_queue = ['update_pool']
+        self.clock.now += 4 * self.reconciler.tick
+        self.reconciler.run()
+        # twice the share of a tick, despite the queued requests
+        self.assertEqual(len(self.checked()), 15)
+        self.assertTrue(self.reconciler.get_stats()['lag'] > 0)
@@ -0,0 +1,88 @@
+""" Service hashes of the plugin and the agent's service cache """
+import copy
+import datetime
+import unittest
+
+from f5.oslbaasv1driver.drivers.service_hash import service_hash
+
+
+def make_service(pool_status, member_status):
+    return {'pool': {'id': 'pool_1',
+                     'tenant_id': 'tenant_1',
+                     'status': pool_status,
+                     'status_description': None,
+                     'lb_method': 'ROUND_ROBIN'},
+            'members': [{'id': 'member_1',
+                         'address': '10.0.0.1',
+                         'protocol_port': 80,
+                         'status': member_status,
+                         'port': {'id': 'port_1',
+                                  'status': 'DOWN',
+                                  'updated_at': datetime.datetime(2015, 1, 1),
+                                  'revision_number': 1}}],
+            'health_monitors': [{'id': 'monitor_1',
+                                 'pools': [{'pool_id': 'pool_1',
+                                            'status': pool_status}]}],
+            'vip': {'id': 'vip_1',
+                    'port_id': 'port_2',
+                    'status': pool_status}}
+
+
+class TestServiceHash(unittest.TestCase):
+
+    def test_pending_and_settled_services_agree(self):
+        # the agent caches the hash of the service as delivered, the
+        # plugin later hashes the service once it is active
+        delivered = make_service('PENDING_UPDATE', 'PENDING_CREATE')
+        settled = make_service('ACTIVE', 'ACTIVE')
+        settled['members'][0]['port']['status'] = 'ACTIVE'
+        settled['members'][0]['port']['updated_at'] = \
+            datetime.datetime(2015, 1, 2)
+        settled['members'][0]['port']['revision_number'] = 2
+        self.assertEqual(service_hash(delivered), service_hash(settled))
+
+    def test_configuration_changes_change_the_hash(self):
+        service = make_service('ACTIVE', 'ACTIVE')
+        changed = copy.deepcopy(service)
+        changed['members'][0]['protocol_port'] = 8080
+        self.assertNotEqual(service_hash(service), service_hash(changed))
+        changed = copy.deepcopy(service)
+        changed['members'].append({'id': 'member_2',
+                                   'address': '10.0.0.2',
+                                   'protocol_port': 80,
+                                   'status': 'ACTIVE'})
+        self.assertNotEqual(service_hash(service), service_hash(changed))
+
+    def test_order_of_objects_is_ignored(self):
+        service = make_service('ACTIVE', 'ACTIVE')
+        service['members'].append({'id': 'member_2',
+                                   'address': '10.0.0.2',
+                                   'protocol_port': 80,
+                                   'status': 'ACTIVE'})
+        reordered = copy.deepcopy(service)
+        reordered['members'].reverse()
+        self.assertEqual(service_hash(service), service_hash(reordered))
+
+    def test_delivered_hash_is_ignored(self):
+        service = make_service('ACTIVE', 'ACTIVE')
+        expected = service_hash(service)
+        service['service_hash'] = expected
+        self.assertEqual(expected, service_hash(service))
+
+    def test_agent_caches_the_plugin_hash(self):
+        try:
+            from f5.oslbaasv1agent.drivers.bigip.agent_manager import \
+                LogicalServiceCache
+        except ImportError:
+            raise unittest.SkipTest('neutron is not installed')
+        cache = LogicalServiceCache()
+        delivered = make_service('PENDING_UPDATE', 'PENDING_CREATE')
+        delivered['service_hash'] = service_hash(delivered)
+        self.assertTrue(cache.put(delivered, 'host_1'))
+        settled = make_service('ACTIVE', 'ACTIVE')
+        settled['service_hash'] = service_hash(settled)
+        # what get_service_hashes of the plugin returns for the pool
+        self.assertEqual(cache.get_by_pool_id('pool_1').service_hash,
+                         settled['service_hash'])
+        self.assertFalse(cache.put(settled, 'host_1'))
+        self.assertEqual(cache.get_by_pool_id('pool_1').version, 1)
@@ -0,0 +1,216 @@
+""" Ordering, exclusive requests, coalescing and lanes of the
+    service queue """
+import unittest
+
+import eventlet
+from eventlet import event
+
+from f5.oslbaasv1agent.drivers.bigip.service_queue import BACKGROUND
+from f5.oslbaasv1agent.drivers.bigip.service_queue import INTERACTIVE
+from f5.oslbaasv1agent.drivers.bigip.service_queue import INTERACTIVE_BURST
+from f5.oslbaasv1agent.drivers.bigip.service_queue import ServiceQueue
+
+
+def settle():
+    """ Let the greenthreads run until they block """
+    for _i in range(20):
+        eventlet.sleep(0)
+
+
+class Recorder(object):
+    """ Fake driver method logging when calls start and end """
+
+    def __init__(self):
+        self.log = []
+        self.gates = {}
+
+    def gate(self, name):
+        """ Calls named name block until the returned event is sent """
+        self.gates[name] = event.Event()
+        return self.gates[name]
+
+    def call(self, name, result=None):
+        self.log.append(('start', name))
+        if name in self.gates:
+            self.gates[name].wait()
+        self.log.append(('end', name))
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def started(self):
+        return [name for (step, name) in self.log if step == 'start']
+
+
+class TestServiceQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = Recorder()
+        self.timeout = eventlet.Timeout(10)
+
+    def tearDown(self):
+        self.timeout.cancel()
+
+    def submit(self, queue, key, name, result=None, **kwargs):
+        """ Submit a recorded call from its own greenthread """
+        thread = eventlet.spawn(queue.submit, key, name,
+                                self.recorder.call, name, result, **kwargs)
+        settle()
+        return thread
+
+    def test_requests_of_a_pool_run_in_order(self):
+        queue = ServiceQueue(workers=4)
+        gate = self.recorder.gate('a1')
+        threads = [self.submit(queue, 'a', 'a1'),
+                   self.submit(queue, 'a', 'a2'),
+                   self.submit(queue, 'a', 'a3'),
+                   self.submit(queue, 'b', 'b1')]
+        # other pools do not wait for the blocked pool
+        self.assertEqual(self.recorder.started(), ['a1', 'b1'])
+        self.assertIn(('end', 'b1'), self.recorder.log)
+        gate.send()
+        for thread in threads:
+            thread.wait()
+        pool_log = [entry for entry in self.recorder.log
+                    if entry[1].startswith('a')]
+        self.assertEqual(pool_log, [('start', 'a1'), ('end', 'a1'),
+                                    ('start', 'a2'), ('end', 'a2'),
+                                    ('start', 'a3'), ('end', 'a3')])
+        self.assertEqual(len(queue), 0)
+
+    def test_exclusive_request_is_a_barrier(self):
+        queue = ServiceQueue(workers=4)
+        gate = self.recorder.gate('a1')
+        threads = [self.submit(queue, 'a', 'a1'),
+                   self.submit(queue, None, 'x'),
+                   self.submit(queue, 'b', 'b1')]
+        # x waits for a1, b1 waits for x although workers are free
+        self.assertEqual(self.recorder.started(), ['a1'])
+        gate.send()
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(self.recorder.log, [('start', 'a1'), ('end', 'a1'),
+                                             ('start', 'x'), ('end', 'x'),
+                                             ('start', 'b1'), ('end', 'b1')])
+
+    def test_pools_queued_before_an_exclusive_request_run_first(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('a1')
+        threads = [self.submit(queue, 'a', 'a1'),
+                   self.submit(queue, 'c', 'c1'),
+                   self.submit(queue, None, 'x'),
+                   self.submit(queue, 'a', 'a2'),
+                   self.submit(queue, 'b', 'b1'),
+                   self.submit(queue, 'c', 'c2')]
+        gate.send()
+        for thread in threads:
+            thread.wait()
+        # parked pools are released in the order of their requests
+        self.assertEqual(self.recorder.started(),
+                         ['a1', 'c1', 'x', 'a2', 'b1', 'c2'])
+
+    def test_background_requests_park_behind_exclusive_requests(self):
+        queue = ServiceQueue(workers=2)
+        gate = self.recorder.gate('a1')
+        threads = [self.submit(queue, 'a', 'a1'),
+                   self.submit(queue, None, 'x', lane=BACKGROUND),
+                   self.submit(queue, 'b', 'b1', lane=BACKGROUND),
+                   self.submit(queue, 'c', 'c1')]
+        self.assertEqual(self.recorder.started(), ['a1'])
+        gate.send()
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(self.recorder.started(), ['a1', 'x', 'c1', 'b1'])
+
+    def test_coalesced_requests_share_the_newest_result(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('busy')
+        busy = self.submit(queue, 'busy', 'busy')
+        threads = [self.submit(queue, 'a', 'a%d' % i, 'result %d' % i,
+                               coalesce=True) for i in range(1, 4)]
+        gate.send()
+        busy.wait()
+        results = [thread.wait() for thread in threads]
+        self.assertEqual(self.recorder.started(), ['busy', 'a3'])
+        self.assertEqual(results, ['result 3'] * 3)
+        stats = queue.get_stats()
+        self.assertEqual(stats['a1']['coalesced'], 1)
+        self.assertEqual(stats['a3']['absorbed'], 2)
+
+    def test_coalesced_requests_share_the_exception(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('busy')
+        busy = self.submit(queue, 'busy', 'busy')
+        error = ValueError('failed')
+        threads = [self.submit(queue, 'a', 'a%d' % i, error,
+                               coalesce=True) for i in range(1, 3)]
+        gate.send()
+        busy.wait()
+        for thread in threads:
+            self.assertRaises(ValueError, thread.wait)
+        self.assertEqual(self.recorder.started(), ['busy', 'a2'])
+        self.assertEqual(queue.get_stats()['a2']['failed'], 1)
+
+    def test_only_consecutive_coalescable_requests_merge(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('busy')
+        busy = self.submit(queue, 'busy', 'busy')
+        threads = [self.submit(queue, 'a', 'a1', coalesce=True),
+                   self.submit(queue, 'a', 'a2'),
+                   self.submit(queue, 'a', 'a3', coalesce=True),
+                   self.submit(queue, 'a', 'a4', coalesce=True)]
+        gate.send()
+        busy.wait()
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(self.recorder.started(),
+                         ['busy', 'a1', 'a2', 'a4'])
+
+    def test_interactive_requests_run_before_background_requests(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('busy')
+        busy = self.submit(queue, 'busy', 'busy')
+        threads = [self.submit(queue, 'b1', 'b1', lane=BACKGROUND),
+                   self.submit(queue, 'b2', 'b2', lane=BACKGROUND),
+                   self.submit(queue, 'i1', 'i1', lane=INTERACTIVE),
+                   self.submit(queue, 'i2', 'i2')]
+        lanes = queue.get_lane_stats()
+        self.assertEqual(lanes['background']['depth'], 2)
+        self.assertEqual(lanes['interactive']['depth'], 2)
+        gate.send()
+        busy.wait()
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(self.recorder.started(),
+                         ['busy', 'i1', 'i2', 'b1', 'b2'])
+
+    def test_background_requests_get_a_turn(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('busy')
+        busy = self.submit(queue, 'busy', 'busy')
+        threads = [self.submit(queue, 'b', 'b', lane=BACKGROUND)]
+        interactive = ['i%d' % i for i in range(INTERACTIVE_BURST + 2)]
+        for name in interactive:
+            threads.append(self.submit(queue, name, name))
+        gate.send()
+        busy.wait()
+        for thread in threads:
+            thread.wait()
+        expected = ['busy'] + interactive[:INTERACTIVE_BURST] + ['b'] + \
+            interactive[INTERACTIVE_BURST:]
+        self.assertEqual(self.recorder.started(), expected)
+        self.assertEqual(queue.get_lane_stats()['background']['turns'], 1)
+
+    def test_pool_moves_up_to_the_lane_of_an_interactive_request(self):
+        queue = ServiceQueue(workers=1)
+        gate = self.recorder.gate('busy')
+        busy = self.submit(queue, 'busy', 'busy')
+        threads = [self.submit(queue, 'b', 'b1', lane=BACKGROUND),
+                   self.submit(queue, 'c', 'c1', lane=BACKGROUND),
+                   self.submit(queue, 'c', 'c2')]
+        gate.send()
+        busy.wait()
+        for thread in threads:
+            thread.wait()
+        self.assertEqual(self.recorder.started(),
+                         ['busy', 'c1', 'c2', 'b1'])
@@ -0,0 +1,153 @@
+""" Pool stats collection and publishing """
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces.pool import Pool
+from f5.oslbaasv1agent.drivers.bigip.stats import BigipStatsCollector
+from f5.oslbaasv1agent.drivers.bigip.stats import StatsPublishFilter
+
+from fake_icr import FakeAdapter
+
+
+class FakeBigIP(object):
+
+    def __init__(self, hostname):
+        self.icr_url = 'https://%s/mgmt/tm' % hostname
+        self.icr_session = IcrSession(hostname, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+        self.pool = Pool(self)
+
+
+class FakeDriver(object):
+
+    def __init__(self, bigips):
+        self.bigips = bigips
+
+    def get_all_bigips(self):
+        return self.bigips
+
+    def fanout(self, bigips, method, *args):
+        return [method(bigip, *args) for bigip in bigips]
+
+
+def pool_stats_entry(path, connections):
+    return {'nestedStats': {'entries': {
+        'tmName': {'description': path},
+        'serverside.curConns': {'value': connections}}}}
+
+
+def member_stats_entry(path, addr, port, status):
+    return {'nestedStats': {'entries': {
+        'poolName': {'description': path},
+        'addr': {'description': addr},
+        'port': {'value': port},
+        'monitorStatus': {'description': status}}}}
+
+
+class TestBigipStatsCollector(unittest.TestCase):
+
+    POOL = {'id': 'pool_1', 'tenant_id': 'tenant_1'}
+    PATH = '/uuid_tenant_1/uuid_pool_1'
+
+    def setUp(self):
+        self.bigip = FakeBigIP('bigip1')
+        self.collector = BigipStatsCollector(FakeDriver([self.bigip]))
+        self.bigip.adapter.bodies[self.bigip.icr_url + '/ltm/pool/stats'] = \
+            {'entries': {'1': pool_stats_entry(self.PATH, 3),
+                         '2': pool_stats_entry('/Common/other', 1)}}
+        self.members_url = self.bigip.icr_url + '/ltm/pool/members/stats'
+        self.bigip.adapter.bodies[self.members_url] = \
+            {'entries': {'1': member_stats_entry(self.PATH, '10.0.0.1%2',
+                                                 80, 'up'),
+                         '2': member_stats_entry(self.PATH, '10.0.0.2%2',
+                                                 80, 'down')}}
+
+    def test_two_queries_per_device(self):
+        self.assertFalse(self.collector.has_table(self.bigip))
+        self.collector.refresh()
+        self.assertTrue(self.collector.has_table(self.bigip))
+        stats = self.collector.get_pool_statistics(self.bigip, self.POOL)
+        self.assertEqual(stats['STATISTIC_SERVER_SIDE_CURRENT_CONNECTIONS'],
+                         3)
+        members = self.collector.get_members_monitor_status(self.bigip,
+                                                            self.POOL)
+        self.assertEqual([(member['addr'], member['state'])
+                          for member in members],
+                         [('10.0.0.1%2', 'MONITOR_STATUS_UP'),
+                          ('10.0.0.2%2', 'MONITOR_STATUS_DOWN')])
+        self.assertEqual(len(self.bigip.adapter.sent), 2)
+
+    def test_missing_pool_has_no_stats(self):
+        self.collector.refresh()
+        pool = {'id': 'pool_2', 'tenant_id': 'tenant_1'}
+        self.assertIsNone(self.collector.get_pool_statistics(self.bigip,
+                                                             pool))
+        self.assertEqual(
+            self.collector.get_members_monitor_status(self.bigip, pool), [])
+
+    def test_old_tables_are_not_used(self):
+        self.collector.refresh()
+        self.collector.tables[self.bigip.icr_url]['time'] -= \
+            self.collector.max_age
+        self.assertFalse(self.collector.has_table(self.bigip))
+
+
+def pool_stats(bytes_in, members=None):
+    return {'bytes_in': bytes_in, 'bytes_out': 100,
+            'members': dict(members or {})}
+
+
+class TestStatsPublishFilter(unittest.TestCase):
+
+    def setUp(self):
+        self.filter = StatsPublishFilter(threshold=10, max_age=300)
+        self.members = {'member_1': {'status': 'ACTIVE'},
+                        'member_2': {'status': 'ACTIVE'}}
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1000, self.members), 1),
+            pool_stats(1000, self.members))
+
+    def test_unchanged_stats_are_suppressed(self):
+        self.assertIsNone(self.filter.filter(
+            'pool_1', pool_stats(1050, self.members), 1))
+        stats = self.filter.get_stats()
+        self.assertEqual(stats['published'], 1)
+        self.assertEqual(stats['suppressed'], 1)
+        self.assertEqual(stats['members_suppressed'], 2)
+
+    def test_counters_past_the_threshold_are_published(self):
+        # members are left out while their status stays the same
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1200, self.members), 1),
+            pool_stats(1200))
+
+    def test_changed_member_statuses_are_published(self):
+        self.members['member_2'] = {'status': 'INACTIVE'}
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1000, self.members), 1),
+            pool_stats(1000, {'member_2': {'status': 'INACTIVE'}}))
+        self.assertIsNone(self.filter.filter(
+            'pool_1', pool_stats(1000, self.members), 1))
+
+    def test_new_service_version_publishes_everything(self):
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1000, self.members), 2),
+            pool_stats(1000, self.members))
+
+    def test_old_stats_are_published_again(self):
+        self.filter.published['pool_1']['time'] -= self.filter.max_age
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1000, self.members), 1),
+            pool_stats(1000, self.members))
+
+    def test_forgotten_pools_are_published_again(self):
+        self.filter.purge(['pool_2'])
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1000, self.members), 1),
+            pool_stats(1000, self.members))
+        self.filter.forget('pool_1')
+        self.assertEqual(
+            self.filter.filter('pool_1', pool_stats(1000, self.members), 1),
+            pool_stats(1000, self.members))
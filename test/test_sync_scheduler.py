@@ -0,0 +1,74 @@
+""" Deferred and coalesced config syncs """
+import unittest
+
+import eventlet
+from eventlet import event
+
+from f5.oslbaasv1agent.drivers.bigip import sync_scheduler
+from f5.oslbaasv1agent.drivers.bigip.service_queue import ServiceQueue
+from f5.oslbaasv1agent.drivers.bigip.sync_scheduler import \
+    ConfigSyncScheduler
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.service_queue = ServiceQueue(workers=2)
+        self.syncs = 0
+
+    def sync_cluster(self):
+        self.syncs += 1
+
+
+class TestConfigSyncScheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.poll_interval = sync_scheduler.SYNC_POLL_INTERVAL
+        sync_scheduler.SYNC_POLL_INTERVAL = 0.01
+        self.driver = FakeDriver()
+        self.scheduler = ConfigSyncScheduler(self.driver, window=60)
+        self.timeout = eventlet.Timeout(10)
+
+    def tearDown(self):
+        self.timeout.cancel()
+        sync_scheduler.SYNC_POLL_INTERVAL = self.poll_interval
+
+    def wait_for_sync(self):
+        while self.scheduler.running:
+            eventlet.sleep(0.01)
+
+    def test_deferred_syncs_are_coalesced(self):
+        for _i in range(3):
+            self.scheduler.mark_dirty()
+        self.wait_for_sync()
+        self.assertEqual(self.driver.syncs, 1)
+        stats = self.scheduler.get_stats()
+        self.assertEqual(stats['deferred'], 3)
+        self.assertEqual(stats['coalesced'], 2)
+        self.assertEqual(stats['syncs'], 1)
+
+    def test_sync_waits_for_the_queue_to_drain(self):
+        gate = event.Event()
+        service = eventlet.spawn(self.driver.service_queue.submit,
+                                 'pool_1', 'update_pool', gate.wait)
+        self.scheduler.mark_dirty()
+        eventlet.sleep(0.1)
+        self.assertEqual(self.driver.syncs, 0)
+        gate.send()
+        service.wait()
+        self.wait_for_sync()
+        self.assertEqual(self.driver.syncs, 1)
+
+    def test_sync_is_due_after_the_window(self):
+        self.driver.service_queue = ['busy']
+        self.scheduler.dirty_since = sync_scheduler.time()
+        self.assertFalse(self.scheduler._due())
+        self.scheduler.dirty_since -= self.scheduler.window
+        self.assertTrue(self.scheduler._due())
+
+    def test_immediate_sync_clears_the_pending_sync(self):
+        self.scheduler.mark_dirty()
+        self.scheduler.synced()
+        self.wait_for_sync()
+        self.assertEqual(self.driver.syncs, 0)
+        self.assertEqual(self.scheduler.get_stats()['immediate_syncs'], 1)
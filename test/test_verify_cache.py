@@ -0,0 +1,106 @@
+""" Verify pass of the networking assured on a bigip """
+import unittest
+
+from f5.bigip.icr_session import IcrSession
+from f5.bigip.interfaces.l2gre import L2GRE
+from f5.bigip.interfaces.selfip import SelfIP
+from f5.bigip.interfaces.snat import SNAT
+from f5.bigip.interfaces.vlan import Vlan
+from f5.bigip.interfaces.vxlan import VXLAN
+
+from fake_icr import FakeAdapter
+
+SUBNET_1 = '11111111-1111-1111-1111-111111111111'
+SUBNET_2 = '22222222-2222-2222-2222-222222222222'
+
+
+class FakeBigIP(object):
+
+    def __init__(self, hostname):
+        self.icr_url = 'https://%s/mgmt/tm' % hostname
+        self.icr_session = IcrSession(hostname, 'admin', 'admin',
+                                      token_auth=False)
+        self.adapter = FakeAdapter()
+        self.icr_session.mount('https://', self.adapter)
+        self.vlan = Vlan(self)
+        self.vxlan = VXLAN(self)
+        self.l2gre = L2GRE(self)
+        self.selfip = SelfIP(self)
+        self.snat = SNAT(self)
+        self.assured_networks = {}
+        self.assured_gateway_subnets = []
+        self.assured_tenant_snat_subnets = {}
+
+    def answer(self, path, items):
+        self.adapter.bodies[self.icr_url + path] = {'items': items}
+
+
+def device_objects(bigip):
+    """ Objects of the assured networking, in tenant partitions """
+    bigip.answer('/net/vlan/?$select=name',
+                 [{'name': 'vlan-1', 'partition': 'uuid_tenant_1'}])
+    bigip.answer('/net/tunnels/tunnel',
+                 [{'name': 'tunnel-vxlan-2', 'profile': '/Common/vxlan_ovs'},
+                  {'name': 'tunnel-gre-3', 'profile': '/Common/gre_ovs'}])
+    bigip.answer('/net/self/?$select=name',
+                 [{'name': 'local-bigip1-' + SUBNET_1}])
+    bigip.answer('/ltm/snat-translation/?$select=name',
+                 [{'name': 'snat-traffic-group-local-only-%s_0' % SUBNET_2}])
+
+
+class TestFolderlessQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.bigip = FakeBigIP('bigip1')
+        device_objects(self.bigip)
+
+    def test_objects_of_all_partitions_are_listed(self):
+        self.assertEqual(self.bigip.vlan.get_vlans(folder=None), ['vlan-1'])
+        self.assertEqual(self.bigip.vxlan.get_tunnels(folder=None),
+                         ['tunnel-vxlan-2'])
+        self.assertEqual(self.bigip.l2gre.get_tunnels(folder=None),
+                         ['tunnel-gre-3'])
+        self.assertEqual(self.bigip.selfip.get_selfip_list(folder=None),
+                         ['local-bigip1-' + SUBNET_1])
+        self.assertEqual(self.bigip.snat.get_snataddresses(folder=None),
+                         ['snat-traffic-group-local-only-%s_0' % SUBNET_2])
+        for (method, url) in self.bigip.adapter.sent:
+            self.assertNotIn('partition', url)
+
+
+class TestVerifyBigipCache(unittest.TestCase):
+
+    def setUp(self):
+        try:
+            from f5.oslbaasv1agent.drivers.bigip.icontrol_driver import \
+                iControlDriver
+        except ImportError:
+            raise unittest.SkipTest('neutron is not installed')
+        self.verify = iControlDriver._verify_bigip_cache
+        self.bigip = FakeBigIP('bigip1')
+        device_objects(self.bigip)
+
+    def test_assured_networking_survives(self):
+        self.bigip.assured_networks = {'net_1': '/uuid_tenant_1/vlan-1',
+                                       'net_2': 'tunnel-vxlan-2',
+                                       'net_3': 'tunnel-gre-3'}
+        self.bigip.assured_gateway_subnets = [SUBNET_1]
+        self.bigip.assured_tenant_snat_subnets = {'tenant_1': [SUBNET_2]}
+        self.verify(self.bigip)
+        self.assertEqual(sorted(self.bigip.assured_networks),
+                         ['net_1', 'net_2', 'net_3'])
+        self.assertEqual(self.bigip.assured_gateway_subnets, [SUBNET_1])
+        self.assertEqual(self.bigip.assured_tenant_snat_subnets,
+                         {'tenant_1': [SUBNET_2]})
+
+    def test_missing_networking_is_removed(self):
+        self.bigip.assured_networks = {'net_1': 'vlan-1',
+                                       'net_4': 'vlan-4'}
+        self.bigip.assured_gateway_subnets = [SUBNET_1, SUBNET_2]
+        self.bigip.assured_tenant_snat_subnets = {
+            'tenant_1': [SUBNET_1, SUBNET_2]}
+        self.verify(self.bigip)
+        self.assertEqual(list(self.bigip.assured_networks), ['net_1'])
+        self.assertEqual(self.bigip.assured_gateway_subnets, [SUBNET_1])
+        self.assertEqual(self.bigip.assured_tenant_snat_subnets,
+                         {'tenant_1': [SUBNET_2]})